@@ -1,79 +1,42 @@
 import streamlit as st
 import json
-import re
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-import anthropic
-from openai import OpenAI
-import google.generativeai as genai
-from typing import Dict, Any, Optional
-
-# Reference translations for evaluation
-REFERENCE_TRANSLATIONS = {
-    "French": {
-        "hero_headline": "ZERO PIPEAU CASINO",
-        "hero_subheadline": "Que des gains en cash"
-    },
-    "Spanish": {
-        "hero_headline": "CASINO SIN RODEOS",
-        "hero_subheadline": "Solo premios en cash"
-    },
-    "Italian": {
-        "hero_headline": "ZERO FUFFA CASINÒ",
-        "hero_subheadline": "Solo premi in cash"
-    },
-    "German": {
-        "hero_headline": "CASINO OHNE TRICKS",
-        "hero_subheadline": "Nur Cash-Gewinne"
-    },
-    "Russian": {
-        "hero_headline": "КАЗИНО БЕЗ ФОКУСОВ",
-        "hero_subheadline": "Только денежные призы"
-    },
-    "Japanese": {
-        "hero_headline": "透明性の高いカジノ",
-        "hero_subheadline": "現金賞品のみ"
-    },
-    "Indonesian": {
-        "hero_headline": "KASINO JUJUR TERBUKA",
-        "hero_subheadline": "HANYA HADIAH TUNAI"
-    },
-    "Simplified Chinese": {
-        "hero_headline": "无废话娱乐场",
-        "hero_subheadline": "纯粹现金奖励"
-    },
-    "Traditional Chinese": {
-        "hero_headline": "無廢話娛樂場",
-        "hero_subheadline": "純粹現金獎勵"
-    },
-    "Korean": {
-        "hero_headline": "투명한 카지노",
-        "hero_subheadline": "오직 현금상금"
-    },
-    "Portuguese (Portugal)": {
-        "hero_headline": "CASINO A SÉRIO",
-        "hero_subheadline": "Prémios em dinheiro"
-    },
-    "Portuguese (Brazil)": {
-        "hero_headline": "CASSINO NA VEIA",
-        "hero_subheadline": "Prêmios em dinheiro"
-    },
-    "Turkish": {
-        "hero_headline": "DOLANSIZ CASINO",
-        "hero_subheadline": "Sadece nakit ödüller"
-    },
-    "Hindi": {
-        "hero_headline": "साफ़ सुथरा कैसिनो",
-        "hero_subheadline": "सिर्फ नकद इनाम"
-    },
-    "Vietnamese": {
-        "hero_headline": "SÒNG BẠC KHÔNG XẠO",
-        "hero_subheadline": "Chỉ thưởng tiền mặt thật"
-    },
-    "Arabic (Peninsular)": {
-        "hero_headline": "كازينو بلا تعقيد",
-        "hero_subheadline": "مكافآت نقدية بس"
-    }
-}
+from typing import Any, Dict, Optional
+
+from dispatch import DEFAULT_CONCURRENCY, DEFAULT_RATE_LIMITS, ProviderLimiter
+from export import ResultExporter
+from glossary import DEFAULT_GLOSSARY_PATH, Glossary, glossary_stamps
+from translation_cache import TranslationCache
+from incremental import KeyMemory
+from job_queue import ACTIVE, DEFAULT_WORKERS, JobQueue, job_spec, start_workers
+from comparison import compare_models, comparison_rows, comparison_summary
+from providers import PROVIDER_CONFIG, ProviderRegistry
+from run_store import RunStore, diff_runs, make_run
+from single_flight import SINGLE_FLIGHT
+from telemetry import Tracer
+from validation import SourceFacts
+from translator import (
+    DEFAULT_REPAIR_ROUNDS,
+    DEFAULT_TEMPLATE_PATH,
+    MODELS,
+    PROMPT_TEMPLATES,
+    REFERENCE_GRADES,
+    REFERENCE_TRANSLATIONS,
+    SAMPLE_JSON,
+    compile_all_results_for_copy,
+    evaluate_against_reference,
+    load_prompt_template,
+    translate_json,
+    validate_json,
+)
+
+# Where "📦 Export run" writes, one directory per run id
+EXPORTS_PATH = Path(__file__).parent / "exports"
+APP_EXPORT_FORMATS = ("json", "jsonl", "csv", "xliff")
 
 # Page configuration
 st.set_page_config(
@@ -82,279 +45,442 @@ st.set_page_config(
     layout="wide"
 )
 
-# Initialize API clients
-@st.cache_resource
-def get_anthropic_client():
-    """Initialize Anthropic client with API key from secrets"""
-    try:
-        return anthropic.Anthropic(api_key=st.secrets["ANTHROPIC_API_KEY"])
-    except Exception as e:
-        st.error(f"Failed to initialize Anthropic client: {e}")
-        return None
+# Seconds between status refreshes while background jobs are running
+JOB_REFRESH_INTERVAL = 2.0
 
-@st.cache_resource
-def get_openai_client():
-    """Initialize OpenAI client with API key from secrets"""
-    try:
-        return OpenAI(api_key=st.secrets["OPENAI_API_KEY"])
-    except Exception as e:
-        st.error(f"Failed to initialize OpenAI client: {e}")
-        return None
+def secret_api_keys() -> Dict[str, str]:
+    """Provider API keys configured in Streamlit secrets"""
+    api_keys = {}
+    for provider, config in PROVIDER_CONFIG.items():
+        try:
+            api_keys[provider] = st.secrets[config["api_key_env"]]
+        except Exception:
+            pass
+    return api_keys
 
+# Initialize API clients
 @st.cache_resource
-def get_gemini_client():
-    """Initialize Gemini client with API key from secrets"""
-    try:
-        genai.configure(api_key=st.secrets["GEMINI_API_KEY"])
-        return genai.GenerativeModel("gemini-3-pro-preview")
-    except Exception as e:
-        st.error(f"Failed to initialize Gemini client: {e}")
-        return None
-
-def load_prompt_template() -> str:
-    """Load the Zero BS focused prompt template"""
-    prompt_path = Path(__file__).parent / "prompt_zero_bs_focused.txt"
+def get_provider_registry() -> ProviderRegistry:
+    """Shared async provider clients, with API keys from secrets"""
+    return ProviderRegistry(secret_api_keys())
+
+def load_default_prompt(path: Path = DEFAULT_TEMPLATE_PATH) -> str:
+    """Load a shipped prompt template (read from disk only when the file changed)"""
     try:
-        with open(prompt_path, 'r', encoding='utf-8') as f:
-            return f.read()
+        return load_prompt_template(path)
     except FileNotFoundError:
-        st.error(f"Prompt template not found at {prompt_path}")
+        st.error(f"Prompt template not found at {path}")
         return ""
 
-def format_prompt(
-    template: str,
-    target_language: str,
-    json_input: str
-) -> str:
-    """Format the prompt template with user inputs"""
-    return template.replace("${targetLanguage}", target_language) \
-                   .replace("${jsonInput}", json_input)
-
-def translate_with_opus(prompt: str, temperature: float = 0.3) -> Optional[str]:
-    """Call Claude Opus with the formatted prompt"""
-    client = get_anthropic_client()
-    if not client:
-        return None
-
-    try:
-        with st.spinner("Translating with Claude Opus..."):
-            message = client.messages.create(
-                model="claude-opus-4-5-20251101",
-                max_tokens=4000,
-                temperature=temperature,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
-            return message.content[0].text
-    except Exception as e:
-        st.error(f"Opus translation failed: {e}")
-        return None
+@st.cache_resource
+def get_provider_limiter(anthropic_limit: int, openai_limit: int, gemini_limit: int, rate_limits: tuple = ()) -> ProviderLimiter:
+    """Shared per-provider concurrency and rate limiter (one per limit configuration)
+
+    rate_limits is a tuple of (provider, requests/min, tokens/min); 0 means unlimited.
+    """
+    return ProviderLimiter(
+        {
+            "anthropic": anthropic_limit,
+            "openai": openai_limit,
+            "gemini": gemini_limit,
+        },
+        rates={
+            provider: {"requests_per_minute": rpm, "tokens_per_minute": tpm}
+            for provider, rpm, tpm in rate_limits
+        }
+    )
 
-def translate_with_sonnet(prompt: str, temperature: float = 0.3) -> Optional[str]:
-    """Call Claude Sonnet with the formatted prompt"""
-    client = get_anthropic_client()
-    if not client:
-        return None
+@st.cache_resource
+def get_translation_cache() -> TranslationCache:
+    """Shared on-disk cache of raw model responses"""
+    return TranslationCache()
 
-    try:
-        with st.spinner("Translating with Claude Sonnet..."):
-            message = client.messages.create(
-                model="claude-sonnet-4-20250514",
-                max_tokens=4000,
-                temperature=temperature,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ]
-            )
-            return message.content[0].text
-    except Exception as e:
-        st.error(f"Sonnet translation failed: {e}")
-        return None
+@st.cache_resource
+def get_run_store() -> RunStore:
+    """Shared on-disk history of finished runs"""
+    return RunStore()
 
-def translate_with_gpt(prompt: str, temperature: float = 0.3) -> Optional[str]:
-    """Call GPT-5.1 with the formatted prompt"""
-    client = get_openai_client()
-    if not client:
-        return None
+@st.cache_resource
+def get_job_queue() -> JobQueue:
+    """Shared on-disk queue of background translation jobs"""
+    return JobQueue()
 
-    try:
-        with st.spinner("Translating with GPT-5.1..."):
-            response = client.chat.completions.create(
-                model="gpt-5.1-2025-11-13",
-                messages=[
-                    {
-                        "role": "user",
-                        "content": prompt
-                    }
-                ],
-                temperature=temperature,
-                max_completion_tokens=4000,
-                top_p=0.9
-            )
-            return response.choices[0].message.content
-    except Exception as e:
-        st.error(f"GPT-5.1 translation failed: {e}")
-        return None
+@st.cache_resource
+def get_worker_pools() -> list:
+    """Worker pool processes started by this server (they outlive reruns and sessions)"""
+    return []
 
-def translate_with_gemini(prompt: str, temperature: float = 0.3) -> Optional[str]:
-    """Call Gemini 3 Pro with the formatted prompt"""
-    model = get_gemini_client()
-    if not model:
-        return None
+def ensure_workers(job_queue: JobQueue, processes: int) -> None:
+    """Start a worker pool unless one of ours is still running or enough workers are alive"""
+    pools = get_worker_pools()
+    pools[:] = [pool for pool in pools if pool.poll() is None]
+    if not pools and job_queue.metrics()["workers"] < processes:
+        pools.append(start_workers(processes, job_queue.path, api_keys=secret_api_keys()))
 
-    try:
-        with st.spinner("Translating with Gemini 3 Pro..."):
-            response = model.generate_content(
-                prompt,
-                generation_config=genai.types.GenerationConfig(
-                    temperature=temperature,
-                    max_output_tokens=4000,
-                )
+@st.cache_resource
+def get_key_memory() -> KeyMemory:
+    """Shared per-key translation memory for incremental runs"""
+    return KeyMemory()
+
+@st.cache_resource(max_entries=2)
+def get_glossary(paths: tuple, stamps: tuple) -> Glossary:
+    """Shared, indexed glossary; stamps (file mtimes) make edited files load again"""
+    return Glossary.load(paths)
+
+def render_limiter_status(limiter: ProviderLimiter) -> None:
+    """Warn about providers that pushed back during the run"""
+    for provider, status in limiter.status().items():
+        if status["circuit"] != "closed":
+            st.warning(f"🔌 {provider} circuit is {status['circuit']}: calls are paused after repeated failures")
+    if limiter.rate_limited:
+        st.caption(f"🚦 {limiter.rate_limited} rate-limited response(s) so far; requests were slowed down and retried")
+
+def render_call_metrics(tracer: Tracer) -> None:
+    """Per-call latency/token/cost tables with trace downloads"""
+    if not tracer.spans:
+        return
+    with st.expander(f"📈 Call metrics ({len(tracer.spans)} request(s))", expanded=False):
+        st.dataframe(tracer.summary(), use_container_width=True, hide_index=True)
+        st.dataframe(tracer.rows(), use_container_width=True, hide_index=True)
+        download_col1, download_col2 = st.columns(2)
+        with download_col1:
+            st.download_button(
+                "⬇️ Trace (JSONL)",
+                data=tracer.to_jsonl(),
+                file_name=f"trace-{tracer.trace_id}.jsonl",
+                mime="application/jsonl"
+            )
+        with download_col2:
+            st.download_button(
+                "⬇️ Trace (OpenTelemetry JSON)",
+                data=json.dumps(tracer.to_otlp()),
+                file_name=f"trace-{tracer.trace_id}.otlp.json",
+                mime="application/json"
             )
-            return response.text
-    except Exception as e:
-        st.error(f"Gemini 3 Pro translation failed: {e}")
-        return None
-
-def clean_json_output(text: str) -> str:
-    """Clean model output to extract pure JSON"""
-    if not text:
-        return ""
 
-    # Remove markdown code fences
-    text = re.sub(r'^```json\s*\n?', '', text, flags=re.MULTILINE)
-    text = re.sub(r'^```\s*\n?', '', text, flags=re.MULTILINE)
-    text = re.sub(r'\n?```\s*$', '', text, flags=re.MULTILINE)
+def render_comparison(run: Dict[str, Any]) -> None:
+    """Side-by-side grid and per-model summary of a stored comparison run"""
+    rows = comparison_rows(run["results"], run["source"])
+    slowest = max((row["Latency (s)"] for row in rows), default=0.0)
+    st.caption(f"⏱️ {len(rows)} cells in {run['elapsed']:.2f}s (slowest cell {slowest:.2f}s)")
+
+    st.subheader("🏁 Model Summary")
+    st.dataframe(comparison_summary(rows), use_container_width=True, hide_index=True)
+
+    st.subheader("🧮 Model × Language Grid")
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+    render_call_metrics(Tracer.from_spans(run["spans"]))
+
+    for name, all_results in run["results"].items():
+        failures = {language: r["error"] for language, r in all_results.items() if not r["valid"]}
+        if failures:
+            with st.expander(f"⚠️ {name}: {len(failures)} failed language(s)", expanded=False):
+                for language, error in failures.items():
+                    st.error(f"{language}: {error}")
+
+def render_export(run: Dict[str, Any]) -> None:
+    """Export button writing the run to exports/<run id>/, then report downloads"""
+    out = EXPORTS_PATH / run["id"]
+    if st.button("📦 Export run", key=f"export_{run['id']}"):
+        with ResultExporter(out, formats=APP_EXPORT_FORMATS) as exporter:
+            for language, result in run["results"][run["models"][0]].items():
+                exporter.add("translations.json", run["source"], language, result)
+        st.caption(f"📦 Wrote {exporter.languages} language(s), {exporter.rows} report row(s) to {out}")
+    if (out / "report.csv").exists():
+        download_col1, download_col2 = st.columns(2)
+        with download_col1:
+            st.download_button(
+                "⬇️ Report (CSV)",
+                data=(out / "report.csv").read_bytes(),
+                file_name=f"report-{run['id']}.csv",
+                mime="text/csv"
+            )
+        with download_col2:
+            st.download_button(
+                "⬇️ Report (JSONL)",
+                data=(out / "report.jsonl").read_bytes(),
+                file_name=f"report-{run['id']}.jsonl",
+                mime="application/jsonl"
+            )
 
-    # Try to find JSON object in the text
-    # Look for content between first { and last }
-    start = text.find('{')
-    end = text.rfind('}')
+def render_translation(run: Dict[str, Any]) -> None:
+    """Summary, copy view and one tab per language for a stored single-model run"""
+    model_name = run["models"][0]
+    all_results = run["results"][model_name]
+    run_stats = run["stats"][model_name]
+    validation = run["validation"][model_name]
+    languages = run["languages"]
+
+    summary_section = st.container()
+    copy_section = st.container()
+    tabs = st.tabs(languages)
+
+    with summary_section:
+        if run_stats["requests"] > len(languages):
+            st.caption(f"✂️ Large input split into {run_stats['requests']} requests across {len(languages)} language(s)")
+        if run_stats["cached"]:
+            st.caption(f"🗄️ {run_stats['cached']} of {run_stats['requests']} request(s) served from cache")
+        if run_stats.get("coalesced"):
+            st.caption(f"🔗 {run_stats['coalesced']} request(s) shared an identical call already in flight, at no extra cost")
+        if run_stats["reused_keys"]:
+            st.caption(f"🧠 {run_stats['reused_keys']} key(s) reused from translation memory, {run_stats['sent_keys']} sent to the model")
+        if run_stats.get("glossary_keys"):
+            st.caption(f"📖 {run_stats['glossary_keys']} key(s) taken from the glossary without a model call")
+        if run_stats["input_tokens"] or run_stats["output_tokens"]:
+            retries = f", {run_stats['retries']} retr{'y' if run_stats['retries'] == 1 else 'ies'}" if run_stats["retries"] else ""
+            st.caption(
+                f"🔢 {run_stats['input_tokens']:,} input / {run_stats['output_tokens']:,} output tokens, "
+                f"est. ${run_stats['cost']:.4f}{retries}"
+            )
+        if run_stats["cache_read_tokens"]:
+            share = run_stats["cache_read_tokens"] / max(1, run_stats["input_tokens"])
+            st.caption(f"♻️ {run_stats['cache_read_tokens']:,} input tokens ({share:.0%}) read from the provider's prompt cache")
+        repair = run_stats.get("repair")
+        if repair and (repair["keys"] or repair["dropped"]):
+            unresolved = f", {repair['unresolved']} unresolved" if repair["unresolved"] else ""
+            st.caption(
+                f"🩹 Repaired {repair['fixed']}/{repair['keys']} failing key(s) in {repair['requests']} request(s){unresolved} · "
+                f"saved ~{repair['tokens_saved']:,} tokens and {repair['seconds_saved']:.1f}s versus full re-runs"
+            )
+        for language, result_data in all_results.items():
+            if result_data["raw"] is None:
+                st.error(f"{language}: {result_data['error']}")
+        render_call_metrics(Tracer.from_spans(run["spans"]))
+        with st.expander(f"🔍 Validation table ({len(validation['rows'])} language × key rows)", expanded=False):
+            st.dataframe(validation["rows"], use_container_width=True, hide_index=True)
+
+    with copy_section:
+        # Add copy button for all results
+        st.subheader("📋 Copy All Results")
+        render_export(run)
+        # Built only on request: the text blob grows with every language and key
+        if st.checkbox("View/Copy All Translation Results", key=f"copy_view_{run['id']}"):
+            # Filter compile function to only show selected languages
+            filtered_results = {lang: all_results[lang] for lang in languages if lang in all_results}
+            st.code(compile_all_results_for_copy(filtered_results, run["source"]), language="text")
+            st.info("💡 Tip: Click the copy button in the top-right corner of the code block above to copy all results")
+
+    # Display results in tabs
+    for idx, language in enumerate(run["languages"]):
+        with tabs[idx]:
+            render_language_result(language, all_results.get(language), validation)
+
+def render_language_result(language: str, result_data: Optional[Dict[str, Any]], validation: Dict[str, Any]) -> None:
+    """One language's tab: output, repair/best-of notes, checks and reference evaluation
+
+    validation is a validate_translations() result covering this language.
+    """
+    if not result_data:
+        st.error("No result for this language")
+        return
+
+    if result_data.get("first_token") is not None:
+        st.caption(f"⏱️ First token after {result_data['first_token']:.2f}s · done in {result_data['elapsed']:.2f}s")
+
+    if result_data.get("json_repairs"):
+        st.caption(f"🧩 Output JSON repaired: {'; '.join(result_data['json_repairs'])}")
+
+    if result_data.get("best_of"):
+        best_of = result_data["best_of"]
+        similarity = f", chosen one at chrF {best_of['similarity']:.0f} vs reference" if best_of["similarity"] is not None else ""
+        st.caption(f"🎯 Best of {best_of['candidates']} candidate(s): {best_of['passing']} passed every check{similarity}")
+
+    if result_data.get("repair"):
+        repair = result_data["repair"]
+        notes = []
+        if repair["fixed"]:
+            notes.append(f"fixed {', '.join(repair['fixed'])}")
+        if repair["dropped"]:
+            notes.append(f"dropped unexpected {', '.join(repair['dropped'])}")
+        if repair["unresolved"]:
+            notes.append(f"still failing {', '.join(repair['unresolved'])}")
+        st.caption(f"🩹 Repair pass ({repair['rounds']} round(s)): {'; '.join(notes)}")
+
+    if result_data["valid"]:
+        result_parsed = result_data["parsed"]
 
-    if start != -1 and end != -1 and end > start:
-        text = text[start:end+1]
+        # Show formatted JSON
+        st.code(json.dumps(result_parsed, indent=2, ensure_ascii=False), language="json")
 
-    return text.strip()
+        # Debug information
+        with st.expander("🔧 Debug Information", expanded=False):
+            st.markdown("**Formatted Prompt Sent to API:**")
+            st.code(result_data.get("prompt", "N/A"), language="text")
 
-def validate_json(json_str: str) -> tuple[bool, Optional[Dict], str]:
-    """Validate JSON string and return parsed object"""
-    try:
-        # Clean the JSON string first
-        cleaned = clean_json_output(json_str)
-        parsed = json.loads(cleaned)
-        return True, parsed, ""
-    except json.JSONDecodeError as e:
-        return False, None, f"Invalid JSON: {e}"
-
-def compile_all_results_for_copy(all_results: Dict[str, Any], json_parsed: Dict) -> str:
-    """Compile all translation results into a copyable format"""
-    output_lines = []
-    output_lines.append("=" * 80)
-    output_lines.append("TRANSLATION RESULTS - SELECTED LANGUAGES")
-    output_lines.append("=" * 80)
-    output_lines.append("")
-
-    for language in all_results.keys():
-        result_data = all_results.get(language)
-        if not result_data or not result_data.get("valid"):
-            continue
+            st.markdown("**Raw API Response:**")
+            st.code(result_data.get("raw", "N/A"), language="text")
 
-        result_parsed = result_data["parsed"]
+            if len(result_data.get("chunks", [])) > 1:
+                st.markdown("**Chunks:**")
+                st.table([
+                    {
+                        "chunk": index + 1,
+                        "keys": chunk["keys"],
+                        "tokens (est.)": chunk["tokens"],
+                        "latency (s)": round(chunk["elapsed"], 2),
+                        "cached": chunk["cached"]
+                    }
+                    for index, chunk in enumerate(result_data["chunks"])
+                ])
+
+        # Validation checks
+        st.subheader("🔍 Validation Checks")
+
+        checks = validation["languages"][language]["checks"]
+
+        # Display checks
+        for check_name, passed in checks:
+            if passed:
+                st.success(f"✅ {check_name}")
+            else:
+                st.error(f"❌ {check_name}")
+
+        failing_rows = [
+            {"key": row["key"], "status": row["status"], "problems": row["problems"]}
+            for row in validation["rows"]
+            if row["language"] == language and row["status"] != "ok"
+        ]
+        if failing_rows:
+            st.dataframe(failing_rows, use_container_width=True, hide_index=True)
+
+        # Reference translation evaluation
+        eval_results = evaluate_against_reference(result_parsed, language)
+
+        if eval_results["has_reference"]:
+            st.subheader("📚 Reference Match Evaluation")
+
+            for match_info in eval_results["matches"]:
+                field = match_info["field"]
+                expected = match_info["expected"]
+                actual = match_info["actual"]
+                matches = match_info["matches"]
+                char_count = match_info["char_count"]
+                char_limit = match_info["limit"]
+                similarity = match_info["similarity"]
+
+                within_limit = char_count <= char_limit if char_limit else True
+                limit_text = f"{char_count}/{char_limit} chars" if char_limit else f"{char_count} chars"
+
+                # Display match status
+                if matches and within_limit:
+                    accents = ", accents differ" if match_info["accents_differ"] else ""
+                    st.success(f"✅ **{field}**: Perfect match! ({limit_text}{accents})")
+                elif matches and not within_limit:
+                    st.warning(f"⚠️ **{field}**: Matches but exceeds limit ({limit_text})")
+                else:
+                    # Show comparison
+                    c1, c2 = st.columns(2)
+                    with c1:
+                        status_icon = "✅" if within_limit else "⚠️"
+                        label = REFERENCE_GRADES[match_info["grade"]]
+                        message = f"{label} **{field}**: chrF {similarity:.0f}, edit similarity {match_info['edit_similarity']:.0%} ({limit_text} {status_icon})"
+                        if match_info["grade"] == "miss":
+                            st.error(message)
+                        else:
+                            st.warning(message)
+                        st.text("Expected:")
+                        st.code(expected, language="text")
+                    with c2:
+                        st.text("Got:")
+                        st.code(actual, language="text")
+
+    else:
+        st.error(f"⚠️ Invalid JSON output")
+        st.code(result_data.get("raw", ""), language="text")
+        st.error(result_data.get("error", "Unknown error"))
+
+        # Debug information for failed translations
+        with st.expander("🔧 Debug Information", expanded=False):
+            st.markdown("**Formatted Prompt Sent to API:**")
+            st.code(result_data.get("prompt", "N/A"), language="text")
+
+def render_run(run: Dict[str, Any]) -> None:
+    """Show a finished run from its stored data; no API calls, no re-validation"""
+    st.caption(f"🆔 Run {run['id']} · {', '.join(run['models'])} · {len(run['languages'])} language(s)")
+    if run["mode"] == "compare":
+        render_comparison(run)
+    else:
+        render_translation(run)
+
+def render_run_history(store: RunStore) -> None:
+    """Reload, diff or delete stored runs"""
+    history = store.history()
+    if not history:
+        return
+    current = st.session_state.get("run")
+    with st.expander(f"🗂️ Run history ({len(history)} stored)", expanded=False):
+        labels = {
+            entry["id"]: f"{entry['id']} · {', '.join(entry['models'])} · {entry['languages']} language(s) · {entry['valid']} valid · ${entry['cost']:.4f}"
+            for entry in history
+        }
+        run_id = st.selectbox("Stored run", list(labels), format_func=labels.get)
+        load_col, diff_col, delete_col = st.columns(3)
+        with load_col:
+            if st.button("📂 Load", use_container_width=True):
+                st.session_state["run"] = store.load(run_id)
+                st.rerun()
+        with diff_col:
+            show_diff = st.button(
+                "🆚 Diff with shown run",
+                disabled=current is None or current["id"] == run_id,
+                use_container_width=True
+            )
+        with delete_col:
+            if st.button("🗑️ Delete", use_container_width=True):
+                store.delete(run_id)
+                if current is not None and current["id"] == run_id:
+                    del st.session_state["run"]
+                st.rerun()
+        if show_diff:
+            diff = diff_runs(store.load(run_id), current)
+            st.caption(f"{run_id} → {current['id']}: {len(diff['rows'])} key(s) differ")
+            st.dataframe(diff["languages"], use_container_width=True, hide_index=True)
+            if diff["rows"]:
+                # Values may be strings, nested objects or absent; show them all as text
+                st.dataframe(
+                    [
+                        {**row, "before": "" if row["before"] is None else str(row["before"]), "after": "" if row["after"] is None else str(row["after"])}
+                        for row in diff["rows"]
+                    ],
+                    use_container_width=True,
+                    hide_index=True
+                )
 
-        output_lines.append(f"\n{'='*80}")
-        output_lines.append(f"LANGUAGE: {language}")
-        output_lines.append(f"{'='*80}\n")
-
-        # Show hero_headline comparison
-        if "hero_headline" in result_parsed:
-            output_lines.append("HERO HEADLINE:")
-            output_lines.append(f"  Translation: {result_parsed['hero_headline']}")
-            output_lines.append(f"  Char count:  {len(result_parsed['hero_headline'])} / 20")
-            if language in REFERENCE_TRANSLATIONS and "hero_headline" in REFERENCE_TRANSLATIONS[language]:
-                ref = REFERENCE_TRANSLATIONS[language]["hero_headline"]
-                match_status = "✅ MATCH" if result_parsed['hero_headline'].lower() == ref.lower() else "❌ NO MATCH"
-                output_lines.append(f"  Reference:   {ref}")
-                output_lines.append(f"  Status:      {match_status}")
-            output_lines.append("")
-
-        # Show hero_subheadline comparison
-        if "hero_subheadline" in result_parsed:
-            output_lines.append("HERO SUBHEADLINE:")
-            output_lines.append(f"  Translation: {result_parsed['hero_subheadline']}")
-            output_lines.append(f"  Char count:  {len(result_parsed['hero_subheadline'])} / 24")
-            if language in REFERENCE_TRANSLATIONS and "hero_subheadline" in REFERENCE_TRANSLATIONS[language]:
-                ref = REFERENCE_TRANSLATIONS[language]["hero_subheadline"]
-                match_status = "✅ MATCH" if result_parsed['hero_subheadline'].lower() == ref.lower() else "❌ NO MATCH"
-                output_lines.append(f"  Reference:   {ref}")
-                output_lines.append(f"  Status:      {match_status}")
-            output_lines.append("")
-
-        # Show other fields
-        output_lines.append("OTHER FIELDS:")
-        for key, value in result_parsed.items():
-            if key not in ["hero_headline", "hero_subheadline"]:
-                output_lines.append(f"  {key}: {value}")
-        output_lines.append("")
-
-    output_lines.append("=" * 80)
-    output_lines.append("END OF RESULTS")
-    output_lines.append("=" * 80)
-
-    return "\n".join(output_lines)
-
-def evaluate_against_reference(translation: Dict[str, Any], target_language: str) -> Dict[str, Any]:
-    """Evaluate translation against reference translations"""
-    # Check if we have reference translations for this language
-    if target_language not in REFERENCE_TRANSLATIONS:
-        return {"has_reference": False}
-
-    reference = REFERENCE_TRANSLATIONS[target_language]
-    results = {"has_reference": True, "matches": []}
-
-    # Check hero_headline
-    if "hero_headline" in translation and "hero_headline" in reference:
-        actual = translation["hero_headline"].strip()
-        expected = reference["hero_headline"]
-        matches = actual.lower() == expected.lower()
-        results["matches"].append({
-            "field": "hero_headline",
-            "expected": expected,
-            "actual": actual,
-            "matches": matches,
-            "char_count": len(actual)
-        })
-
-    # Check hero_subheadline
-    if "hero_subheadline" in translation and "hero_subheadline" in reference:
-        actual = translation["hero_subheadline"].strip()
-        expected = reference["hero_subheadline"]
-        matches = actual.lower() == expected.lower()
-        results["matches"].append({
-            "field": "hero_subheadline",
-            "expected": expected,
-            "actual": actual,
-            "matches": matches,
-            "char_count": len(actual)
-        })
-
-    return results
+def render_jobs(job_queue: JobQueue, store: RunStore) -> bool:
+    """Queue metrics and recent background jobs with progress, cancel and load; True while any is active"""
+    jobs = job_queue.jobs(limit=10)
+    if not jobs:
+        return False
+    active = [job for job in jobs if job["status"] in ACTIVE]
+    with st.expander(f"🧵 Background jobs ({len(active)} active)", expanded=bool(active)):
+        metrics = job_queue.metrics()
+        eta = f" · ETA {metrics['eta_seconds']:.0f}s" if metrics["eta_seconds"] and (metrics["queued"] or metrics["running"]) else ""
+        st.caption(
+            f"📥 {metrics['queued']} language(s) queued, {metrics['running']} running · "
+            f"👷 {metrics['busy_workers']}/{metrics['workers']} worker(s) busy · "
+            f"⚡ {metrics['languages_per_minute']:.1f} language(s)/min, {metrics['keys_per_minute']:.0f} key(s)/min{eta}"
+        )
+        for job in jobs:
+            counts = job["counts"]
+            st.progress(
+                job["progress"],
+                text=f"{job['id']} · {job['label']} · {job['status']} · ✅ {counts['done']} ⏳ {counts['running']} "
+                     f"🕓 {counts['queued']} ❌ {counts['failed']} ⏹️ {counts['cancelled']} · {job['elapsed']:.0f}s"
+            )
+            if job["status"] in ACTIVE:
+                if st.button("⏹️ Cancel", key=f"cancel_job_{job['id']}"):
+                    job_queue.cancel(job["id"])
+                    job_queue.finalize(job["id"], store)
+                    st.rerun()
+            elif job["run_id"] and st.button("📂 Load", key=f"load_job_{job['id']}"):
+                st.session_state["run"] = store.load(job["run_id"])
+                st.rerun()
+    return bool(active)
 
 def main():
     st.title("🌐 Translation Prompt Tester")
     st.markdown("Test translation prompts with Claude Opus and GPT-5.1")
 
-    # Load default prompt template
-    default_prompt = load_prompt_template()
-    if not default_prompt:
-        default_prompt = ""
-
     # Create two columns for input and output
     col1, col2 = st.columns([1, 1])
 
@@ -364,10 +490,24 @@ def main():
         # Model selection
         model_choice = st.selectbox(
             "Select Translation Model",
-            ["Claude Opus 4.5", "Claude Sonnet 4.5", "GPT-5.1", "Gemini 3 Pro"],
+            list(MODELS.keys()),
             help="Choose which AI model to use for translation"
         )
 
+        # Side-by-side comparison
+        compare_mode = st.checkbox(
+            "🆚 Compare models side by side",
+            value=False,
+            help="Run every selected model on every language at once and show one comparison grid"
+        )
+        compare_choices = []
+        if compare_mode:
+            compare_choices = st.multiselect(
+                "Models to compare",
+                options=list(MODELS.keys()),
+                default=list(MODELS.keys())
+            )
+
         # Temperature slider
         temperature = st.slider(
             "Temperature",
@@ -378,16 +518,167 @@ def main():
             help="Lower values = more consistent, Higher values = more creative"
         )
 
+        # Concurrency limits and chunking
+        with st.expander("⚙️ Concurrency & Chunking", expanded=False):
+            st.markdown("Max in-flight requests per provider. All languages and chunks are sent at once up to these limits.")
+            concurrency_limits = {
+                provider: st.number_input(
+                    f"{provider.capitalize()} limit",
+                    min_value=1,
+                    max_value=32,
+                    value=default,
+                    step=1
+                )
+                for provider, default in DEFAULT_CONCURRENCY.items()
+            }
+            st.markdown("Rate limits per provider (0 = unlimited). Rate-limited and overloaded calls are retried with backoff, honouring Retry-After.")
+            rate_limits = []
+            for provider in DEFAULT_CONCURRENCY:
+                rate = DEFAULT_RATE_LIMITS.get(provider, {})
+                rpm_col, tpm_col = st.columns(2)
+                with rpm_col:
+                    rpm = st.number_input(
+                        f"{provider.capitalize()} requests/min",
+                        min_value=0,
+                        value=rate.get("requests_per_minute", 0),
+                        step=10
+                    )
+                with tpm_col:
+                    tpm = st.number_input(
+                        f"{provider.capitalize()} input tokens/min",
+                        min_value=0,
+                        value=rate.get("tokens_per_minute", 0),
+                        step=10000
+                    )
+                rate_limits.append((provider, rpm, tpm))
+            chunk_tokens = st.number_input(
+                "Chunk size (source tokens, 0 = model default)",
+                min_value=0,
+                max_value=20000,
+                value=0,
+                step=250,
+                help="Large JSON inputs are split into key groups of about this many tokens and translated in parallel"
+            )
+
+        # Background jobs
+        job_queue = get_job_queue()
+        with st.expander("🧵 Background Jobs", expanded=False):
+            run_in_background = st.checkbox(
+                "Run in background",
+                value=False,
+                help="Queue the run for worker processes instead of translating in this page. It keeps going through reruns, closed tabs and restarts; each finished language is saved as it lands"
+            )
+            worker_count = st.number_input(
+                "Worker processes",
+                min_value=1,
+                max_value=32,
+                value=DEFAULT_WORKERS,
+                step=1,
+                help="Started on demand; concurrency and rate limits apply to each worker"
+            )
+
+        # Translation cache
+        translation_cache = get_translation_cache()
+        with st.expander("🗄️ Translation Cache", expanded=False):
+            use_cache = st.checkbox(
+                "Use cached translations",
+                value=True,
+                help="Reuse responses for identical model, temperature and prompt. Unchecked = always call the API (fresh responses still refresh the cache)."
+            )
+            cache_stats = translation_cache.stats()
+            st.caption(
+                f"{cache_stats['entries']} cached responses · "
+                f"{cache_stats['size_bytes'] / 1024:.0f} KB · "
+                f"{cache_stats['hits']} hits / {cache_stats['misses']} misses this process"
+            )
+            flight_stats = SINGLE_FLIGHT.stats()
+            st.caption(
+                f"🔗 {flight_stats['saved']} call(s) saved by sharing identical in-flight requests, "
+                f"{flight_stats['calls']} made this process"
+            )
+            if st.button("Clear cache"):
+                translation_cache.clear()
+                st.rerun()
+
+        # Streaming
+        stream_responses = st.checkbox(
+            "⚡ Stream responses",
+            value=True,
+            help="Show each key as soon as it is translated, check it immediately and stop calls whose output is already broken JSON"
+        )
+
+        # Incremental translation
+        key_memory = get_key_memory()
+        incremental = st.checkbox(
+            "🧠 Only translate changed keys",
+            value=True,
+            help="Reuse earlier translations of unchanged source strings that passed the checks (same model, template, temperature and candidates) and send only new or edited keys to the model"
+        )
+
+        # Approved translations
+        glossary = None
+        glossary_paths = ()
+        with st.expander("📖 Glossary", expanded=False):
+            use_glossary = st.checkbox(
+                "Use glossary",
+                value=DEFAULT_GLOSSARY_PATH.exists(),
+                help="Strings with an approved translation skip the model; similar ones are added to the prompt as terminology hints"
+            )
+            glossary_input = st.text_input(
+                "Files or folders (comma-separated)",
+                value=str(DEFAULT_GLOSSARY_PATH),
+                help="JSON ({\"French\": {\"Sign up\": \"S'inscrire\"}}), or JSONL/CSV/TSV rows with language, source and translation"
+            )
+            if use_glossary:
+                glossary_paths = tuple(path.strip() for path in glossary_input.split(",") if path.strip())
+                try:
+                    glossary = get_glossary(glossary_paths, glossary_stamps(glossary_paths))
+                    st.caption(f"{len(glossary):,} approved translation(s) in {len(glossary.languages())} language(s) from {len(glossary.files)} file(s)")
+                except (OSError, ValueError, KeyError) as e:
+                    st.error(f"Could not load glossary: {e}")
+
+        # Provider prompt caching
+        prompt_caching = st.checkbox(
+            "♻️ Provider prompt caching",
+            value=True,
+            help="Send the template as a language-independent prefix (the language is named in the <input> block) so providers bill repeat reads at cache prices"
+        )
+
+        # Best-of-n sampling
+        samples = st.number_input(
+            "🎯 Candidates per language",
+            min_value=1,
+            max_value=8,
+            value=1,
+            step=1,
+            help="Sample this many translations in parallel and keep the best one: passing every check first, then closest to the reference. Costs one call per candidate (one prompt for GPT), takes about as long as one. Disables streaming."
+        )
+
+        # Targeted repair of keys failing the checks
+        repair_rounds = DEFAULT_REPAIR_ROUNDS if st.checkbox(
+            "🩹 Repair failing keys",
+            value=True,
+            help="Send only keys with broken placeholders, an altered 'Cashy', over-long text or missing values back with a short fix-up prompt (up to 2 rounds) instead of re-running the language"
+        ) else 0
+
         # Prompt editor
         st.subheader("Translation Prompt")
+        template_choice = st.selectbox(
+            "Prompt template",
+            list(PROMPT_TEMPLATES.keys()),
+            help="Shipped templates are read once and re-read only when the file changes on disk"
+        )
+        default_prompt = load_default_prompt(PROMPT_TEMPLATES[template_choice])
         with st.expander("✏️ Edit Prompt Template", expanded=False):
             st.markdown("**Variables:** `${targetLanguage}`, `${jsonInput}`")
+            # One editor per template, so edits survive switching back and forth
             prompt_template = st.text_area(
                 "Prompt Template",
                 value=default_prompt,
                 height=400,
                 help="Edit the prompt template. Variables: ${targetLanguage} and ${jsonInput}",
-                label_visibility="collapsed"
+                label_visibility="collapsed",
+                key=f"prompt_template_{template_choice}"
             )
 
         # Target language configuration
@@ -421,20 +712,13 @@ def main():
         st.subheader("JSON to Translate")
         json_input = st.text_area(
             "Input JSON",
-            value="""{
-  "hero_headline": "ZERO BS CASINO",
-  "hero_subheadline": "CASH REWARDS ONLY",
-  "hero_bullet_no_wagering": "No wagering requirements",
-  "hero_bullet_fast_payouts": "Super fast payouts",
-  "hero_bullet_no_limits": "No limits on wins & withdrawals",
-  "hero_cta_signup": "Sign up"
-}""",
+            value=SAMPLE_JSON,
             height=300,
             help="The JSON object to translate"
         )
 
         # Validate input JSON
-        json_valid, json_parsed, json_error = validate_json(json_input)
+        json_valid, json_parsed, json_error = validate_json(json_input, recover=False)
         if not json_valid:
             st.error(json_error)
 
@@ -442,173 +726,229 @@ def main():
         translate_button = st.button(
             "🚀 Translate",
             type="primary",
-            disabled=not json_valid or not selected_languages,
+            disabled=not json_valid or not selected_languages or (compare_mode and not compare_choices),
             use_container_width=True
         )
 
     with col2:
         st.header("Translation Results")
+        run_store = get_run_store()
+        run = None
+
+        if translate_button and run_in_background:
+            models = {name: MODELS[name] for name in (compare_choices if compare_mode else [model_choice])}
+            job_id = job_queue.enqueue(job_spec(
+                "compare" if compare_mode else "translate",
+                json_parsed, json_input, prompt_template, selected_languages, models,
+                temperature=temperature,
+                use_cache=use_cache,
+                incremental=incremental,
+                chunk_tokens=chunk_tokens,
+                prompt_caching=prompt_caching,
+                repair_rounds=repair_rounds,
+                samples=samples,
+                glossary=glossary_paths if glossary is not None else (),
+                concurrency=concurrency_limits,
+                rate_limits=tuple(rate_limits),
+                settings={"temperature": temperature, "template": template_choice, "samples": samples, "glossary": glossary is not None}
+            ))
+            ensure_workers(job_queue, worker_count)
+            st.success(f"🧵 Queued job {job_id}; follow it under \"Background jobs\" and load the run when it is done")
+
+        elif translate_button and compare_mode:
+            registry = get_provider_registry()
+            limiter = get_provider_limiter(
+                concurrency_limits["anthropic"],
+                concurrency_limits["openai"],
+                concurrency_limits["gemini"],
+                tuple(rate_limits)
+            )
+            runners = {
+                name: (MODELS[name], registry.translate_fn(MODELS[name]))
+                for name in compare_choices
+            }
+
+            tracer = Tracer()
+            with st.spinner(f"Translating {len(selected_languages)} language(s) with {len(runners)} model(s)..."):
+                started = time.perf_counter()
+                results_by_model, stats_by_model = compare_models(
+                    source=json_parsed,
+                    json_input=json_input,
+                    languages=selected_languages,
+                    template=prompt_template,
+                    runners=runners,
+                    temperature=temperature,
+                    limiter=limiter,
+                    cache=translation_cache,
+                    key_memory=key_memory,
+                    use_cache=use_cache,
+                    incremental=incremental,
+                    chunk_tokens=chunk_tokens,
+                    tracer=tracer,
+                    prompt_caching=prompt_caching,
+                    repair_rounds=repair_rounds,
+                    samples=samples,
+                    glossary=glossary
+                )
+                wall = time.perf_counter() - started
+
+            run = make_run(
+                "compare", json_parsed, json_input, prompt_template, selected_languages,
+                results_by_model, stats_by_model,
+                settings={"temperature": temperature, "template": template_choice, "samples": samples, "glossary": glossary is not None},
+                spans=tracer.spans,
+                elapsed=wall
+            )
 
-        if translate_button:
-            # Translate selected languages
-            all_results = {}
-
-            with st.spinner(f"Translating to {len(selected_languages)} language(s)..."):
-                for language in selected_languages:
-                    # Format the prompt
-                    formatted_prompt = format_prompt(
-                        template=prompt_template,
-                        target_language=language,
-                        json_input=json_input
-                    )
+        elif translate_button:
+            model = MODELS[model_choice]
+            limiter = get_provider_limiter(
+                concurrency_limits["anthropic"],
+                concurrency_limits["openai"],
+                concurrency_limits["gemini"],
+                tuple(rate_limits)
+            )
+            # Resolve the cached registry here so worker threads never touch Streamlit
+            registry = get_provider_registry()
+            translate_fn = registry.translate_fn(model)
+            stream_fn = registry.stream_fn(model) if stream_responses else None
+            sample_fn = registry.sample_fn(model)
+
+            # One tab per language: values while they stream in, then the full result (checks, reference
+            # evaluation) as soon as that language is done. Replaced by the stored run at the end
+            progress_area = st.empty()
+            cancel_area = st.empty()
+            live_area = st.empty()
+            live_views = {}
+            with live_area.container():
+                live_tabs = st.tabs(selected_languages)
+                for idx, language in enumerate(selected_languages):
+                    with live_tabs[idx]:
+                        live_views[language] = st.empty()
+            live_values = {language: {} for language in selected_languages}
+            live_first_token = {}
+            live_started = set()
+            live_results = {}
+            source_facts = SourceFacts(json_parsed)
+            events = queue.Queue()
+            tracer = Tracer()
+            cancel = threading.Event()
+
+            def render_live(language: str) -> None:
+                if language in live_results:
+                    result_data = live_results[language]
+                    parsed = result_data["parsed"] if result_data["valid"] else None
+                    with live_views[language].container():
+                        render_language_result(language, result_data, source_facts.validate({language: parsed}))
+                    return
+                lines = []
+                if language in live_first_token:
+                    lines.append(f"⏱️ First token after {live_first_token[language]:.2f}s")
+                for key, (value, problems) in live_values[language].items():
+                    flag = f" ⚠️ {', '.join(problems)}" if problems else " ✅"
+                    lines.append(f"- **{key}**: {value}{flag}")
+                waiting = "⏳ Waiting for response..." if language in live_started else "🕓 Queued..."
+                live_views[language].markdown("\n".join(lines) or waiting)
+
+            def render_progress(elapsed: float) -> None:
+                done = sum(1 for result_data in live_results.values() if result_data["valid"])
+                failed = len(live_results) - done
+                in_flight = len(live_started - set(live_results))
+                queued = len(selected_languages) - len(live_results) - in_flight
+                progress_area.progress(
+                    len(live_results) / len(selected_languages),
+                    text=f"✅ {done} done · ⏳ {in_flight} in flight · 🕓 {queued} queued · ❌ {failed} failed · {elapsed:.1f}s"
+                )
 
-                    # Call appropriate model
-                    if model_choice == "Claude Opus 4.5":
-                        result = translate_with_opus(formatted_prompt, temperature)
-                    elif model_choice == "Claude Sonnet 4.5":
-                        result = translate_with_sonnet(formatted_prompt, temperature)
-                    elif model_choice == "GPT-5.1":
-                        result = translate_with_gpt(formatted_prompt, temperature)
-                    else:  # Gemini 3 Pro
-                        result = translate_with_gemini(formatted_prompt, temperature)
-
-                    # Store result
-                    if result:
-                        result_valid, result_parsed, result_error = validate_json(result)
-                        all_results[language] = {
-                            "valid": result_valid,
-                            "parsed": result_parsed,
-                            "error": result_error,
-                            "raw": result,
-                            "prompt": formatted_prompt
-                        }
-                    else:
-                        all_results[language] = {
-                            "valid": False,
-                            "parsed": None,
-                            "error": "Translation failed",
-                            "raw": None,
-                            "prompt": formatted_prompt
-                        }
-
-            # Add copy button for all results
-            st.subheader("📋 Copy All Results")
-            # Filter compile function to only show selected languages
-            filtered_results = {lang: all_results[lang] for lang in selected_languages if lang in all_results}
-            compiled_results = compile_all_results_for_copy(filtered_results, json_parsed)
-
-            with st.expander("View/Copy All Translation Results", expanded=False):
-                st.code(compiled_results, language="text")
-                st.info("💡 Tip: Click the copy button in the top-right corner of the code block above to copy all results")
-
-            # Display results in tabs
-            tabs = st.tabs(selected_languages)
-
-            for idx, language in enumerate(selected_languages):
-                with tabs[idx]:
-                    result_data = all_results.get(language)
-
-                    if not result_data:
-                        st.error("No result for this language")
-                        continue
-
-                    if result_data["valid"]:
-                        result_parsed = result_data["parsed"]
-
-                        # Show formatted JSON
-                        st.code(json.dumps(result_parsed, indent=2, ensure_ascii=False), language="json")
-
-                        # Debug information
-                        with st.expander("🔧 Debug Information", expanded=False):
-                            st.markdown("**Formatted Prompt Sent to API:**")
-                            st.code(result_data.get("prompt", "N/A"), language="text")
-
-                            st.markdown("**Raw API Response:**")
-                            st.code(result_data.get("raw", "N/A"), language="text")
-
-                        # Validation checks
-                        st.subheader("🔍 Validation Checks")
-
-                        checks = []
-
-                        # Check 1: Same keys
-                        input_keys = set(json_parsed.keys())
-                        output_keys = set(result_parsed.keys())
-                        keys_match = input_keys == output_keys
-                        checks.append(("Same keys", keys_match))
-
-                        # Check 2: Cashy preserved
-                        result_str = json.dumps(result_parsed)
-                        cashy_preserved = "Cashy" in result_str or "cashy" not in result_str.lower()
-                        checks.append(("Brand name 'Cashy' preserved", cashy_preserved))
-
-                        # Check 3: Placeholders
-                        input_values = ' '.join(str(v) for v in json_parsed.values())
-                        output_values = ' '.join(str(v) for v in result_parsed.values())
-                        input_placeholders = set(re.findall(r'\{[a-zA-Z_][a-zA-Z0-9_]*\}', input_values))
-                        output_placeholders = set(re.findall(r'\{[a-zA-Z_][a-zA-Z0-9_]*\}', output_values))
-                        placeholders_preserved = input_placeholders == output_placeholders or len(input_placeholders) == 0
-                        checks.append(("Placeholders preserved", placeholders_preserved))
-
-                        # Display checks
-                        for check_name, passed in checks:
-                            if passed:
-                                st.success(f"✅ {check_name}")
-                            else:
-                                st.error(f"❌ {check_name}")
-
-                        # Reference translation evaluation
-                        eval_results = evaluate_against_reference(result_parsed, language)
-
-                        if eval_results["has_reference"]:
-                            st.subheader("📚 Reference Match Evaluation")
-
-                            for match_info in eval_results["matches"]:
-                                field = match_info["field"]
-                                expected = match_info["expected"]
-                                actual = match_info["actual"]
-                                matches = match_info["matches"]
-                                char_count = match_info["char_count"]
-
-                                # Determine character limit
-                                if field == "hero_headline":
-                                    char_limit = 20
-                                elif field == "hero_subheadline":
-                                    char_limit = 24
-                                else:
-                                    char_limit = None
-
-                                within_limit = char_count <= char_limit if char_limit else True
-
-                                # Display match status
-                                if matches and within_limit:
-                                    st.success(f"✅ **{field}**: Perfect match! ({char_count}/{char_limit} chars)")
-                                elif matches and not within_limit:
-                                    st.warning(f"⚠️ **{field}**: Matches but exceeds limit ({char_count}/{char_limit} chars)")
-                                else:
-                                    # Show comparison
-                                    c1, c2 = st.columns(2)
-                                    with c1:
-                                        status_icon = "✅" if within_limit else "⚠️"
-                                        st.error(f"❌ **{field}** ({char_count}/{char_limit} chars {status_icon})")
-                                        st.text("Expected:")
-                                        st.code(expected, language="text")
-                                    with c2:
-                                        st.text("Got:")
-                                        st.code(actual, language="text")
-
-                    else:
-                        st.error(f"⚠️ Invalid JSON output")
-                        st.code(result_data.get("raw", ""), language="text")
-                        st.error(result_data.get("error", "Unknown error"))
-
-                        # Debug information for failed translations
-                        with st.expander("🔧 Debug Information", expanded=False):
-                            st.markdown("**Formatted Prompt Sent to API:**")
-                            st.code(result_data.get("prompt", "N/A"), language="text")
+            started = time.perf_counter()
+            executor = ThreadPoolExecutor(max_workers=1)
+            future = executor.submit(
+                translate_json,
+                source=json_parsed,
+                json_input=json_input,
+                languages=selected_languages,
+                template=prompt_template,
+                model=model,
+                translate=translate_fn,
+                temperature=temperature,
+                limiter=limiter,
+                cache=translation_cache,
+                key_memory=key_memory,
+                use_cache=use_cache,
+                incremental=incremental,
+                chunk_tokens=chunk_tokens,
+                prompt_caching=prompt_caching,
+                repair_rounds=repair_rounds,
+                samples=samples,
+                sample=sample_fn,
+                stream=stream_fn,
+                on_event=events.put,
+                on_result=lambda language, result: events.put({"type": "result", "language": language, "result": result}),
+                cancel=cancel,
+                glossary=glossary,
+                tracer=tracer
+            )
+            executor.shutdown(wait=False)
+
+            def finish_run() -> Dict[str, Any]:
+                all_results, run_stats = future.result()
+                return make_run(
+                    "translate", json_parsed, json_input, prompt_template, selected_languages,
+                    {model_choice: all_results}, {model_choice: run_stats},
+                    settings={"temperature": temperature, "template": template_choice, "samples": samples, "glossary": glossary is not None},
+                    spans=tracer.spans,
+                    elapsed=time.perf_counter() - started
+                )
 
+            cancel_area.button("⏹️ Cancel outstanding calls", key="cancel_translation")
+            try:
+                # Drain worker events on the script thread, the only one allowed to draw
+                while True:
+                    finished = future.done()
+                    changed = set()
+                    while not events.empty():
+                        event = events.get_nowait()
+                        language = event["language"]
+                        if event["type"] == "start":
+                            live_started.add(language)
+                        elif event["type"] == "first_token":
+                            live_first_token[language] = min(event["elapsed"], live_first_token.get(language, event["elapsed"]))
+                        elif event["type"] == "value":
+                            live_values[language][event["key"]] = (event["value"], event["problems"])
+                        elif event["type"] == "result":
+                            live_results[language] = event["result"]
+                        changed.add(language)
+                    for language in changed:
+                        render_live(language)
+                    render_progress(time.perf_counter() - started)
+                    if finished:
+                        break
+                    time.sleep(0.1)
+            except BaseException:
+                # Clicking Cancel (or any other control) stops this script run and starts a new one:
+                # skip the calls not yet sent, wait for those in flight and keep what finished
+                cancel.set()
+                st.session_state["run"] = finish_run()
+                run_store.save(st.session_state["run"])
+                raise
+
+            run = finish_run()
+            progress_area.empty()
+            cancel_area.empty()
+            live_area.empty()
+
+        if run is not None:
+            # Keep the run across reruns (tabs, expanders, widget changes) and in the on-disk history
+            run_store.save(run)
+            st.session_state["run"] = run
+            render_limiter_status(limiter)
+
+        if "run" in st.session_state:
+            render_run(st.session_state["run"])
         else:
             st.info("👈 Select languages, configure settings, and click 'Translate' to see results")
+        render_run_history(run_store)
+        jobs_active = render_jobs(job_queue, run_store)
 
     # Sidebar with information
     with st.sidebar:
@@ -634,5 +974,10 @@ def main():
         - Always validate JSON output before use
         """)
 
+    # Poll the queue while background jobs run; the page is already drawn
+    if jobs_active:
+        time.sleep(JOB_REFRESH_INTERVAL)
+        st.rerun()
+
 if __name__ == "__main__":
     main()
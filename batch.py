@@ -0,0 +1,261 @@
+import json
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from glossary import Glossary
+from incremental import KeyMemory
+from providers import Completion, ProviderRegistry
+from telemetry import Tracer
+from translation_cache import TranslationCache, make_cache_key
+from translator import collect_results, plan_prompt, plan_tasks, plan_translation
+
+DEFAULT_BATCH_DIR = Path(__file__).parent / ".cache" / "batches"
+
+# Batch endpoints bill at half the interactive price (Anthropic and OpenAI)
+BATCH_PRICE_FACTOR = 0.5
+
+# Seconds between status checks; batches usually finish within the hour
+DEFAULT_POLL_INTERVAL = 30.0
+
+# Job states, in order; each transition is saved before moving on
+PLANNED = "planned"
+SUBMITTING = "submitting"
+SUBMITTED = "submitted"
+ENDED = "ended"
+FETCHED = "fetched"
+DONE = "done"
+
+
+def batch_pricing(model: Dict[str, Any]) -> Dict[str, Any]:
+    """Model config with batch prices, for cost estimates"""
+    priced = dict(model)
+    for field in ("price_per_mtok", "cache_price_per_mtok"):
+        if field in model:
+            priced[field] = tuple(price * BATCH_PRICE_FACTOR for price in model[field])
+    return priced
+
+
+class BatchJob:
+    """A language x chunk translation run on a provider's batch endpoint, persisted as a JSON manifest
+
+    The manifest holds everything needed to finish the run in another process:
+    the model, each file's source and translation plan, the provider batch id
+    and, once fetched, the raw results. Every state change is written before
+    the next step, so run() after a crash resumes where the last one stopped
+    (a crash during the submit call itself may leave an orphaned batch).
+    """
+
+    def __init__(self, manifest: Dict[str, Any], path: Path):
+        self.manifest = manifest
+        self.path = Path(path)
+
+    @classmethod
+    def create(
+        cls,
+        files: List[Tuple[str, Dict[str, Any], str]],
+        languages: List[str],
+        template: str,
+        model: Dict[str, Any],
+        temperature: float = 0.3,
+        key_memory: Optional[KeyMemory] = None,
+        incremental: bool = True,
+        chunk_tokens: int = 0,
+        prompt_caching: bool = True,
+        metadata: Optional[Dict[str, Any]] = None,
+        directory: Path = DEFAULT_BATCH_DIR,
+        glossary: Optional[Glossary] = None
+    ) -> "BatchJob":
+        """Plan a job over (name, source, json_input) files and save it, without submitting
+
+        metadata is stored as-is for the caller (e.g. the template path for reports).
+        Glossary hits and hints are fixed in the stored plans.
+        """
+        job_id = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:8]
+        parts = []
+        requests = {}
+        for file_index, (name, source, json_input) in enumerate(files):
+            plan = plan_translation(
+                source, json_input, languages, template, model,
+                key_memory=key_memory,
+                incremental=incremental,
+                chunk_tokens=chunk_tokens,
+                prompt_caching=prompt_caching,
+                glossary=glossary,
+                temperature=temperature
+            )
+            parts.append({"name": name, "source": source, "plan": plan})
+            for language, index in plan_tasks(plan):
+                # custom_id must match [a-zA-Z0-9_-]{1,64}
+                custom_id = f"f{file_index}-l{languages.index(language)}-c{index}"
+                requests[custom_id] = [file_index, language, index]
+
+        job = cls({
+            "job_id": job_id,
+            "status": PLANNED,
+            "model": model,
+            "temperature": temperature,
+            "languages": list(languages),
+            "files": parts,
+            "requests": requests,
+            "batch_id": None,
+            "provider_status": None,
+            "counts": {},
+            "created_at": time.time(),
+            "submitted_at": None,
+            "ended_at": None,
+            "results": {},
+            "metadata": metadata or {},
+        }, Path(directory) / f"{job_id}.json")
+        job.save()
+        return job
+
+    @classmethod
+    def load(cls, path: Path) -> "BatchJob":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f), Path(path))
+
+    def save(self) -> None:
+        """Write the manifest atomically so a crash never leaves it half-written"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temporary = self.path.with_suffix(".tmp")
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self.manifest, f, ensure_ascii=False)
+        os.replace(temporary, self.path)
+
+    @property
+    def status(self) -> str:
+        return self.manifest["status"]
+
+    def _set(self, **fields: Any) -> None:
+        self.manifest.update(fields)
+        self.save()
+
+    def _prompt(self, custom_id: str) -> str:
+        file_index, language, index = self.manifest["requests"][custom_id]
+        return plan_prompt(self.manifest["files"][file_index]["plan"], (language, index))
+
+    def submit(self, registry: ProviderRegistry) -> None:
+        if self.manifest["batch_id"] or not self.manifest["requests"]:
+            return
+        self._set(status=SUBMITTING)
+        prompts = {custom_id: self._prompt(custom_id) for custom_id in self.manifest["requests"]}
+        batch_id = registry.submit_batch(self.manifest["model"], prompts, self.manifest["temperature"])
+        self._set(status=SUBMITTED, batch_id=batch_id, submitted_at=time.time())
+
+    def poll(
+        self,
+        registry: ProviderRegistry,
+        interval: float = DEFAULT_POLL_INTERVAL,
+        timeout: Optional[float] = None,
+        on_status: Optional[Callable[["BatchJob"], None]] = None
+    ) -> bool:
+        """Wait for the provider to finish the batch; False if timeout passed first"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self.status == SUBMITTED:
+            status = registry.batch_status(self.manifest["model"]["provider"], self.manifest["batch_id"])
+            self._set(provider_status=status["status"], counts=status["counts"])
+            if on_status:
+                on_status(self)
+            if status["done"]:
+                self._set(status=ENDED, ended_at=time.time())
+                break
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(interval)
+        return True
+
+    def fetch(self, registry: ProviderRegistry) -> None:
+        if self.status != ENDED:
+            return
+        results = registry.batch_results(self.manifest["model"]["provider"], self.manifest["batch_id"])
+        self._set(status=FETCHED, results={
+            custom_id: {
+                "raw": str(result["raw"]) if result["raw"] is not None else None,
+                "usage": getattr(result["raw"], "usage", {}),
+                "error": result["error"],
+            }
+            for custom_id, result in results.items()
+        })
+
+    def finish(
+        self,
+        key_memory: Optional[KeyMemory] = None,
+        cache: Optional[TranslationCache] = None,
+        tracer: Optional[Tracer] = None
+    ) -> List[Dict[str, Any]]:
+        """Validate and merge results per file: [{"name", "source", "results", "stats"}]
+
+        Successful responses also go into the translation cache under the same
+        key an interactive run would use, so a later run reuses them.
+        """
+        model = self.manifest["model"]
+        priced = batch_pricing(model)
+        submitted_at = self.manifest["submitted_at"] or self.manifest["created_at"]
+        ended_at = self.manifest["ended_at"] or submitted_at
+
+        outcomes: List[Dict[Tuple[str, int], Dict[str, Any]]] = [{} for _ in self.manifest["files"]]
+        for custom_id, (file_index, language, index) in self.manifest["requests"].items():
+            result = self.manifest["results"].get(custom_id) or {"raw": None, "usage": {}, "error": "No result in batch output"}
+            prompt = self._prompt(custom_id)
+            raw = Completion(result["raw"], usage=result["usage"]) if result["raw"] else None
+            if raw and cache is not None:
+                cache_key = make_cache_key(model["model_id"], {"temperature": self.manifest["temperature"]}, prompt)
+                cache.put(cache_key, model["model_id"], raw)
+            outcomes[file_index][(language, index)] = {
+                "raw": raw,
+                "prompt": prompt,
+                "error": "" if raw else (result["error"] or "Translation failed"),
+                "cached": False,
+                "elapsed": ended_at - submitted_at,
+                "queue_wait": 0.0,
+                "started_at": submitted_at,
+                "ended_at": ended_at,
+                "usage": result["usage"],
+                "retries": 0,
+                "first_token": None,
+            }
+
+        finished = []
+        for part, part_outcomes in zip(self.manifest["files"], outcomes):
+            all_results, stats = collect_results(
+                part["plan"], part["source"], priced, part_outcomes,
+                key_memory=key_memory,
+                tracer=tracer
+            )
+            stats["elapsed"] = ended_at - submitted_at
+            finished.append({"name": part["name"], "source": part["source"], "results": all_results, "stats": stats})
+        if self.status != DONE:
+            self._set(status=DONE)
+        return finished
+
+    def run(
+        self,
+        registry: ProviderRegistry,
+        interval: float = DEFAULT_POLL_INTERVAL,
+        timeout: Optional[float] = None,
+        on_status: Optional[Callable[["BatchJob"], None]] = None
+    ) -> bool:
+        """Submit, wait for and fetch the batch, skipping steps already done; False if still running"""
+        if self.status == SUBMITTING and not self.manifest["batch_id"]:
+            # Crashed mid-submit; the provider never acknowledged a batch
+            self._set(status=PLANNED)
+        if self.status == PLANNED:
+            if self.manifest["requests"]:
+                self.submit(registry)
+            else:
+                self._set(status=FETCHED)
+        if self.status == SUBMITTED and not self.poll(registry, interval, timeout, on_status):
+            return False
+        self.fetch(registry)
+        return True
+
+
+def list_jobs(directory: Path = DEFAULT_BATCH_DIR) -> List[BatchJob]:
+    """Saved jobs, newest first"""
+    directory = Path(directory)
+    if not directory.is_dir():
+        return []
+    return [BatchJob.load(path) for path in sorted(directory.glob("*.json"), reverse=True)]
@@ -0,0 +1,315 @@
+import argparse
+import hashlib
+import json
+import statistics
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from dispatch import ProviderLimiter
+from providers import Completion
+from translator import (
+    DEFAULT_TEMPLATE_PATH,
+    REFERENCE_TRANSLATIONS,
+    SAMPLE_JSON,
+    evaluate_against_reference,
+    load_prompt_template,
+    translate_json,
+    validate_json,
+)
+from validation import validate_translations
+
+DEFAULT_FIXTURE_DIR = Path(__file__).parent / "fixtures"
+
+# Per-language checks, in report order; "reference" and "similarity" are scored per field separately
+CHECKS = ("valid", "keys", "placeholders", "cashy", "char_limits")
+
+# Throughput may drop this much below the baseline before --baseline fails the run
+DEFAULT_TOLERANCE = 0.3
+
+
+def prompt_key(prompt: str) -> str:
+    """Recordings are looked up by the exact prompt text"""
+    return hashlib.sha256(str(prompt).encode("utf-8")).hexdigest()
+
+
+class FixtureMiss(LookupError):
+    """Replay asked for a prompt that was never recorded (the template, input or settings changed)"""
+
+
+class RecordingProvider:
+    """Wraps a translate callable and keeps every response, with its usage, by prompt"""
+
+    def __init__(self, translate: Callable[[str, float], Optional[str]]):
+        self.translate = translate
+        self.responses: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt: str, temperature: float = 0.3) -> Optional[str]:
+        raw = self.translate(prompt, temperature)
+        if raw is not None:
+            with self._lock:
+                self.responses[prompt_key(prompt)] = {
+                    "text": str(raw),
+                    "usage": getattr(raw, "usage", None) or {},
+                }
+        return raw
+
+
+class ReplayProvider:
+    """Serves recorded responses instantly, so a replay measures only our own processing"""
+
+    def __init__(self, responses: Dict[str, Dict[str, Any]]):
+        self.responses = responses
+        self.calls = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt: str, temperature: float = 0.3) -> Completion:
+        entry = self.responses.get(prompt_key(prompt))
+        with self._lock:
+            self.calls += 1
+            if entry is None:
+                self.misses += 1
+        if entry is None:
+            raise FixtureMiss("No recorded response for this prompt; re-record the fixture")
+        return Completion(entry["text"], usage=entry["usage"])
+
+
+def score_results(source: Dict[str, Any], all_results: Dict[str, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One row per language: pass/fail per check, reference matches and summed chrF"""
+    validation = validate_translations(
+        source,
+        {language: result["parsed"] if result["valid"] else None for language, result in all_results.items()}
+    )
+    rows = []
+    for language, result in all_results.items():
+        parsed = result["parsed"] if result["valid"] else None
+        checks = dict(validation["languages"][language]["checks"])
+        reference = evaluate_against_reference(parsed or {}, language)
+        rows.append({
+            "language": language,
+            "valid": parsed is not None,
+            "keys": checks.get("Same keys", False),
+            "placeholders": checks.get("Placeholders preserved", False),
+            "cashy": checks.get("Brand name 'Cashy' preserved", False),
+            "char_limits": checks.get("Within char limits", False),
+            "reference_matches": sum(1 for match in reference.get("matches", []) if match["matches"]),
+            "reference_fields": len(REFERENCE_TRANSLATIONS.get(language, {})),
+            "reference_similarity": round(sum(match["similarity"] for match in reference.get("matches", [])), 1),
+            "error": result["error"],
+        })
+    return rows
+
+
+def summarize_scores(rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Pass rate per check, reference match rate and mean chrF, and their mean as the overall score (0-100)
+
+    Fields missing from a translation count as chrF 0.
+    """
+    rates = {check: sum(1 for row in rows if row[check]) / max(1, len(rows)) for check in CHECKS}
+    fields = sum(row["reference_fields"] for row in rows)
+    rates["reference"] = sum(row["reference_matches"] for row in rows) / fields if fields else 0.0
+    rates["similarity"] = sum(row["reference_similarity"] for row in rows) / (100 * fields) if fields else 0.0
+    return {
+        "languages": len(rows),
+        "rates": {name: round(rate, 4) for name, rate in rates.items()},
+        "score": round(100 * statistics.mean(rates.values()), 2),
+    }
+
+
+def record_fixture(
+    path: Path,
+    model: Dict[str, Any],
+    translate: Callable[[str, float], Optional[str]],
+    languages: List[str],
+    template_path: Path = DEFAULT_TEMPLATE_PATH,
+    json_input: str = SAMPLE_JSON,
+    temperature: float = 0.3,
+    prompt_caching: bool = True,
+    repair_rounds: int = 0,
+    chunk_tokens: int = 0
+) -> Dict[str, Any]:
+    """Run the pipeline once against a live provider and save every response as a fixture
+
+    Nothing is served from the translation cache or key memory, so the fixture
+    holds a response for every prompt a replay with the same settings sends.
+    """
+    valid, source, error = validate_json(json_input, recover=False)
+    if not valid:
+        raise ValueError(error)
+    template = load_prompt_template(template_path)
+    settings = {
+        "temperature": temperature,
+        "prompt_caching": prompt_caching,
+        "repair_rounds": repair_rounds,
+        "chunk_tokens": chunk_tokens,
+    }
+    recorder = RecordingProvider(translate)
+    started = time.perf_counter()
+    all_results, stats = translate_json(
+        source=source,
+        json_input=json_input,
+        languages=languages,
+        template=template,
+        model=model,
+        translate=recorder,
+        limiter=ProviderLimiter(),
+        incremental=False,
+        **settings
+    )
+    fixture = {
+        "model": model,
+        # Only a label: the template text itself is stored, so fixtures replay from any checkout
+        "template_path": Path(template_path).name,
+        "template": template,
+        "json_input": json_input,
+        "languages": languages,
+        "settings": settings,
+        "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "live_elapsed": round(time.perf_counter() - started, 3),
+        "live_cost": round(stats["cost"], 6),
+        "responses": recorder.responses,
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(fixture, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    return fixture
+
+
+def replay_fixture(fixture: Dict[str, Any], repeat: int = 5) -> Dict[str, Any]:
+    """Replay a fixture through the full pipeline; scores plus throughput over repeat runs
+
+    Throughput covers prompt building, dispatch, extraction, merging and
+    scoring with zero provider latency, i.e. this codebase's own overhead.
+    """
+    _, source, _ = validate_json(fixture["json_input"], recover=False)
+    size = sum(len(entry["text"].encode("utf-8")) for entry in fixture["responses"].values())
+    walls = []
+    for _ in range(max(1, repeat)):
+        provider = ReplayProvider(fixture["responses"])
+        started = time.perf_counter()
+        all_results, stats = translate_json(
+            source=source,
+            json_input=fixture["json_input"],
+            languages=fixture["languages"],
+            template=fixture["template"],
+            model=fixture["model"],
+            translate=provider,
+            limiter=ProviderLimiter(max_retries=0),
+            incremental=False,
+            **fixture["settings"]
+        )
+        rows = score_results(source, all_results)
+        walls.append(time.perf_counter() - started)
+
+    wall = statistics.median(walls)
+    return {
+        **summarize_scores(rows),
+        "model": fixture["model"]["model_id"],
+        "template": fixture["template_path"],
+        "recorded_at": fixture["recorded_at"],
+        "requests": provider.calls,
+        "misses": provider.misses,
+        "cost": round(stats["cost"], 6),
+        "wall_ms": round(wall * 1000, 3),
+        "languages_per_s": round(len(rows) / wall, 1),
+        "requests_per_s": round(provider.calls / wall, 1),
+        "response_mb_per_s": round(size / wall / 1e6, 2),
+        "rows": rows,
+    }
+
+
+def compare_to_baseline(
+    summaries: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float = DEFAULT_TOLERANCE
+) -> List[str]:
+    """Regressions against a saved run: lower scores, replay misses or throughput below tolerance"""
+    problems = []
+    for name, summary in summaries.items():
+        if summary["misses"]:
+            problems.append(f"{name}: {summary['misses']} prompt(s) not in the fixture")
+        before = baseline.get(name)
+        if before is None:
+            continue
+        for check, rate in summary["rates"].items():
+            if rate < before["rates"].get(check, 0.0):
+                problems.append(f"{name}: {check} {before['rates'][check]:.0%} -> {rate:.0%}")
+        if summary["languages_per_s"] < before["languages_per_s"] * (1 - tolerance):
+            problems.append(f"{name}: throughput {before['languages_per_s']} -> {summary['languages_per_s']} languages/s")
+    return problems
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Record provider responses as fixtures and score/time offline replays")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    record = commands.add_parser("record", help="Translate once with a live model and save its responses")
+    record.add_argument("fixture", type=Path, nargs="?", help="Output path (default: fixtures/<model>__<template>.json)")
+    record.add_argument("-m", "--model", default="opus", help="opus, sonnet, gpt, gemini, a full model name, or 'fake'")
+    record.add_argument("-t", "--template", type=Path, default=DEFAULT_TEMPLATE_PATH)
+    record.add_argument("-i", "--input", type=Path, help="JSON object to translate (default: the app's sample)")
+    record.add_argument("-l", "--languages", default="all")
+    record.add_argument("--temperature", type=float, default=0.3)
+    record.add_argument("--no-prompt-cache", action="store_true")
+    record.add_argument("--repair-rounds", type=int, default=0, help="Also record the repair pass (default: score raw output)")
+    record.add_argument("--chunk-tokens", type=int, default=0)
+
+    replay = commands.add_parser("replay", help="Score and time fixtures without network")
+    replay.add_argument("fixtures", type=Path, nargs="*", help="Fixture files (default: every fixtures/*.json)")
+    replay.add_argument("--repeat", type=int, default=5, help="Timed runs per fixture (median reported)")
+    replay.add_argument("--save", type=Path, help="Write the summaries (a baseline for later runs)")
+    replay.add_argument("--baseline", type=Path, help="Exit 1 if scores drop, prompts miss or throughput falls below this run")
+    replay.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed throughput drop vs --baseline")
+    replay.add_argument("-v", "--verbose", action="store_true", help="Show per-language rows")
+    args = parser.parse_args(argv)
+
+    if args.command == "record":
+        from cli import language_slug, parse_languages, resolve_model
+        model, translate, *_ = resolve_model(args.model)
+        path = args.fixture or DEFAULT_FIXTURE_DIR / f"{language_slug(model['model_id'])}__{args.template.stem}.json"
+        fixture = record_fixture(
+            path, model, translate, parse_languages(args.languages),
+            template_path=args.template,
+            json_input=args.input.read_text(encoding="utf-8") if args.input else SAMPLE_JSON,
+            temperature=args.temperature,
+            prompt_caching=not args.no_prompt_cache,
+            repair_rounds=args.repair_rounds,
+            chunk_tokens=args.chunk_tokens
+        )
+        print(f"Recorded {len(fixture['responses'])} response(s) in {fixture['live_elapsed']}s (est. ${fixture['live_cost']:.4f}): {path}")
+        return 0
+
+    paths = args.fixtures or sorted(DEFAULT_FIXTURE_DIR.glob("*.json"))
+    if not paths:
+        parser.error(f"no fixtures given and none in {DEFAULT_FIXTURE_DIR}")
+    summaries = {}
+    for path in paths:
+        summary = replay_fixture(json.loads(path.read_text(encoding="utf-8")), repeat=args.repeat)
+        rates = "  ".join(f"{name} {rate:>4.0%}" for name, rate in summary["rates"].items())
+        print(f"{path.stem}: score {summary['score']:5.1f}  {rates}")
+        print(
+            f"    {summary['languages']} languages, {summary['requests']} requests in {summary['wall_ms']:.1f} ms "
+            f"({summary['languages_per_s']:,.0f} languages/s, {summary['response_mb_per_s']} MB/s of responses)"
+        )
+        if args.verbose:
+            for row in summary["rows"]:
+                marks = " ".join(f"{check}={'ok' if row[check] else 'FAIL'}" for check in CHECKS)
+                print(f"    {row['language']:<22} {marks} reference={row['reference_matches']}/{row['reference_fields']} chrF={row['reference_similarity'] / max(1, row['reference_fields']):.0f} {row['error']}")
+        summaries[path.stem] = {key: value for key, value in summary.items() if key != "rows"}
+
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        args.save.write_text(json.dumps(summaries, indent=2) + "\n", encoding="utf-8")
+    if args.baseline:
+        problems = compare_to_baseline(summaries, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        for problem in problems:
+            print(f"REGRESSION {problem}")
+        return 1 if problems else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,48 @@
+import json
+from typing import Any, Dict, List
+
+# Translated output can take several times the source tokens (non-Latin scripts)
+OUTPUT_EXPANSION = 3
+
+# Fallback source-token budget per chunk when a model has none configured
+DEFAULT_CHUNK_TOKENS = 1500
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate: ~4 ASCII chars per token, one token per non-ASCII char"""
+    ascii_chars = sum(1 for ch in text if ord(ch) < 128)
+    return max(1, ascii_chars // 4 + (len(text) - ascii_chars))
+
+
+def entry_tokens(key: str, value: Any) -> int:
+    """Estimated tokens one key/value pair adds to a JSON chunk"""
+    return estimate_tokens(json.dumps({key: value}, ensure_ascii=False))
+
+
+def chunk_budget(model: Dict[str, Any], override: int = 0) -> int:
+    """Source tokens per chunk so the translated chunk fits the model's output limit"""
+    budget = override or model.get("chunk_tokens", DEFAULT_CHUNK_TOKENS)
+    max_output = model.get("max_output_tokens")
+    if max_output:
+        budget = min(budget, max_output // OUTPUT_EXPANSION)
+    return max(1, budget)
+
+
+def split_json(source: Dict[str, Any], budget: int) -> List[Dict[str, Any]]:
+    """Greedily group keys in original order into chunks of at most `budget` tokens
+
+    A single key larger than the budget gets a chunk of its own.
+    """
+    chunks: List[Dict[str, Any]] = []
+    current: Dict[str, Any] = {}
+    current_tokens = 0
+    for key, value in source.items():
+        tokens = entry_tokens(key, value)
+        if current and current_tokens + tokens > budget:
+            chunks.append(current)
+            current, current_tokens = {}, 0
+        current[key] = value
+        current_tokens += tokens
+    if current:
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,476 @@
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from batch import DEFAULT_POLL_INTERVAL, BatchJob
+from dispatch import DEFAULT_MAX_RETRIES, ProviderLimiter
+from export import EXPORT_FORMATS, ResultExporter, language_slug
+from glossary import Glossary
+from incremental import KeyMemory
+from job_queue import JobQueue, job_spec
+from providers import PROVIDER_TYPES, ProviderRegistry
+from telemetry import Tracer
+from translation_cache import TranslationCache
+from validation import validate_translations
+from translator import (
+    DEFAULT_REPAIR_ROUNDS,
+    DEFAULT_TEMPLATE_PATH,
+    MODELS,
+    REFERENCE_TRANSLATIONS,
+    evaluate_against_reference,
+    load_prompt_template,
+    repair_results,
+    translate_json,
+    validate_json,
+)
+
+# Short names accepted by --model
+MODEL_ALIASES = {
+    "opus": "Claude Opus 4.5",
+    "sonnet": "Claude Sonnet 4.5",
+    "gpt": "GPT-5.1",
+    "gemini": "Gemini 3 Pro",
+}
+
+
+def find_inputs(path: Path) -> List[Path]:
+    """A single JSON file, or every *.json file under a directory"""
+    if path.is_dir():
+        return sorted(p for p in path.rglob("*.json") if p.is_file())
+    return [path]
+
+
+def parse_languages(value: str) -> List[str]:
+    if value.strip().lower() == "all":
+        return list(REFERENCE_TRANSLATIONS.keys())
+    return [language.strip() for language in value.split(",") if language.strip()]
+
+
+def resolve_registry(model: Dict[str, Any]) -> ProviderRegistry:
+    """Provider registry with API keys and base URLs from the environment"""
+    registry = ProviderRegistry()
+    if not registry.api_key(model["provider"]):
+        raise SystemExit(f"{registry.config[model['provider']]['api_key_env']} is not set")
+    return registry
+
+
+def resolve_model(name: str):
+    """Return (model config, translate, stream and sample callables) for a model name or alias
+
+    The fake has no sample callable; best-of-n then falls back to concurrent calls.
+    """
+    if name == "fake":
+        from fakes import FAKE_MODEL, FakeProvider
+        fake = FakeProvider(latency=0.0)
+        return FAKE_MODEL, fake, fake.stream, None
+
+    model = MODELS[model_name(name)]
+    registry = resolve_registry(model)
+    return model, registry.translate_fn(model), registry.stream_fn(model), registry.sample_fn(model)
+
+
+def model_name(name: str) -> str:
+    """Full model name for a name or alias"""
+    full_name = MODEL_ALIASES.get(name, name)
+    if full_name not in MODELS:
+        choices = ", ".join(list(MODEL_ALIASES) + ["fake"])
+        raise SystemExit(f"Unknown model '{name}'. Use one of: {choices}")
+    return full_name
+
+
+def file_report(
+    input_name: str,
+    relative_name: Path,
+    source: Dict[str, Any],
+    all_results: Dict[str, Dict[str, Any]],
+    stats: Dict[str, Any],
+    out: Path
+) -> Dict[str, Any]:
+    """The file's report entry; valid translations were written to <out>/<language>/<relative_name> by the exporter"""
+    validation = validate_translations(
+        source,
+        {language: result["parsed"] if result["valid"] else None for language, result in all_results.items()}
+    )
+    language_reports = {}
+    for language, result in all_results.items():
+        entry = {
+            "valid": result["valid"],
+            "error": result["error"],
+            "cached": result["cached"],
+            "elapsed": round(result["elapsed"], 3),
+            "first_token": round(result["first_token"], 3) if result["first_token"] is not None else None,
+            "queue_wait": round(result["queue_wait"], 3),
+            "input_tokens": result["input_tokens"],
+            "output_tokens": result["output_tokens"],
+            "cache_read_tokens": result["cache_read_tokens"],
+            "retries": result["retries"],
+            "cost": round(result["cost"], 6),
+            "chunks": [
+                {
+                    **chunk,
+                    "elapsed": round(chunk["elapsed"], 3),
+                    "first_token": round(chunk["first_token"], 3) if chunk["first_token"] is not None else None
+                }
+                for chunk in result["chunks"]
+            ],
+        }
+        if result["valid"]:
+            entry["output"] = str(out / language_slug(language) / relative_name)
+            entry["checks"] = dict(validation["languages"][language]["checks"])
+            entry["problems"] = [
+                {"key": row["key"], "status": row["status"], "problems": row["problems"]}
+                for row in validation["rows"]
+                if row["language"] == language and row["status"] != "ok"
+            ]
+            entry["reference"] = evaluate_against_reference(result["parsed"], language)
+        if result.get("json_repairs"):
+            entry["json_repairs"] = result["json_repairs"]
+        if "repair" in result:
+            entry["repair"] = result["repair"]
+        if "best_of" in result:
+            entry["best_of"] = result["best_of"]
+        language_reports[language] = entry
+
+    stats["elapsed"] = round(stats["elapsed"], 3)
+    stats["cost"] = round(stats["cost"], 6)
+    if "repair" in stats:
+        stats["repair"]["cost"] = round(stats["repair"]["cost"], 6)
+        stats["repair"]["elapsed"] = round(stats["repair"]["elapsed"], 3)
+        stats["repair"]["seconds_saved"] = round(stats["repair"]["seconds_saved"], 3)
+    return {"input": input_name, "stats": stats, "languages": language_reports}
+
+
+def read_locale(input_path: Path):
+    """(source, json_input, error) for a locale file"""
+    json_input = input_path.read_text(encoding="utf-8")
+    json_valid, json_parsed, json_error = validate_json(json_input, recover=False)
+    if not json_valid or not isinstance(json_parsed, dict):
+        return None, json_input, json_error or "Input must be a JSON object"
+    return json_parsed, json_input, ""
+
+
+def translate_file(
+    input_path: Path,
+    relative_name: Path,
+    args: argparse.Namespace,
+    languages: List[str],
+    template: str,
+    model: Dict[str, Any],
+    translate,
+    stream,
+    sample,
+    limiter: ProviderLimiter,
+    cache: TranslationCache,
+    key_memory: KeyMemory,
+    tracer: Tracer,
+    exporter: ResultExporter,
+    glossary: Optional[Glossary]
+) -> Dict[str, Any]:
+    """Translate one locale file into every language and return its report entry
+
+    Each language is exported as soon as its last chunk is in, while the
+    other languages are still being translated.
+    """
+    source, json_input, error = read_locale(input_path)
+    if error:
+        return {"input": str(input_path), "error": error}
+
+    all_results, stats = translate_json(
+        source=source,
+        json_input=json_input,
+        languages=languages,
+        template=template,
+        model=model,
+        translate=translate,
+        temperature=args.temperature,
+        limiter=limiter,
+        cache=cache,
+        key_memory=key_memory,
+        use_cache=not args.no_cache,
+        incremental=not args.full,
+        chunk_tokens=args.chunk_tokens,
+        stream=stream if args.stream else None,
+        tracer=tracer,
+        prompt_caching=not args.no_prompt_cache,
+        repair_rounds=args.repair_rounds,
+        samples=args.samples,
+        sample=sample,
+        glossary=glossary,
+        on_result=lambda language, result: exporter.add(str(relative_name), source, language, result)
+    )
+    return file_report(str(input_path), relative_name, source, all_results, stats, args.out)
+
+
+def run_batch(
+    args: argparse.Namespace,
+    cache: TranslationCache,
+    key_memory: KeyMemory,
+    tracer: Tracer,
+    exporter: ResultExporter,
+    glossary: Optional[Glossary]
+):
+    """Create (or load with --resume-batch) a batch job and drive it; returns (job, file reports) or (job, None) while it runs"""
+    if args.resume_batch:
+        job = BatchJob.load(args.resume_batch)
+        files = []
+    else:
+        if args.model == "fake":
+            raise SystemExit("Batch mode needs a provider batch endpoint; for an offline run point the SDKs at `python fakes.py --serve PORT`")
+        model = MODELS[model_name(args.model)]
+        if not PROVIDER_TYPES[model["provider"]].supports_batch:
+            raise SystemExit(f"Batch mode is not available for {model['provider']} models; run {args.model} without --batch")
+        languages = parse_languages(args.languages)
+        template = load_prompt_template(args.template)
+        root = args.input if args.input.is_dir() else args.input.parent
+        files, sources = [], []
+        for input_path in find_inputs(args.input):
+            source, json_input, error = read_locale(input_path)
+            if error:
+                files.append({"input": str(input_path), "error": error})
+            else:
+                sources.append((str(input_path.relative_to(root)), source, json_input))
+        job = BatchJob.create(
+            sources, languages, template, model,
+            temperature=args.temperature,
+            key_memory=key_memory,
+            incremental=not args.full,
+            chunk_tokens=args.chunk_tokens,
+            prompt_caching=not args.no_prompt_cache,
+            metadata={"template": str(args.template), "input": str(args.input)},
+            glossary=glossary
+        )
+        print(f"Batch job {job.manifest['job_id']}: {len(job.manifest['requests'])} request(s). Manifest: {job.path}")
+
+    registry = resolve_registry(job.manifest["model"])
+
+    def show(job: BatchJob) -> None:
+        print(f"  {job.manifest['provider_status']}: {job.manifest['counts']}")
+
+    finished = job.run(registry, interval=args.poll_interval, timeout=0 if args.no_wait else None, on_status=show)
+    if not finished:
+        registry.close()
+        return job, None
+    model = job.manifest["model"]
+    limiter = ProviderLimiter(max_retries=args.max_retries)
+    for planned, part in zip(job.manifest["files"], job.finish(key_memory=key_memory, cache=cache, tracer=tracer)):
+        if args.repair_rounds:
+            # Fix-ups are few and small, so they go out interactively at full price
+            stats = part["stats"]
+            stats["repair"] = repair_results(
+                part["results"], part["source"], planned["plan"]["template"], model, registry.translate_fn(model),
+                temperature=job.manifest["temperature"],
+                limiter=limiter,
+                cache=cache,
+                key_memory=key_memory,
+                max_rounds=args.repair_rounds,
+                tracer=tracer
+            )
+            for field in ("input_tokens", "output_tokens", "cost"):
+                stats[field] += stats["repair"][field]
+        for language, result in part["results"].items():
+            exporter.add(part["name"], part["source"], language, result)
+        files.append(file_report(part["name"], Path(part["name"]), part["source"], part["results"], part["stats"], args.out))
+    registry.close()
+    return job, files
+
+
+def enqueue_jobs(args: argparse.Namespace, languages: List[str]) -> int:
+    """Queue one background job per input file and print the job ids"""
+    if args.model == "fake":
+        from fakes import FAKE_MODEL
+        name, model = "fake", FAKE_MODEL
+    else:
+        name = model_name(args.model)
+        model = MODELS[name]
+    template = load_prompt_template(args.template)
+    job_queue = JobQueue()
+    root = args.input if args.input.is_dir() else args.input.parent
+    failures = 0
+    for input_path in find_inputs(args.input):
+        source, json_input, error = read_locale(input_path)
+        if error:
+            print(f"{input_path}: {error}", file=sys.stderr)
+            failures += 1
+            continue
+        job_id = job_queue.enqueue(
+            job_spec(
+                "translate", source, json_input, template, languages, {name: model},
+                temperature=args.temperature,
+                use_cache=not args.no_cache,
+                incremental=not args.full,
+                chunk_tokens=args.chunk_tokens,
+                prompt_caching=not args.no_prompt_cache,
+                repair_rounds=args.repair_rounds,
+                samples=args.samples,
+                glossary=tuple(map(str, args.glossary or ())),
+                concurrency={model["provider"]: args.concurrency} if args.concurrency else None,
+                rate_limits=((model["provider"], args.rpm or 0, args.tpm or 0),) if args.rpm or args.tpm else (),
+                settings={"temperature": args.temperature, "template": str(args.template), "samples": args.samples, "file": str(input_path.relative_to(root))}
+            ),
+            label=f"{input_path.relative_to(root)} · {name} · {len(languages)} language(s)"
+        )
+        print(f"Queued job {job_id} for {input_path}")
+    print("Run workers with `python job_queue.py --workers N`; follow progress with `python job_queue.py --status`")
+    return 1 if failures else 0
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Translate JSON locale files without the Streamlit UI")
+    parser.add_argument("input", type=Path, nargs="?", help="JSON file or directory of *.json locale files")
+    parser.add_argument("-l", "--languages", help="Comma-separated languages, or 'all'")
+    parser.add_argument("-m", "--model", default="opus", help="opus, sonnet, gpt, gemini, a full model name, or 'fake' for an offline echo")
+    parser.add_argument("-t", "--template", type=Path, default=DEFAULT_TEMPLATE_PATH, help="Prompt template file")
+    parser.add_argument("--temperature", type=float, default=0.3)
+    parser.add_argument("-o", "--out", type=Path, default=Path("translations"), help="Output directory")
+    parser.add_argument("--report", type=Path, help="Report path (default: <out>/report.json)")
+    parser.add_argument(
+        "--export",
+        default="",
+        help=f"Comma-separated extra formats written into <out> as each language finishes: {', '.join(EXPORT_FORMATS[1:])} (locale JSON is always written)"
+    )
+    parser.add_argument("--concurrency", type=int, help="Max in-flight requests for the model's provider")
+    parser.add_argument("--rpm", type=int, help="Requests per minute for the model's provider (default: unlimited)")
+    parser.add_argument("--tpm", type=int, help="Input tokens per minute for the model's provider (default: unlimited)")
+    parser.add_argument("--max-retries", type=int, default=DEFAULT_MAX_RETRIES, help="Retries for rate-limited, overloaded or dropped calls")
+    parser.add_argument("--chunk-tokens", type=int, default=0, help="Source tokens per request (default: the model's budget)")
+    parser.add_argument("--stream", action="store_true", help="Stream responses, abort structurally broken output early and report time to first token")
+    parser.add_argument("--no-cache", action="store_true", help="Bypass cached responses (fresh responses are still stored)")
+    parser.add_argument("--full", action="store_true", help="Translate every key instead of only new or changed ones")
+    parser.add_argument("--no-prompt-cache", action="store_true", help="Send the template verbatim instead of as a cacheable language-independent prefix")
+    parser.add_argument("--repair-rounds", type=int, default=DEFAULT_REPAIR_ROUNDS, help="Fix-up passes for keys failing the checks, sending only those keys (0 = off)")
+    parser.add_argument(
+        "--glossary",
+        type=Path,
+        action="append",
+        help="Approved translations (JSON/JSONL/CSV/TSV file or directory; repeatable): exact matches skip the model, similar ones are sent as hints"
+    )
+    parser.add_argument("--samples", type=int, default=1, help="Candidates per request, sampled in parallel; the best one passing the checks is kept (1 = off)")
+    parser.add_argument("--trace", type=Path, help="Write one JSON span per provider call to this JSONL file")
+    parser.add_argument("--otel", type=Path, help="Write the run's spans as an OpenTelemetry (OTLP/JSON) export request")
+    parser.add_argument("--batch", action="store_true", help="Send every request through the provider's batch API (half price, results within 24h)")
+    parser.add_argument("--resume-batch", type=Path, metavar="MANIFEST", help="Continue a batch job from its manifest (e.g. after a crash)")
+    parser.add_argument("--no-wait", action="store_true", help="With --batch/--resume-batch, submit or check once and exit instead of polling")
+    parser.add_argument("--poll-interval", type=float, default=DEFAULT_POLL_INTERVAL, help="Seconds between batch status checks")
+    parser.add_argument("--enqueue", action="store_true", help="Queue one background job per file for job_queue.py workers instead of translating now")
+    args = parser.parse_args(argv)
+
+    if not args.resume_batch:
+        if args.input is None:
+            parser.error("an input file or directory is required")
+        if not args.languages or not parse_languages(args.languages):
+            parser.error("no languages given")
+    if args.samples < 1:
+        parser.error("--samples must be at least 1")
+    if args.samples > 1 and (args.batch or args.resume_batch):
+        parser.error("--samples is not supported in batch mode")
+    if args.enqueue:
+        if args.batch or args.resume_batch:
+            parser.error("--enqueue cannot be combined with batch mode")
+        return enqueue_jobs(args, parse_languages(args.languages))
+    export_formats = ("json",) + tuple(fmt.strip().lower() for fmt in args.export.split(",") if fmt.strip() and fmt.strip().lower() != "json")
+    unknown = [fmt for fmt in export_formats if fmt not in EXPORT_FORMATS]
+    if unknown:
+        parser.error(f"unknown export format(s): {', '.join(unknown)}")
+    cache = TranslationCache()
+    key_memory = KeyMemory()
+    tracer = Tracer()
+    started = time.perf_counter()
+    try:
+        exporter = ResultExporter(args.out, formats=export_formats)
+    except RuntimeError as exc:
+        parser.error(str(exc))
+    glossary = None
+    if args.glossary:
+        try:
+            glossary = Glossary.load(args.glossary)
+        except (OSError, ValueError, KeyError) as exc:
+            parser.error(f"could not load glossary: {exc}")
+        print(f"Glossary: {len(glossary):,} approved translation(s) in {len(glossary.languages())} language(s) from {len(glossary.files)} file(s)")
+
+    if args.batch or args.resume_batch:
+        job, files = run_batch(args, cache, key_memory, tracer, exporter, glossary)
+        if files is None:
+            exporter.close()
+            print(f"Batch {job.manifest['batch_id']} is still {job.manifest['provider_status']}. Resume with --resume-batch {job.path}")
+            return 0
+        model = job.manifest["model"]
+        languages = job.manifest["languages"]
+        template_path = job.manifest["metadata"].get("template", "")
+    else:
+        languages = parse_languages(args.languages)
+        model, translate, stream, sample = resolve_model(args.model)
+        template = load_prompt_template(args.template)
+        template_path = str(args.template)
+        limiter = ProviderLimiter(
+            {model["provider"]: args.concurrency} if args.concurrency else None,
+            rates={model["provider"]: {"requests_per_minute": args.rpm, "tokens_per_minute": args.tpm}},
+            max_retries=args.max_retries
+        )
+        files = []
+        root = args.input if args.input.is_dir() else args.input.parent
+        for input_path in find_inputs(args.input):
+            files.append(translate_file(
+                input_path, input_path.relative_to(root), args, languages, template,
+                model, translate, stream, sample, limiter, cache, key_memory, tracer, exporter, glossary
+            ))
+    exports = exporter.close()
+
+    failures = sum(
+        1
+        for file_entry in files
+        for entry in file_entry.get("languages", {}).values()
+        if not entry["valid"]
+    ) + sum(1 for file_entry in files if "error" in file_entry)
+    report = {
+        "model": model["model_id"],
+        "template": template_path,
+        "languages": languages,
+        "files": files,
+        "failures": failures,
+        "elapsed": round(time.perf_counter() - started, 3),
+        "calls": tracer.summary(),
+        "exports": {fmt: paths for fmt, paths in exports.items() if fmt != "json"},
+    }
+
+    report_path = args.report or args.out / "report.json"
+    report_path.parent.mkdir(parents=True, exist_ok=True)
+    report_path.write_text(json.dumps(report, indent=2, ensure_ascii=False) + "\n", encoding="utf-8")
+    if args.trace:
+        args.trace.parent.mkdir(parents=True, exist_ok=True)
+        args.trace.write_text(tracer.to_jsonl(), encoding="utf-8")
+    if args.otel:
+        args.otel.parent.mkdir(parents=True, exist_ok=True)
+        args.otel.write_text(json.dumps(tracer.to_otlp()) + "\n", encoding="utf-8")
+    repairs = [file_entry["stats"]["repair"] for file_entry in files if "repair" in file_entry.get("stats", {})]
+    if any(repair["keys"] or repair["dropped"] for repair in repairs):
+        print(
+            f"Repaired {sum(repair['fixed'] for repair in repairs)}/{sum(repair['keys'] for repair in repairs)} failing key(s) "
+            f"({sum(repair['unresolved'] for repair in repairs)} unresolved) in {sum(repair['requests'] for repair in repairs)} request(s), "
+            f"saving ~{sum(repair['tokens_saved'] for repair in repairs):,} tokens and "
+            f"{sum(repair['seconds_saved'] for repair in repairs):.1f}s versus full re-runs"
+        )
+    sampled = [
+        entry["best_of"]
+        for file_entry in files
+        for entry in file_entry.get("languages", {}).values()
+        if "best_of" in entry
+    ]
+    if sampled:
+        print(
+            f"Best of {args.samples}: {sum(entry['passing'] for entry in sampled)}/{sum(entry['candidates'] for entry in sampled)} "
+            f"candidate(s) passed the checks across {len(sampled)} language(s)"
+        )
+    shared = sum(file_entry.get("stats", {}).get("coalesced", 0) for file_entry in files)
+    if shared:
+        print(f"Shared {shared} request(s) with an identical call already in flight instead of calling the model again")
+    approved = sum(file_entry.get("stats", {}).get("glossary_keys", 0) for file_entry in files)
+    if approved:
+        print(f"Took {approved} key translation(s) from the glossary without calling the model")
+    print(f"Translated {len(files)} file(s) into {len(languages)} language(s) in {report['elapsed']}s, {failures} failure(s). Report: {report_path}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from scoring import grapheme_count
+from translator import (
+    CHAR_LIMITS,
+    REFERENCE_GRADES,
+    evaluate_against_reference,
+    translate_json,
+)
+from validation import SourceFacts
+
+
+def compare_models(
+    source: Dict[str, Any],
+    json_input: str,
+    languages: List[str],
+    template: str,
+    runners: Dict[str, Tuple[Dict[str, Any], Callable[[str, float], Optional[str]]]],
+    **options: Any
+) -> Tuple[Dict[str, Dict[str, Dict[str, Any]]], Dict[str, Dict[str, Any]]]:
+    """Translate into every language with every model at once
+
+    runners maps a model name to (model config, translate callable); options are
+    passed through to translate_json (limiter, cache, key_memory, ...). All
+    model x language cells are in flight together, bounded only by the shared
+    per-provider limiter, so the run takes about as long as the slowest cell.
+    Returns (all_results by model, run stats by model).
+    """
+    if not runners:
+        return {}, {}
+
+    with ThreadPoolExecutor(max_workers=len(runners)) as executor:
+        futures = {
+            name: executor.submit(
+                translate_json,
+                source=source,
+                json_input=json_input,
+                languages=languages,
+                template=template,
+                model=model,
+                translate=translate,
+                **options
+            )
+            for name, (model, translate) in runners.items()
+        }
+        outcomes = {name: future.result() for name, future in futures.items()}
+
+    results = {name: outcome[0] for name, outcome in outcomes.items()}
+    stats = {name: outcome[1] for name, outcome in outcomes.items()}
+    return results, stats
+
+
+def _field_cells(result: Dict[str, Any], language: str, field: str, label: str) -> Dict[str, Any]:
+    """Text, char count vs limit and reference match for one space-constrained field"""
+    parsed = result["parsed"] if result["valid"] else {}
+    value = parsed.get(field) if isinstance(parsed, dict) else None
+    if not isinstance(value, str):
+        return {label: None, f"{label} chars": None, f"{label} ref": "—", f"{label} chrF": None}
+
+    limit = CHAR_LIMITS.get(field)
+    count = grapheme_count(value.strip())
+    reference = "—"
+    similarity = None
+    for match in evaluate_against_reference(parsed, language).get("matches", []):
+        if match["field"] == field:
+            reference = "✅" if match["matches"] else REFERENCE_GRADES[match["grade"]].split()[0]
+            similarity = match["similarity"]
+    return {
+        label: value,
+        f"{label} chars": f"{count}/{limit}" + (" ⚠️" if limit and count > limit else ""),
+        f"{label} ref": reference,
+        f"{label} chrF": similarity,
+    }
+
+
+def comparison_rows(
+    results_by_model: Dict[str, Dict[str, Dict[str, Any]]],
+    source: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """One row per model x language cell for a side-by-side grid"""
+    facts = SourceFacts(source)
+    rows = []
+    for name, all_results in results_by_model.items():
+        validation = facts.validate(
+            {language: result["parsed"] if result["valid"] else None for language, result in all_results.items()}
+        )
+        for language, result in all_results.items():
+            checks = validation["languages"][language]["checks"]
+            row = {
+                "Model": name,
+                "Language": language,
+                "Valid": "✅" if result["valid"] else "❌",
+                "Checks": f"{sum(passed for _, passed in checks)}/{len(checks)}" if checks else "—",
+            }
+            row.update(_field_cells(result, language, "hero_headline", "Headline"))
+            row.update(_field_cells(result, language, "hero_subheadline", "Subheadline"))
+            row.update({
+                "Latency (s)": round(result["elapsed"], 2),
+                "Queue wait (s)": round(result["queue_wait"], 2),
+                "Tokens in/out": f"{result['input_tokens']}/{result['output_tokens']}",
+                "Retries": result["retries"],
+                "Cost (est. $)": round(result["cost"], 4),
+                "Cached": result["cached"],
+            })
+            rows.append(row)
+    return rows
+
+
+def comparison_summary(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Per-model totals over the grid rows"""
+    summary: Dict[str, Dict[str, Any]] = {}
+    similarities: Dict[str, List[float]] = {}
+    for row in rows:
+        entry = summary.setdefault(row["Model"], {
+            "Model": row["Model"],
+            "Valid": 0,
+            "All checks": 0,
+            "Reference matches": 0,
+            "Mean chrF": None,
+            "Within char limits": 0,
+            "Slowest (s)": 0.0,
+            "Cost (est. $)": 0.0,
+        })
+        entry["Valid"] += row["Valid"] == "✅"
+        checks = row["Checks"].split("/") if row["Checks"] != "—" else None
+        entry["All checks"] += bool(checks) and checks[0] == checks[1]
+        entry["Reference matches"] += (row["Headline ref"] == "✅") + (row["Subheadline ref"] == "✅")
+        similarities.setdefault(row["Model"], []).extend(
+            row[label] for label in ("Headline chrF", "Subheadline chrF") if row[label] is not None
+        )
+        entry["Within char limits"] += sum(
+            1 for label in ("Headline chars", "Subheadline chars")
+            if row[label] and "⚠️" not in row[label]
+        )
+        entry["Slowest (s)"] = max(entry["Slowest (s)"], row["Latency (s)"])
+        entry["Cost (est. $)"] = round(entry["Cost (est. $)"] + row["Cost (est. $)"], 4)
+    for name, values in similarities.items():
+        if values:
+            summary[name]["Mean chrF"] = round(sum(values) / len(values), 1)
+    return list(summary.values())
@@ -0,0 +1,348 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from chunking import estimate_tokens
+from rate_limit import (
+    CircuitBreaker,
+    CircuitOpenError,
+    TokenBucket,
+    backoff_delay,
+    is_rate_limited,
+    is_retryable,
+    retry_after_seconds,
+)
+from single_flight import SINGLE_FLIGHT, SingleFlight
+from translation_cache import TranslationCache, make_cache_key
+
+# Upper bound on worker threads per dispatch; the limiter still caps in-flight calls
+MAX_WORKERS = 64
+
+# Max in-flight requests per provider
+DEFAULT_CONCURRENCY = {
+    "anthropic": 8,
+    "openai": 8,
+    "gemini": 4,
+}
+
+# Requests and input tokens per minute per provider. Empty means unlimited
+# until the provider pushes back; set these to your account tier's limits.
+DEFAULT_RATE_LIMITS: Dict[str, Dict[str, int]] = {}
+
+# Attempts after the first for rate-limited, overloaded or dropped calls
+DEFAULT_MAX_RETRIES = 4
+
+# Consecutive provider failures (5xx/overloaded/connection) that open the circuit, and its cooldown
+BREAKER_THRESHOLD = 5
+BREAKER_COOLDOWN = 30.0
+
+# Seconds a call may spend in total waiting for an open or probing circuit; these waits are not retries
+BREAKER_WAIT = 120.0
+
+
+class ProviderLimiter:
+    """Paces calls per provider: in-flight cap, request/token rate, retries and a circuit breaker
+
+    rates maps a provider to {"requests_per_minute": n, "tokens_per_minute": n}.
+    Rate-limit errors slow that provider's buckets down and pause them for the
+    provider's Retry-After; successes speed them back up. Repeated 5xx,
+    overloaded or connection failures open the provider's circuit; callers
+    wait for it (up to breaker_wait seconds each) without spending retries.
+    """
+
+    def __init__(
+        self,
+        limits: Optional[Dict[str, int]] = None,
+        default_limit: int = 4,
+        rates: Optional[Dict[str, Dict[str, int]]] = None,
+        max_retries: int = DEFAULT_MAX_RETRIES,
+        backoff_base: float = 1.0,
+        backoff_cap: float = 30.0,
+        breaker_threshold: int = BREAKER_THRESHOLD,
+        breaker_cooldown: float = BREAKER_COOLDOWN,
+        breaker_wait: float = BREAKER_WAIT
+    ):
+        self.limits = dict(DEFAULT_CONCURRENCY)
+        if limits:
+            self.limits.update(limits)
+        self.default_limit = default_limit
+        self.rates = {provider: dict(rate) for provider, rate in DEFAULT_RATE_LIMITS.items()}
+        for provider, rate in (rates or {}).items():
+            # None keeps the default; 0 means unlimited
+            self.rates.setdefault(provider, {}).update({k: v for k, v in rate.items() if v is not None})
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.breaker_threshold = breaker_threshold
+        self.breaker_cooldown = breaker_cooldown
+        self.breaker_wait = breaker_wait
+        self.rate_limited = 0
+        self._semaphores: Dict[str, threading.BoundedSemaphore] = {}
+        self._buckets: Dict[str, Dict[str, Optional[TokenBucket]]] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def _semaphore(self, provider: str) -> threading.BoundedSemaphore:
+        with self._lock:
+            if provider not in self._semaphores:
+                limit = max(1, self.limits.get(provider, self.default_limit))
+                self._semaphores[provider] = threading.BoundedSemaphore(limit)
+            return self._semaphores[provider]
+
+    def _provider_buckets(self, provider: str) -> Dict[str, Optional[TokenBucket]]:
+        with self._lock:
+            if provider not in self._buckets:
+                rate = self.rates.get(provider, {})
+                self._buckets[provider] = {
+                    "requests": TokenBucket(rate["requests_per_minute"]) if rate.get("requests_per_minute") else None,
+                    # Token buckets allow a full minute's budget as burst so one large chunk is never starved
+                    "tokens": TokenBucket(rate["tokens_per_minute"], burst=rate["tokens_per_minute"]) if rate.get("tokens_per_minute") else None,
+                }
+            return self._buckets[provider]
+
+    def breaker(self, provider: str) -> CircuitBreaker:
+        with self._lock:
+            if provider not in self._breakers:
+                self._breakers[provider] = CircuitBreaker(provider, self.breaker_threshold, self.breaker_cooldown)
+            return self._breakers[provider]
+
+    @contextmanager
+    def slot(self, provider: str, tokens: int = 0):
+        """Block until the provider's rate allows a call and a slot is free, then hold it
+
+        An exception raised in the block is reported to the rate buckets and the
+        circuit breaker before it propagates.
+        """
+        breaker = self.breaker(provider)
+        breaker.check()
+        buckets = self._provider_buckets(provider)
+        if buckets["requests"]:
+            buckets["requests"].acquire(1)
+        if buckets["tokens"] and tokens:
+            buckets["tokens"].acquire(tokens)
+
+        semaphore = self._semaphore(provider)
+        semaphore.acquire()
+        try:
+            yield
+        except Exception as e:
+            self.report_failure(provider, e)
+            raise
+        else:
+            breaker.success()
+            for bucket in buckets.values():
+                if bucket:
+                    bucket.recover()
+        finally:
+            semaphore.release()
+
+    def report_failure(self, provider: str, error: Exception) -> None:
+        buckets = self._provider_buckets(provider)
+        breaker = self.breaker(provider)
+        if is_rate_limited(error):
+            with self._lock:
+                self.rate_limited += 1
+            pause = retry_after_seconds(error)
+            for bucket in buckets.values():
+                if bucket:
+                    bucket.throttle()
+                    if pause:
+                        bucket.pause(pause)
+            # The provider answered, so it is up
+            breaker.success()
+        elif is_retryable(error):
+            breaker.failure()
+        else:
+            breaker.success()
+
+    def settle_tokens(self, provider: str, estimated: int, actual: int) -> None:
+        """Correct the token bucket once the provider reports real usage"""
+        bucket = self._provider_buckets(provider)["tokens"]
+        if bucket and actual:
+            bucket.debit(actual - estimated)
+
+    def retry_delay(self, attempt: int, error: Exception) -> float:
+        return backoff_delay(attempt, self.backoff_base, self.backoff_cap, retry_after_seconds(error))
+
+    def status(self) -> Dict[str, Dict[str, Any]]:
+        """Circuit state and current request/token rates per provider seen so far"""
+        with self._lock:
+            providers = set(self._breakers) | set(self._buckets)
+        status = {}
+        for provider in sorted(providers):
+            buckets = self._provider_buckets(provider)
+            status[provider] = {
+                "circuit": self.breaker(provider).state,
+                "requests_per_minute": round(buckets["requests"].rate * 60) if buckets["requests"] else None,
+                "tokens_per_minute": round(buckets["tokens"].rate * 60) if buckets["tokens"] else None,
+            }
+        return status
+
+
+def dispatch_tasks(
+    keys: List[Hashable],
+    build_prompt: Callable[[Hashable], str],
+    translate: Callable[[str, float], Optional[str]],
+    provider: str,
+    temperature: float = 0.3,
+    limiter: Optional[ProviderLimiter] = None,
+    cache: Optional[TranslationCache] = None,
+    model_id: Optional[str] = None,
+    use_cache: bool = True,
+    translate_for: Optional[Callable[[Hashable], Callable[[str, float], Optional[str]]]] = None,
+    cache_params: Optional[Dict[str, Any]] = None,
+    on_complete: Optional[Callable[[Hashable, Dict[str, Any]], None]] = None,
+    on_start: Optional[Callable[[Hashable], None]] = None,
+    cancel: Optional[threading.Event] = None,
+    single_flight: Optional[SingleFlight] = SINGLE_FLIGHT
+) -> Dict[Hashable, Dict[str, Any]]:
+    """Run one translation per key (a language, or a (language, chunk) pair) concurrently
+
+    Returns raw outcomes keyed like the input. Rate-limited, overloaded and
+    dropped calls are retried with jittered exponential backoff (honouring
+    Retry-After) up to limiter.max_retries times. Waiting for an open circuit,
+    or for its half-open probe, is not a retry: a call waits until the circuit
+    lets it through, for up to limiter.breaker_wait seconds in all. queue_wait is the time spent
+    waiting for rate and slot limits, elapsed the final attempt and retries the
+    extra attempts; usage and first_token are copied from the response when the
+    provider reports them. With a cache, hits are served without taking a
+    provider slot. When use_cache is False lookups are
+    bypassed but fresh responses are still stored. translate_for, if given,
+    builds a per-key call (e.g. streaming with callbacks that need to know
+    which task they belong to) and overrides translate. cache_params are
+    added to the cache key next to the temperature, for settings that change
+    what translate returns (e.g. best-of-n sampling). on_complete(key, outcome)
+    is called from the worker thread as soon as each key finishes, and
+    on_start(key) once its call holds a provider slot. Once cancel is set,
+    calls not yet started (or waiting to retry) end with error "Cancelled";
+    calls already in flight run to completion. Through single_flight (the
+    process-wide SINGLE_FLIGHT unless None is passed), a request identical to
+    one already in flight anywhere in the process (same model, cache params
+    and prompt) waits for that call instead of making its own; its outcome
+    has coalesced=True and no usage, since the other request paid for it.
+    """
+    if limiter is None:
+        limiter = ProviderLimiter()
+
+    def run_one(key: Hashable, submitted: float) -> Dict[str, Any]:
+        prompt = build_prompt(key)
+        started_at = time.time()
+        started = time.perf_counter()
+        queue_wait = 0.0
+        retries = 0
+        cache_key = None
+        raw = None
+        error = ""
+        coalesced = False
+        request_key = None
+        if cache is not None or single_flight is not None:
+            request_key = make_cache_key(model_id or provider, {"temperature": temperature, **(cache_params or {})}, prompt)
+        if cache is not None:
+            cache_key = request_key
+            if use_cache:
+                raw = cache.get(cache_key)
+        cached = raw is not None
+
+        if not cached:
+            prompt_tokens = estimate_tokens(prompt)
+
+            def call_provider() -> Dict[str, Any]:
+                attempt = {"raw": None, "error": "", "retries": 0, "queue_wait": 0.0, "started_at": time.time(), "started": time.perf_counter()}
+                waiting = submitted
+                breaker_waited = 0.0
+                while True:
+                    try:
+                        with limiter.slot(provider, prompt_tokens):
+                            attempt["queue_wait"] += time.perf_counter() - waiting
+                            attempt["started_at"] = time.time()
+                            attempt["started"] = time.perf_counter()
+                            if cancel is not None and cancel.is_set():
+                                attempt["error"] = "Cancelled"
+                                break
+                            if on_start is not None:
+                                on_start(key)
+                            call = translate_for(key) if translate_for else translate
+                            attempt["raw"] = call(prompt, temperature)
+                        break
+                    except CircuitOpenError as e:
+                        # Not an attempt: nothing was sent. Wait for the cooldown or the probe's outcome
+                        if cancel is not None and cancel.is_set():
+                            attempt["error"] = "Cancelled"
+                            break
+                        if breaker_waited + e.retry_in <= limiter.breaker_wait:
+                            if cancel is not None:
+                                cancel.wait(e.retry_in)
+                            else:
+                                time.sleep(e.retry_in)
+                            breaker_waited += e.retry_in
+                            continue
+                        attempt["error"] = f"Translation failed: {e}"
+                        break
+                    except Exception as e:
+                        retries = attempt["retries"]
+                        if retries < limiter.max_retries and is_retryable(e) and not (cancel is not None and cancel.is_set()):
+                            delay = limiter.retry_delay(retries, e)
+                            if cancel is not None:
+                                # Backoff and Retry-After can run to a minute; Cancel must not wait that out
+                                if cancel.wait(delay):
+                                    attempt["error"] = "Cancelled"
+                                    break
+                            else:
+                                time.sleep(delay)
+                            attempt["retries"] += 1
+                            waiting = time.perf_counter()
+                            continue
+                        attempt["error"] = f"Translation failed: {e}"
+                        if retries:
+                            attempt["error"] += f" (after {retries} retr{'y' if retries == 1 else 'ies'})"
+                        break
+                usage = getattr(attempt["raw"], "usage", None) or {}
+                limiter.settle_tokens(provider, prompt_tokens, usage.get("input_tokens", 0))
+                if attempt["raw"] and cache_key:
+                    cache.put(cache_key, model_id or provider, attempt["raw"])
+                elif not attempt["raw"] and not attempt["error"]:
+                    attempt["error"] = "Translation failed"
+                return attempt
+
+            while True:
+                if single_flight is None:
+                    attempt = call_provider()
+                else:
+                    attempt, coalesced = single_flight.do(request_key, call_provider, served=lambda attempt: bool(attempt["raw"]))
+                # The shared call was cancelled by its own session, not this one: go again
+                if not (coalesced and attempt["error"] == "Cancelled" and not (cancel is not None and cancel.is_set())):
+                    break
+            raw, error = attempt["raw"], attempt["error"]
+            if not coalesced:
+                queue_wait, retries = attempt["queue_wait"], attempt["retries"]
+                started_at, started = attempt["started_at"], attempt["started"]
+
+        outcome = {
+            "raw": raw,
+            "prompt": prompt,
+            "error": error,
+            "cached": cached,
+            "elapsed": time.perf_counter() - started,
+            "queue_wait": queue_wait,
+            "started_at": started_at,
+            "ended_at": time.time(),
+            # The tokens were spent (and are reported) by the request that made the call
+            "usage": {} if coalesced else getattr(raw, "usage", None) or {},
+            "retries": retries,
+            "coalesced": coalesced,
+            "first_token": getattr(raw, "first_token", None),
+            "best_of": getattr(raw, "best_of", None)
+        }
+        if on_complete is not None:
+            on_complete(key, outcome)
+        return outcome
+
+    if not keys:
+        return {}
+
+    with ThreadPoolExecutor(max_workers=min(len(keys), MAX_WORKERS)) as executor:
+        futures = {key: executor.submit(run_one, key, time.perf_counter()) for key in keys}
+        # Preserve the caller's order
+        return {key: futures[key].result() for key in keys}
@@ -0,0 +1,224 @@
+import csv
+import json
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, IO, List, Optional, Tuple
+from xml.sax.saxutils import escape, quoteattr
+
+from translator import evaluate_against_reference
+from validation import SourceFacts
+
+# Output formats: per-language locale JSON, the validation report as JSONL/CSV/Parquet, and XLIFF 1.2
+EXPORT_FORMATS = ("json", "jsonl", "csv", "parquet", "xliff")
+DEFAULT_EXPORT_FORMATS = ("json", "jsonl", "csv")
+
+# One report row per language x key, in column order
+REPORT_FIELDS = (
+    "file",
+    "language",
+    "key",
+    "source",
+    "translation",
+    "status",
+    "chars",
+    "limit",
+    "problems",
+    "reference_grade",
+    "reference_similarity",
+)
+
+# XLIFF target-language codes for every language in REFERENCE_TRANSLATIONS (tests check
+# coverage); languages typed in by hand keep their display name
+LANGUAGE_CODES = {
+    "French": "fr",
+    "Spanish": "es",
+    "Italian": "it",
+    "German": "de",
+    "Russian": "ru",
+    "Japanese": "ja",
+    "Indonesian": "id",
+    "Simplified Chinese": "zh-Hans",
+    "Traditional Chinese": "zh-Hant",
+    "Korean": "ko",
+    "Portuguese (Portugal)": "pt-PT",
+    "Portuguese (Brazil)": "pt-BR",
+    "Turkish": "tr",
+    "Hindi": "hi",
+    "Vietnamese": "vi",
+    "Arabic (Peninsular)": "ar-SA",
+}
+
+
+def language_slug(language: str) -> str:
+    """Directory-safe language name, e.g. "Portuguese (Brazil)" -> "portuguese-brazil\""""
+    return re.sub(r'[^a-z0-9]+', '-', language.lower()).strip('-')
+
+
+def _text(value: Any) -> str:
+    if value is None:
+        return ""
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+
+class ResultExporter:
+    """Writes each language's result to disk as soon as it is added
+
+    json writes <out>/<language>/<file> (the translated locale), xliff
+    <out>/<language>/<file stem>.xlf, and jsonl/csv/parquet append that
+    language's rows to one report.<ext> for the whole export. Nothing is kept
+    per language after add() returns, so memory stays flat however many
+    languages and keys go through; report files are flushed after every
+    language (Parquet gets one row group each). Safe to call from the worker
+    threads of translate_json(on_result=...). Parquet needs pyarrow.
+    """
+
+    def __init__(
+        self,
+        out: Path,
+        formats: Tuple[str, ...] = DEFAULT_EXPORT_FORMATS,
+        source_language: str = "en"
+    ):
+        unknown = set(formats) - set(EXPORT_FORMATS)
+        if unknown:
+            raise ValueError(f"Unknown export format(s): {', '.join(sorted(unknown))}")
+        self.out = Path(out)
+        self.formats = tuple(formats)
+        self.source_language = source_language
+        self.paths: Dict[str, List[str]] = {fmt: [] for fmt in self.formats}
+        self.languages = 0
+        self.rows = 0
+        self._facts: Dict[str, SourceFacts] = {}
+        self._lock = threading.Lock()
+        self._files: List[IO[str]] = []
+        self.out.mkdir(parents=True, exist_ok=True)
+
+        self._jsonl = self._open_report("jsonl") if "jsonl" in self.formats else None
+        self._csv_file = self._open_report("csv", newline="") if "csv" in self.formats else None
+        self._csv = None
+        if self._csv_file is not None:
+            self._csv = csv.DictWriter(self._csv_file, fieldnames=REPORT_FIELDS)
+            self._csv.writeheader()
+        self._parquet = None
+        if "parquet" in self.formats:
+            try:
+                import pyarrow
+                import pyarrow.parquet
+            except ImportError:
+                raise RuntimeError("Parquet export needs pyarrow (pip install pyarrow)") from None
+            self._pyarrow = pyarrow
+            self._schema = pyarrow.schema([
+                (field, pyarrow.int64() if field in ("chars", "limit") else pyarrow.float64() if field == "reference_similarity" else pyarrow.string())
+                for field in REPORT_FIELDS
+            ])
+            path = self.out / "report.parquet"
+            self._parquet = pyarrow.parquet.ParquetWriter(str(path), self._schema)
+            self.paths["parquet"].append(str(path))
+
+    def _open_report(self, fmt: str, **options: Any) -> IO[str]:
+        path = self.out / f"report.{fmt}"
+        handle = open(path, "w", encoding="utf-8", **options)
+        self._files.append(handle)
+        self.paths[fmt].append(str(path))
+        return handle
+
+    def __enter__(self) -> "ResultExporter":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def report_rows(self, file: str, source: Dict[str, Any], language: str, result: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Validation rows for one language of one file, with source text and reference grades"""
+        if file not in self._facts:
+            self._facts[file] = SourceFacts(source)
+        parsed = result["parsed"] if result["valid"] else None
+        if parsed is None:
+            return [{
+                **dict.fromkeys(REPORT_FIELDS),
+                "file": file, "language": language, "key": key, "source": _text(value),
+                "status": "failed", "problems": result.get("error") or "No valid output",
+            } for key, value in source.items()]
+
+        references = {match["field"]: match for match in evaluate_against_reference(parsed, language).get("matches", [])}
+        rows = []
+        for row in self._facts[file].validate({language: parsed})["rows"]:
+            reference = references.get(row["key"])
+            rows.append({
+                "file": file,
+                "language": language,
+                "key": row["key"],
+                "source": _text(source.get(row["key"])),
+                "translation": _text(parsed.get(row["key"])),
+                "status": row["status"],
+                "chars": row["chars"],
+                "limit": row["limit"],
+                "problems": row["problems"],
+                "reference_grade": reference["grade"] if reference else None,
+                "reference_similarity": reference["similarity"] if reference else None,
+            })
+        return rows
+
+    def _write_xliff(self, path: Path, file: str, source: Dict[str, Any], language: str, parsed: Dict[str, Any]) -> None:
+        target = LANGUAGE_CODES.get(language, language)
+        with open(path, "w", encoding="utf-8") as handle:
+            handle.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+            handle.write('<xliff version="1.2" xmlns="urn:oasis:names:tc:xliff:document:1.2">\n')
+            handle.write(
+                f'  <file original={quoteattr(file)} source-language={quoteattr(self.source_language)} '
+                f'target-language={quoteattr(target)} datatype="plaintext">\n    <body>\n'
+            )
+            for key, value in source.items():
+                state = "translated" if key in parsed else "needs-translation"
+                handle.write(
+                    f'      <trans-unit id={quoteattr(key)}>\n'
+                    f'        <source>{escape(_text(value))}</source>\n'
+                    f'        <target state="{state}">{escape(_text(parsed.get(key)))}</target>\n'
+                    f'      </trans-unit>\n'
+                )
+            handle.write('    </body>\n  </file>\n</xliff>\n')
+
+    def add(self, file: str, source: Dict[str, Any], language: str, result: Dict[str, Any]) -> Optional[Path]:
+        """Write one language of one file in every format; returns the locale JSON path if written"""
+        relative = Path(file)
+        locale_path = None
+        with self._lock:
+            rows = self.report_rows(file, source, language, result)
+            if result["valid"]:
+                directory = self.out / language_slug(language) / relative.parent
+                if "json" in self.formats:
+                    directory.mkdir(parents=True, exist_ok=True)
+                    locale_path = directory / relative.name
+                    with open(locale_path, "w", encoding="utf-8") as handle:
+                        json.dump(result["parsed"], handle, indent=2, ensure_ascii=False)
+                        handle.write("\n")
+                    self.paths["json"].append(str(locale_path))
+                if "xliff" in self.formats:
+                    directory.mkdir(parents=True, exist_ok=True)
+                    xliff_path = directory / (relative.stem + ".xlf")
+                    self._write_xliff(xliff_path, file, source, language, result["parsed"])
+                    self.paths["xliff"].append(str(xliff_path))
+
+            if self._jsonl is not None:
+                for row in rows:
+                    self._jsonl.write(json.dumps(row, ensure_ascii=False) + "\n")
+                self._jsonl.flush()
+            if self._csv is not None:
+                self._csv.writerows(rows)
+                self._csv_file.flush()
+            if self._parquet is not None and rows:
+                self._parquet.write_table(self._pyarrow.Table.from_pylist(rows, schema=self._schema))
+            self.languages += 1
+            self.rows += len(rows)
+        return locale_path
+
+    def close(self) -> Dict[str, List[str]]:
+        """Finish every report file and return the written paths by format"""
+        with self._lock:
+            if self._parquet is not None:
+                self._parquet.close()
+                self._parquet = None
+            for handle in self._files:
+                handle.close()
+            self._files = []
+        return self.paths
@@ -0,0 +1,774 @@
+import argparse
+import email.policy
+import json
+import os
+import random
+import re
+import threading
+import time
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import accumulate
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from dispatch import ProviderLimiter, dispatch_tasks
+
+# Model config for offline runs (cli.py --model fake)
+FAKE_MODEL = {"provider": "fake", "model_id": "fake-echo"}
+
+
+def extract_input_json(prompt: str) -> str:
+    """Return the last JSON object in the prompt (the ${jsonInput} slot)"""
+    decoder = json.JSONDecoder()
+    found = "{}"
+    index = prompt.find('{')
+    while index != -1:
+        try:
+            _, end = decoder.raw_decode(prompt, index)
+            found = prompt[index:end]
+            index = prompt.find('{', end)
+        except json.JSONDecodeError:
+            index = prompt.find('{', index + 1)
+    return found
+
+
+class FakeProvider:
+    """Local stand-in for a provider call that sleeps to simulate a round-trip"""
+
+    def __init__(
+        self,
+        latency: float = 0.5,
+        jitter: float = 0.0,
+        respond: Optional[Callable[[str], str]] = None,
+        stream_piece: int = 16,
+        stream_delay: float = 0.0
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.stream_piece = stream_piece
+        self.stream_delay = stream_delay
+        self.respond = respond or extract_input_json
+        self.calls = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, prompt: str, temperature: float = 0.3) -> Optional[str]:
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+            return self.respond(prompt)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def stream(self, prompt: str, temperature: float = 0.3) -> Iterator[str]:
+        """Streaming variant: first piece after the latency, then one piece per stream_delay"""
+        with self._lock:
+            self.calls += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            time.sleep(self.latency + random.uniform(0, self.jitter))
+            text = self.respond(prompt)
+            for start in range(0, len(text), self.stream_piece):
+                yield text[start:start + self.stream_piece]
+                time.sleep(self.stream_delay)
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+
+def _prompt_from_messages(messages: list) -> str:
+    """Text of the last user message (plain string or list of content blocks)"""
+    content = messages[-1]["content"] if messages else ""
+    if isinstance(content, str):
+        return content
+    return "".join(block.get("text", "") for block in content)
+
+
+def _multipart_file(content_type: str, body: bytes) -> bytes:
+    """Content of the "file" field of a multipart/form-data upload"""
+    message = BytesParser(policy=email.policy.default).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + body)
+    for part in message.iter_parts():
+        if part.get_param("name", header="content-disposition") == "file":
+            return part.get_payload(decode=True)
+    return b""
+
+
+class FakeProviderServer:
+    """Local HTTP stand-in for the Anthropic Messages and OpenAI Chat Completions APIs
+
+    Point the SDKs at it (ANTHROPIC_BASE_URL=<base_url>, OPENAI_BASE_URL=<base_url>/v1)
+    to exercise the real provider classes, connection pooling and streaming offline.
+    Responses echo the prompt's JSON input after `latency` seconds.
+    Message Batches (/v1/messages/batches) and OpenAI Batch (/v1/files +
+    /v1/batches) requests finish `batch_latency` seconds after creation, with
+    error_rate applied per request. Usage reports emulate prompt caching: Anthropic cache_control prefixes
+    seen before count as cache reads, and OpenAI reports cached_tokens for
+    repeated prefixes of 1024+ tokens.
+
+    Faults can be injected to exercise retries and rate limiting: with
+    requests_per_minute, requests beyond that rate (over a sliding `window` of
+    seconds) get a 429 with a Retry-After header; error_rate is the fraction of the remaining
+    requests answered with error_status (529 "overloaded" by default).
+    """
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency: float = 0.5,
+        respond: Optional[Callable[[str], str]] = None,
+        stream_piece: int = 16,
+        stream_delay: float = 0.0,
+        requests_per_minute: Optional[int] = None,
+        window: float = 60.0,
+        error_rate: float = 0.0,
+        error_status: int = 529,
+        batch_latency: float = 2.0
+    ):
+        self.latency = latency
+        self.respond = respond or extract_input_json
+        self.stream_piece = stream_piece
+        self.stream_delay = stream_delay
+        self.requests_per_minute = requests_per_minute
+        self.window = window
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.batch_latency = batch_latency
+        self.requests = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.rejected: Dict[int, int] = {}
+        self._accepted: List[float] = []
+        self._cached_prefixes = set()
+        self._recent_prompts: List[str] = []
+        self._batches: Dict[str, Dict[str, Any]] = {}
+        self._files: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+        ThreadingHTTPServer.request_queue_size = 256
+        self._httpd = ThreadingHTTPServer((host, port), self._make_handler())
+        self._httpd.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeProviderServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-provider", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def _fault(self) -> Optional[Tuple[int, Optional[float]]]:
+        """(status, retry_after) if this request should be rejected, else None"""
+        with self._lock:
+            now = time.monotonic()
+            if self.requests_per_minute:
+                allowed = max(1, int(self.requests_per_minute * self.window / 60.0))
+                self._accepted = [t for t in self._accepted if now - t < self.window]
+                if len(self._accepted) >= allowed:
+                    fault = (429, max(0.05, self.window - (now - self._accepted[0])))
+                    self.rejected[429] = self.rejected.get(429, 0) + 1
+                    return fault
+            if self.error_rate and random.random() < self.error_rate:
+                self.rejected[self.error_status] = self.rejected.get(self.error_status, 0) + 1
+                return self.error_status, None
+            self._accepted.append(now)
+        return None
+
+    def _anthropic_cache(self, messages: list) -> Tuple[int, int]:
+        """(cache read, cache write) tokens for the prefix up to the last block marked with cache_control"""
+        content = messages[-1]["content"] if messages else ""
+        if isinstance(content, str):
+            return 0, 0
+        prefix = ""
+        cached_prefix = ""
+        for block in content:
+            prefix += block.get("text", "")
+            if block.get("cache_control"):
+                cached_prefix = prefix
+        if not cached_prefix:
+            return 0, 0
+        tokens = len(cached_prefix) // 4
+        with self._lock:
+            if cached_prefix in self._cached_prefixes:
+                return tokens, 0
+            self._cached_prefixes.add(cached_prefix)
+        return 0, tokens
+
+    def _openai_cache(self, prompt: str) -> int:
+        """Cached tokens the way OpenAI reports them: the longest previously seen
+        prefix of 1024+ tokens, in 128-token steps"""
+        with self._lock:
+            longest = max((len(os.path.commonprefix([prompt, seen])) for seen in self._recent_prompts), default=0)
+            self._recent_prompts = (self._recent_prompts + [prompt])[-64:]
+        tokens = longest // 4
+        return tokens // 128 * 128 if tokens >= 1024 else 0
+
+    def _anthropic_reply(self, body: Dict[str, Any]) -> Tuple[str, Dict[str, int], Dict[str, Any]]:
+        """(text, usage without output_tokens, full message) for a Messages API request"""
+        prompt = _prompt_from_messages(body.get("messages", []))
+        text = self.respond(prompt)
+        cache_read, cache_write = self._anthropic_cache(body.get("messages", []))
+        usage = {
+            "input_tokens": max(1, len(prompt) // 4 - cache_read - cache_write),
+            "cache_read_input_tokens": cache_read,
+            "cache_creation_input_tokens": cache_write,
+        }
+        message = {
+            "id": "msg_fake", "type": "message", "role": "assistant", "model": body.get("model", "fake"),
+            "content": [{"type": "text", "text": text}],
+            "stop_reason": "end_turn", "stop_sequence": None,
+            "usage": {**usage, "output_tokens": max(1, len(text) // 4)}
+        }
+        return text, usage, message
+
+    def _openai_reply(self, body: Dict[str, Any]) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+        """(text, usage, full chat.completion) for a Chat Completions request"""
+        prompt = _prompt_from_messages(body.get("messages", []))
+        texts = [self.respond(prompt) for _ in range(body.get("n") or 1)]
+        text = texts[0]
+        input_tokens = max(1, len(prompt) // 4)
+        output_tokens = sum(max(1, len(choice) // 4) for choice in texts)
+        usage = {"prompt_tokens": input_tokens, "completion_tokens": output_tokens,
+                 "total_tokens": input_tokens + output_tokens,
+                 "prompt_tokens_details": {"cached_tokens": self._openai_cache(prompt)}}
+        completion = {
+            "id": "chatcmpl-fake", "object": "chat.completion", "created": int(time.time()), "model": body.get("model", "fake"),
+            "choices": [
+                {"index": index, "message": {"role": "assistant", "content": choice}, "finish_reason": "stop"}
+                for index, choice in enumerate(texts)
+            ],
+            "usage": usage
+        }
+        return text, usage, completion
+
+    def _store_file(self, content: bytes) -> str:
+        with self._lock:
+            file_id = f"file-fake{len(self._files) + 1}"
+            self._files[file_id] = content
+        return file_id
+
+    def _create_batch(self, kind: str, requests: List[Tuple[str, Dict[str, Any]]]) -> Dict[str, Any]:
+        with self._lock:
+            batch_id = f"{'msgbatch' if kind == 'anthropic' else 'batch'}_fake{len(self._batches) + 1}"
+            batch = {"id": batch_id, "kind": kind, "created": time.time(), "requests": requests, "results": None}
+            self._batches[batch_id] = batch
+        return batch
+
+    def _batch(self, batch_id: str) -> Optional[Dict[str, Any]]:
+        """Look up a batch, processing its requests once batch_latency has passed"""
+        with self._lock:
+            batch = self._batches.get(batch_id)
+        if not batch or batch["results"] is not None or time.time() - batch["created"] < self.batch_latency:
+            return batch
+        results = []
+        for custom_id, body in batch["requests"]:
+            failed = self.error_rate and random.random() < self.error_rate
+            if batch["kind"] == "anthropic":
+                if failed:
+                    results.append({"custom_id": custom_id, "result": {"type": "errored", "error": {
+                        "type": "error", "error": {"type": "overloaded_error", "message": "Injected batch error"}}}})
+                else:
+                    results.append({"custom_id": custom_id, "result": {"type": "succeeded", "message": self._anthropic_reply(body)[2]}})
+            elif failed:
+                results.append({"id": f"req_{custom_id}", "custom_id": custom_id, "response": {
+                    "status_code": 500, "request_id": custom_id,
+                    "body": {"error": {"message": "Injected batch error", "type": "server_error"}}}, "error": None})
+            else:
+                results.append({"id": f"req_{custom_id}", "custom_id": custom_id, "response": {
+                    "status_code": 200, "request_id": custom_id, "body": self._openai_reply(body)[2]}, "error": None})
+        with self._lock:
+            batch["ended"] = time.time()
+            batch["results"] = results
+            if batch["kind"] == "openai":
+                batch["output_file_id"] = f"file-fake{len(self._files) + 1}"
+                self._files[batch["output_file_id"]] = "".join(json.dumps(line) + "\n" for line in results).encode("utf-8")
+        return batch
+
+    def _anthropic_batch_object(self, batch: Dict[str, Any]) -> Dict[str, Any]:
+        ended = batch["results"] is not None
+        succeeded = sum(1 for line in batch["results"] or [] if line["result"]["type"] == "succeeded")
+        iso = lambda t: time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(t))
+        return {
+            "id": batch["id"], "type": "message_batch",
+            "processing_status": "ended" if ended else "in_progress",
+            "request_counts": {
+                "processing": 0 if ended else len(batch["requests"]),
+                "succeeded": succeeded,
+                "errored": len(batch["results"]) - succeeded if ended else 0,
+                "canceled": 0, "expired": 0,
+            },
+            "created_at": iso(batch["created"]), "expires_at": iso(batch["created"] + 86400),
+            "ended_at": iso(batch["ended"]) if ended else None,
+            "archived_at": None, "cancel_initiated_at": None,
+            "results_url": f"{self.base_url}/v1/messages/batches/{batch['id']}/results" if ended else None,
+        }
+
+    def _openai_batch_object(self, batch: Dict[str, Any]) -> Dict[str, Any]:
+        ended = batch["results"] is not None
+        failed = sum(1 for line in batch["results"] or [] if line["response"]["status_code"] != 200)
+        return {
+            "id": batch["id"], "object": "batch", "endpoint": "/v1/chat/completions", "errors": None,
+            "input_file_id": batch.get("input_file_id", ""), "completion_window": "24h",
+            "status": "completed" if ended else "in_progress",
+            "output_file_id": batch.get("output_file_id"), "error_file_id": None,
+            "created_at": int(batch["created"]), "completed_at": int(batch["ended"]) if ended else None,
+            "request_counts": {
+                "total": len(batch["requests"]),
+                "completed": len(batch["requests"]) - failed if ended else 0,
+                "failed": failed,
+            },
+            "metadata": None,
+        }
+
+    def _pieces(self, text: str) -> Iterator[str]:
+        for start in range(0, len(text), self.stream_piece):
+            yield text[start:start + self.stream_piece]
+
+    def _anthropic_events(self, model: str, text: str, usage: Dict[str, int]) -> Iterator[Dict[str, Any]]:
+        yield {"type": "message_start", "message": {
+            "id": "msg_fake", "type": "message", "role": "assistant", "model": model, "content": [],
+            "stop_reason": None, "stop_sequence": None,
+            "usage": {**usage, "output_tokens": 1}
+        }}
+        yield {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}
+        for piece in self._pieces(text):
+            yield {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": piece}}
+        yield {"type": "content_block_stop", "index": 0}
+        yield {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None},
+               "usage": {"output_tokens": max(1, len(text) // 4)}}
+        yield {"type": "message_stop"}
+
+    def _openai_chunks(self, model: str, text: str, usage: Optional[Dict[str, int]] = None) -> Iterator[Dict[str, Any]]:
+        base = {"id": "chatcmpl-fake", "object": "chat.completion.chunk", "created": int(time.time()), "model": model}
+        for piece in self._pieces(text):
+            yield {**base, "choices": [{"index": 0, "delta": {"role": "assistant", "content": piece}, "finish_reason": None}]}
+        yield {**base, "choices": [{"index": 0, "delta": {}, "finish_reason": "stop"}]}
+        if usage:
+            # stream_options={"include_usage": True}: a final chunk with no choices
+            yield {**base, "choices": [], "usage": usage}
+
+    def _make_handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, format, *args):
+                pass
+
+            def _send_json(self, payload: Dict[str, Any], status: int = 200, headers: Optional[Dict[str, str]] = None) -> None:
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _send_error(self, status: int, retry_after: Optional[float]) -> None:
+                kind = {429: "rate_limit_error", 529: "overloaded_error"}.get(status, "api_error")
+                message = f"Injected {status} ({kind})"
+                if self.path.endswith("/messages"):
+                    payload = {"type": "error", "error": {"type": kind, "message": message}}
+                else:
+                    payload = {"error": {"message": message, "type": kind, "code": str(status)}}
+                headers = {"retry-after": f"{retry_after:.3f}"} if retry_after is not None else None
+                self._send_json(payload, status=status, headers=headers)
+
+            def _send_sse(self, frames: Iterator[str]) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Transfer-Encoding", "chunked")
+                self.end_headers()
+                for frame in frames:
+                    data = frame.encode("utf-8")
+                    self.wfile.write(f"{len(data):X}\r\n".encode("ascii") + data + b"\r\n")
+                    self.wfile.flush()
+                    time.sleep(server.stream_delay)
+                self.wfile.write(b"0\r\n\r\n")
+
+            def _send_jsonl(self, lines: List[Dict[str, Any]]) -> None:
+                body = "".join(json.dumps(line) + "\n" for line in lines).encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "application/binary")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _read_body(self) -> bytes:
+                return self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+            def do_GET(self):
+                path = self.path.split("?")[0].rstrip("/")
+                parts = path.split("/")
+                if "/messages/batches/" in path and path.endswith("/results"):
+                    batch = server._batch(parts[-2])
+                    if not batch or batch["results"] is None:
+                        self._send_json({"type": "error", "error": {"type": "not_found_error", "message": path}}, status=404)
+                    else:
+                        self._send_jsonl(batch["results"])
+                elif "/messages/batches/" in path:
+                    batch = server._batch(parts[-1])
+                    if not batch:
+                        self._send_json({"type": "error", "error": {"type": "not_found_error", "message": path}}, status=404)
+                    else:
+                        self._send_json(server._anthropic_batch_object(batch))
+                elif "/batches/" in path:
+                    batch = server._batch(parts[-1])
+                    if not batch:
+                        self._send_json({"error": {"type": "not_found", "message": path}}, status=404)
+                    else:
+                        self._send_json(server._openai_batch_object(batch))
+                elif "/files/" in path and path.endswith("/content"):
+                    with server._lock:
+                        content = server._files.get(parts[-2])
+                    if content is None:
+                        self._send_json({"error": {"type": "not_found", "message": path}}, status=404)
+                    else:
+                        self._send_jsonl([json.loads(line) for line in content.decode("utf-8").splitlines() if line.strip()])
+                else:
+                    self._send_json({"error": {"type": "not_found", "message": path}}, status=404)
+
+            def do_POST(self):
+                path = self.path.split("?")[0].rstrip("/")
+                if path.endswith("/messages/batches"):
+                    body = json.loads(self._read_body() or b"{}")
+                    batch = server._create_batch("anthropic", [(r["custom_id"], r["params"]) for r in body.get("requests", [])])
+                    self._send_json(server._anthropic_batch_object(batch))
+                    return
+                if path.endswith("/files"):
+                    content = _multipart_file(self.headers.get("Content-Type", ""), self._read_body())
+                    file_id = server._store_file(content)
+                    self._send_json({
+                        "id": file_id, "object": "file", "bytes": len(content), "created_at": int(time.time()),
+                        "filename": "batch.jsonl", "purpose": "batch", "status": "processed"
+                    })
+                    return
+                if path.endswith("/batches"):
+                    body = json.loads(self._read_body() or b"{}")
+                    with server._lock:
+                        content = server._files.get(body.get("input_file_id"), b"")
+                    requests = [json.loads(line) for line in content.decode("utf-8").splitlines() if line.strip()]
+                    batch = server._create_batch("openai", [(r["custom_id"], r["body"]) for r in requests])
+                    batch["input_file_id"] = body.get("input_file_id")
+                    self._send_json(server._openai_batch_object(batch))
+                    return
+
+                body = json.loads(self._read_body() or b"{}")
+                fault = server._fault()
+                if fault:
+                    self._send_error(*fault)
+                    return
+                with server._lock:
+                    server.requests += 1
+                    server.in_flight += 1
+                    server.peak_in_flight = max(server.peak_in_flight, server.in_flight)
+                try:
+                    time.sleep(server.latency)
+                    model = body.get("model", "fake")
+                    if path.endswith("/messages"):
+                        text, usage, message = server._anthropic_reply(body)
+                        if body.get("stream"):
+                            self._send_sse(
+                                f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                                for event in server._anthropic_events(model, text, usage)
+                            )
+                        else:
+                            self._send_json(message)
+                    elif path.endswith("/chat/completions"):
+                        text, usage, completion = server._openai_reply(body)
+                        if body.get("stream"):
+                            include_usage = (body.get("stream_options") or {}).get("include_usage")
+                            chunks = server._openai_chunks(model, text, usage if include_usage else None)
+                            frames = [f"data: {json.dumps(chunk)}\n\n" for chunk in chunks]
+                            self._send_sse(iter(frames + ["data: [DONE]\n\n"]))
+                        else:
+                            self._send_json(completion)
+                    else:
+                        self._send_json({"error": {"type": "not_found", "message": self.path}}, status=404)
+                finally:
+                    with server._lock:
+                        server.in_flight -= 1
+
+        return Handler
+
+
+def benchmark_dispatch(languages: int, latency: float, concurrency: int) -> None:
+    """Time a fan-out run against the fake provider and print the speedup"""
+    fake = FakeProvider(latency=latency)
+    names = [f"Language {i + 1}" for i in range(languages)]
+    limiter = ProviderLimiter({"fake": concurrency})
+
+    started = time.perf_counter()
+    results = dispatch_tasks(
+        names,
+        build_prompt=lambda language: f"Target language: {language}\n\n{{\"hero_cta_signup\": \"Sign up\"}}",
+        translate=fake,
+        provider="fake",
+        limiter=limiter
+    )
+    wall = time.perf_counter() - started
+
+    failed = sum(1 for r in results.values() if r["error"])
+    print(f"Languages:        {languages}")
+    print(f"Concurrency:      {concurrency} (peak observed: {fake.peak_in_flight})")
+    print(f"Sequential est.:  {languages * latency:.2f}s")
+    print(f"Wall clock:       {wall:.2f}s")
+    print(f"Failed:           {failed}")
+
+
+def benchmark_http(
+    languages: int,
+    latency: float,
+    concurrency: int,
+    model_name: str,
+    stream: bool,
+    server_rpm: Optional[int] = None,
+    error_rate: float = 0.0,
+    client_rpm: Optional[int] = None
+) -> None:
+    """Time a fan-out run through the real async provider classes against the local HTTP stand-in
+
+    server_rpm and error_rate inject 429/529 responses; client_rpm paces the
+    dispatcher's request bucket so it stays under the server's limit.
+    """
+    from providers import ProviderRegistry
+    from translator import MODELS
+
+    server = FakeProviderServer(
+        latency=latency,
+        requests_per_minute=server_rpm,
+        window=1.0,
+        error_rate=error_rate
+    ).start()
+    model = MODELS[model_name]
+    registry = ProviderRegistry(
+        api_keys={"anthropic": "fake", "openai": "fake"},
+        config={
+            "anthropic": {"base_url": server.base_url},
+            "openai": {"base_url": server.base_url + "/v1"},
+        }
+    )
+    names = [f"Language {i + 1}" for i in range(languages)]
+    limiter = ProviderLimiter(
+        {model["provider"]: concurrency},
+        rates={model["provider"]: {"requests_per_minute": client_rpm}} if client_rpm else None,
+        max_retries=8,
+        backoff_base=0.1,
+        backoff_cap=2.0
+    )
+    stream_fn = registry.stream_fn(model)
+    # Create the client (SDK import included) before timing
+    registry.get(model["provider"])
+
+    started = time.perf_counter()
+    results = dispatch_tasks(
+        names,
+        build_prompt=lambda language: f"Target language: {language}\n\n{{\"hero_cta_signup\": \"Sign up\"}}",
+        translate=registry.translate_fn(model),
+        provider=model["provider"],
+        limiter=limiter,
+        translate_for=(lambda key: lambda prompt, temperature: "".join(stream_fn(prompt, temperature))) if stream else None
+    )
+    wall = time.perf_counter() - started
+    registry.close()
+    server.stop()
+
+    failed = [r["error"] for r in results.values() if r["error"]]
+    print(f"Model:            {model_name} via {server.base_url}{' (streaming)' if stream else ''}")
+    print(f"Languages:        {languages}")
+    print(f"Concurrency:      {concurrency} (peak observed: {server.peak_in_flight})")
+    print(f"Sequential est.:  {languages * latency:.2f}s")
+    print(f"Wall clock:       {wall:.2f}s ({languages / wall:.1f} req/s)")
+    if server_rpm or error_rate:
+        print(f"Injected errors:  {dict(sorted(server.rejected.items())) or 'none'}")
+        print(f"Retries:          {sum(r['retries'] for r in results.values())} (circuit: {limiter.status()[model['provider']]['circuit']})")
+    print(f"Failed:           {len(failed)}{' - ' + failed[0] if failed else ''}")
+
+
+# Corpus of messy model outputs with the object each should yield (null: nothing usable)
+MESSY_OUTPUTS_PATH = Path(__file__).parent / "messy_outputs.jsonl"
+
+
+def legacy_clean_json_output(text: str) -> str:
+    """The regex-based cleaner validate_json used before extract_json, kept as the benchmark baseline"""
+    if not text:
+        return ""
+    text = re.sub(r'^```json\s*\n?', '', text, flags=re.MULTILINE)
+    text = re.sub(r'^```\s*\n?', '', text, flags=re.MULTILINE)
+    text = re.sub(r'\n?```\s*$', '', text, flags=re.MULTILINE)
+    start = text.find('{')
+    end = text.rfind('}')
+    if start != -1 and end != -1 and end > start:
+        text = text[start:end+1]
+    return text.strip()
+
+
+def benchmark_json_extraction(path: Path = MESSY_OUTPUTS_PATH, repeat: int = 200) -> None:
+    """Compare the legacy cleaner + json.loads with extract_json on a corpus of messy outputs
+
+    Recovery counts outputs that yield exactly the expected object (or, when
+    none is expected, are rejected); throughput is over the whole corpus.
+    """
+    from json_extract import extract_json
+
+    with open(path, "r", encoding="utf-8") as f:
+        corpus = [json.loads(line) for line in f if line.strip()]
+    size = sum(len(case["output"].encode("utf-8")) for case in corpus)
+
+    def legacy(text: str) -> Optional[Dict[str, Any]]:
+        try:
+            parsed = json.loads(legacy_clean_json_output(text))
+        except json.JSONDecodeError:
+            return None
+        return parsed if isinstance(parsed, dict) else None
+
+    def extractor(text: str) -> Optional[Dict[str, Any]]:
+        return extract_json(text)[0]
+
+    # Outputs the legacy cleaner already handles: the fast path's cost on well-formed responses
+    well_formed = [case for case in corpus if case["expected"] is not None and legacy(case["output"]) == case["expected"]]
+    well_formed_size = sum(len(case["output"].encode("utf-8")) for case in well_formed)
+
+    def throughput(parse: Callable[[str], Any], cases: List[Dict[str, Any]], nbytes: int) -> str:
+        started = time.perf_counter()
+        for _ in range(repeat):
+            for case in cases:
+                parse(case["output"])
+        wall = time.perf_counter() - started
+        return f"{repeat * len(cases) / wall:>9,.0f} outputs/s {repeat * nbytes / wall / 1e6:>6.1f} MB/s"
+
+    print(f"Corpus: {len(corpus)} outputs, {size / 1024:.1f} KB ({path.name}); {len(well_formed)} well-formed")
+    print(f"{'':<26} {'recovered':>9}  {'all outputs':^31}  {'well-formed only':^31}")
+    failures = {}
+    for name, parse in (("legacy clean_json_output", legacy), ("extract_json", extractor)):
+        recovered = [case["name"] for case in corpus if parse(case["output"]) == case["expected"]]
+        failures[name] = [case["name"] for case in corpus if case["name"] not in recovered]
+        print(
+            f"{name:<26} {len(recovered):>5}/{len(corpus):<3}  "
+            f"{throughput(parse, corpus, size)}  {throughput(parse, well_formed, well_formed_size)}"
+        )
+    for name, missed in failures.items():
+        if missed:
+            print(f"{name} missed: {', '.join(missed)}")
+
+
+# Synthetic glossary words: English letter frequencies, so trigram statistics resemble real copy
+GLOSSARY_LETTERS = "etaoinshrdlcumwfgypbvkjxqz"
+GLOSSARY_LETTER_WEIGHTS = (
+    12.7, 9.1, 8.2, 7.5, 7.0, 6.7, 6.3, 6.1, 6.0, 4.3, 4.0, 2.8, 2.8,
+    2.4, 2.4, 2.2, 2.0, 2.0, 1.9, 1.5, 1.0, 0.8, 0.2, 0.2, 0.1, 0.1,
+)
+
+
+def synthetic_glossary_entries(entries: int, vocabulary: int = 20_000, seed: int = 0) -> List[Tuple[str, str]]:
+    """entries distinct (source, translation) pairs of 2-6 words, reproducible for a seed
+
+    Words are drawn Zipf-style from a vocabulary of pseudo-words (a few very
+    common, most rare), as in real UI copy; the translation is the words reversed.
+    """
+    rng = random.Random(seed)
+    words: Dict[str, None] = {}
+    while len(words) < vocabulary:
+        words["".join(rng.choices(GLOSSARY_LETTERS, weights=GLOSSARY_LETTER_WEIGHTS, k=rng.randint(3, 10)))] = None
+    ranked = list(words)
+    cumulative = list(accumulate(1 / rank for rank in range(1, vocabulary + 1)))
+    pairs: Dict[str, str] = {}
+    while len(pairs) < entries:
+        chosen = rng.choices(ranked, cum_weights=cumulative, k=rng.randint(2, 6))
+        pairs[" ".join(chosen).capitalize()] = " ".join(word[::-1] for word in chosen).capitalize()
+    return list(pairs.items())
+
+
+def fuzzy_queries(sources: List[str], count: int, seed: int = 1) -> List[str]:
+    """Near misses of random sources (one word dropped or one character changed), as typed by a copywriter"""
+    rng = random.Random(seed)
+    queries = []
+    for source in rng.sample(sources, count):
+        words = source.split()
+        if len(words) > 3 and rng.random() < 0.5:
+            del words[rng.randrange(len(words))]
+            queries.append(" ".join(words))
+        else:
+            index = rng.randrange(len(source))
+            queries.append(source[:index] + rng.choice("aeiost") + source[index + 1:])
+    return queries
+
+
+def benchmark_glossary(entries: int = 100_000, lookups: int = 1000) -> None:
+    """Build a synthetic one-language glossary and time exact and fuzzy lookups"""
+    from glossary import Glossary
+
+    pairs = synthetic_glossary_entries(entries)
+    started = time.perf_counter()
+    glossary = Glossary()
+    for source, translation in pairs:
+        glossary.add("French", source, translation)
+    glossary.index("French")
+    print(f"Glossary: {len(glossary):,} entries indexed in {time.perf_counter() - started:.2f}s")
+
+    sources = [source for source, _ in pairs]
+    for name, queries, lookup in (
+        ("exact", random.Random(2).sample(sources, lookups), glossary.exact),
+        ("fuzzy", fuzzy_queries(sources, lookups), glossary.fuzzy),
+    ):
+        started = time.perf_counter()
+        hits = sum(1 for query in queries if lookup("French", query))
+        wall = time.perf_counter() - started
+        print(f"{name:<6} {wall / len(queries) * 1000:.3f} ms/lookup, {hits}/{len(queries)} hit")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark concurrent dispatch against a fake provider")
+    parser.add_argument("--languages", type=int, default=16)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--http", metavar="MODEL", help="Go through the real provider classes and a local HTTP stand-in, e.g. 'Claude Opus 4.5' or 'GPT-5.1'")
+    parser.add_argument("--stream", action="store_true", help="With --http, use the streaming endpoints")
+    parser.add_argument("--serve", type=int, metavar="PORT", help="Only run the HTTP stand-in on PORT until interrupted")
+    parser.add_argument("--server-rpm", type=int, help="HTTP stand-in answers 429 + Retry-After above this many requests/min")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of HTTP stand-in requests answered with 529 overloaded")
+    parser.add_argument("--rpm", type=int, help="With --http, client-side requests/min for the dispatcher")
+    parser.add_argument("--json-extract", action="store_true", help="Benchmark JSON extraction on messy_outputs.jsonl instead")
+    parser.add_argument("--glossary", type=int, metavar="ENTRIES", help="Benchmark glossary lookups on this many synthetic entries instead")
+    parser.add_argument("--batch-latency", type=float, default=2.0, help="Seconds before an HTTP stand-in batch ends")
+    args = parser.parse_args()
+    if args.json_extract:
+        benchmark_json_extraction()
+    elif args.glossary:
+        benchmark_glossary(args.glossary)
+    elif args.serve is not None:
+        server = FakeProviderServer(
+            port=args.serve,
+            latency=args.latency,
+            requests_per_minute=args.server_rpm,
+            error_rate=args.error_rate,
+            batch_latency=args.batch_latency
+        ).start()
+        print(f"Fake provider listening: ANTHROPIC_BASE_URL={server.base_url} OPENAI_BASE_URL={server.base_url}/v1")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.stop()
+    elif args.http:
+        benchmark_http(
+            args.languages, args.latency, args.concurrency, args.http, args.stream,
+            server_rpm=args.server_rpm, error_rate=args.error_rate, client_rpm=args.rpm
+        )
+    else:
+        benchmark_dispatch(args.languages, args.latency, args.concurrency)
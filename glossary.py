@@ -0,0 +1,236 @@
+import csv
+import json
+import math
+import sys
+import unicodedata
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from itertools import chain
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from scoring import normalize
+
+DEFAULT_GLOSSARY_PATH = Path(__file__).parent / "glossary"
+
+# Files read by Glossary.load: {"French": {"Sign up": "S'inscrire"}} JSON, or
+# JSONL / CSV / TSV rows with language, source and translation columns
+GLOSSARY_SUFFIXES = (".json", ".jsonl", ".csv", ".tsv")
+
+# Fuzzy matches: character trigram Dice similarity of the normalize()d source strings
+NGRAM = 3
+FUZZY_THRESHOLD = 0.6
+
+# Fuzzy candidates are the entries sharing PROBE_SHARED of the query's PROBE_GRAMS rarest trigrams
+PROBE_GRAMS = 5
+PROBE_SHARED = 2
+
+# Hints per looked-up string, and per prompt
+MAX_HINTS = 3
+MAX_PROMPT_HINTS = 20
+
+
+def exact_key(text: str) -> str:
+    """Exact-match form: NFC with whitespace collapsed; case and punctuation still count"""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def ngrams(text: str) -> frozenset:
+    """Character trigrams of the normalize()d text, padded so word edges count"""
+    text = f" {normalize(text)} "
+    if len(text) <= NGRAM:
+        return frozenset((text,))
+    return frozenset(text[i:i + NGRAM] for i in range(len(text) - NGRAM + 1))
+
+
+def glossary_files(paths: Iterable[Path]) -> List[Path]:
+    """Glossary files named by paths: files as given, directories searched for GLOSSARY_SUFFIXES"""
+    files = []
+    for path in map(Path, paths):
+        files.extend(sorted(file for file in path.rglob("*") if file.suffix in GLOSSARY_SUFFIXES) if path.is_dir() else [path])
+    return files
+
+
+def glossary_stamps(paths: Iterable[Path]) -> Tuple[Tuple[str, int], ...]:
+    """(file, mtime) of every glossary file under paths, to tell when a loaded glossary is stale"""
+    return tuple((str(file), file.stat().st_mtime_ns) for file in glossary_files(paths) if file.exists())
+
+
+def read_entries(path: Path) -> Iterator[Tuple[str, str, str]]:
+    """(language, source, translation) rows of one glossary file"""
+    path = Path(path)
+    with open(path, encoding="utf-8", newline="") as handle:
+        if path.suffix == ".json":
+            for language, entries in json.load(handle).items():
+                for source, translation in entries.items():
+                    yield language, source, translation
+        elif path.suffix == ".jsonl":
+            for line in handle:
+                if line.strip():
+                    row = json.loads(line)
+                    yield row["language"], row["source"], row["translation"]
+        elif path.suffix in (".csv", ".tsv"):
+            for row in csv.DictReader(handle, delimiter="\t" if path.suffix == ".tsv" else ","):
+                yield row["language"], row["source"], row["translation"]
+        else:
+            raise ValueError(f"Unsupported glossary file: {path}")
+
+
+class FuzzyIndex:
+    """Trigram index of one language's entries, numbered in order of trigram count
+
+    Because entries are sorted by size, the sizes Dice allows for a query
+    form one index range, and every posting list (ascending indexes) is cut
+    to that range by bisection before any candidate is touched.
+    """
+
+    __slots__ = ("sizes", "grams", "sources", "translations", "postings")
+
+    def __init__(self, entries: Iterable[Tuple[str, str]]):
+        rows = sorted(
+            # Interned, so 100k entries share one string object per distinct trigram
+            ((tuple(sys.intern(gram) for gram in ngrams(source)), source, translation) for source, translation in entries),
+            key=lambda row: len(row[0])
+        )
+        self.sizes = array("I", (len(row[0]) for row in rows))
+        self.grams = [row[0] for row in rows]
+        self.sources = [row[1] for row in rows]
+        self.translations = [row[2] for row in rows]
+        self.postings: Dict[str, array] = {}
+        for index, grams in enumerate(self.grams):
+            for gram in grams:
+                if gram not in self.postings:
+                    self.postings[gram] = array("I")
+                self.postings[gram].append(index)
+
+    def search(self, text: str, threshold: float, limit: int) -> List[Dict[str, Any]]:
+        grams = ngrams(text)
+        m = len(grams)
+        # Dice = 2 * shared / (m + n) can only reach the threshold for n in [low, high]
+        start = bisect_left(self.sizes, math.ceil(threshold * m / (2 - threshold)))
+        stop = bisect_right(self.sizes, math.floor((2 - threshold) * m / threshold))
+        if start >= stop:
+            return []
+
+        # Candidates share one of the query's rarest trigrams (within that size range)
+        spans = []
+        for gram in grams:
+            posting = self.postings.get(gram)
+            if posting is not None:
+                low, high = bisect_left(posting, start), bisect_left(posting, stop)
+                if high > low:
+                    spans.append((high - low, posting, low, high))
+        spans.sort(key=lambda span: span[0])
+        probes = spans[:PROBE_GRAMS]
+        shared = Counter(chain.from_iterable(posting[low:high] for _, posting, low, high in probes))
+        needed = min(PROBE_SHARED, len(probes))
+        candidates = [index for index, count in shared.items() if count >= needed]
+
+        sizes = self.sizes
+        entry_grams = self.grams
+        scored = []
+        for index in candidates:
+            score = 2 * len(grams.intersection(entry_grams[index])) / (m + sizes[index])
+            if score >= threshold:
+                scored.append((score, index))
+        scored.sort(reverse=True)
+        return [
+            {"source": self.sources[index], "translation": self.translations[index], "score": round(score, 3)}
+            for score, index in scored[:limit]
+        ]
+
+
+class Glossary:
+    """Approved translations of source strings per language, with exact and fuzzy lookup
+
+    Exact lookups are one dict probe. Fuzzy lookups go through a per-language
+    FuzzyIndex: only the postings of the query's PROBE_GRAMS rarest trigrams,
+    cut to the entry sizes that could reach the threshold, are read, and those
+    candidates are scored by Dice over all trigrams. This keeps a lookup under
+    a millisecond at 100k+ entries; the price is that a weak match sharing
+    none of the rare trigrams can be missed. Indexes are (re)built on the
+    first fuzzy lookup after entries change. Later entries for the same
+    language and source replace earlier ones.
+    """
+
+    def __init__(self, threshold: float = FUZZY_THRESHOLD):
+        self.threshold = threshold
+        self._exact: Dict[str, Dict[str, str]] = {}
+        self._sources: Dict[str, Dict[str, str]] = {}
+        self._indexes: Dict[str, FuzzyIndex] = {}
+        self.files: List[str] = []
+
+    @classmethod
+    def load(cls, paths: Iterable[Path], threshold: float = FUZZY_THRESHOLD) -> "Glossary":
+        """Glossary from files and/or directories of files (see GLOSSARY_SUFFIXES), indexed up front"""
+        glossary = cls(threshold)
+        for file in glossary_files(paths):
+            for language, source, translation in read_entries(file):
+                glossary.add(language, source, translation)
+            glossary.files.append(str(file))
+        for language in glossary.languages():
+            glossary.index(language)
+        return glossary
+
+    def __len__(self) -> int:
+        return sum(len(entries) for entries in self._exact.values())
+
+    def languages(self) -> List[str]:
+        return list(self._exact)
+
+    def add(self, language: str, source: str, translation: str) -> None:
+        key = exact_key(source)
+        self._exact.setdefault(language, {})[key] = translation
+        self._sources.setdefault(language, {})[key] = source
+        self._indexes.pop(language, None)
+
+    def index(self, language: str) -> Optional[FuzzyIndex]:
+        """The language's fuzzy index, built if entries changed since the last one"""
+        if language not in self._exact:
+            return None
+        if language not in self._indexes:
+            sources = self._sources[language]
+            self._indexes[language] = FuzzyIndex(
+                (sources[key], translation) for key, translation in self._exact[language].items()
+            )
+        return self._indexes[language]
+
+    def exact(self, language: str, text: str) -> Optional[str]:
+        """The approved translation of exactly this source string, if any"""
+        entries = self._exact.get(language)
+        return entries.get(exact_key(text)) if entries else None
+
+    def fuzzy(self, language: str, text: str, limit: int = MAX_HINTS) -> List[Dict[str, Any]]:
+        """Up to limit entries whose source is similar to text (score = trigram Dice, 0-1), best first"""
+        index = self.index(language)
+        if index is None or not text.strip():
+            return []
+        return index.search(text, self.threshold, limit)
+
+    def approved(self, language: str, values: Dict[str, Any]) -> Dict[str, str]:
+        """Exact glossary hits among string values, keyed like values"""
+        entries = self._exact.get(language)
+        if not entries:
+            return {}
+        hits = {}
+        for key, value in values.items():
+            if isinstance(value, str):
+                translation = entries.get(exact_key(value))
+                if translation is not None:
+                    hits[key] = translation
+        return hits
+
+    def hints(self, language: str, values: Dict[str, Any], limit: int = MAX_PROMPT_HINTS) -> List[List[str]]:
+        """[source, translation] pairs of fuzzy matches for the string values, best per value first, deduplicated"""
+        hints, seen = [], set()
+        for value in values.values():
+            if not isinstance(value, str):
+                continue
+            for match in self.fuzzy(language, value):
+                if match["source"] not in seen:
+                    seen.add(match["source"])
+                    hints.append([match["source"], match["translation"]])
+                if len(hints) >= limit:
+                    return hints
+        return hints
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from validation import SourceFacts
+
+DEFAULT_MEMORY_PATH = Path(__file__).parent / ".cache" / "key_memory.sqlite3"
+
+
+def make_scope(model_id: str, template: str, temperature: float = 0.3, samples: int = 1) -> str:
+    """Translations are only reused for the same model, prompt template and sampling
+
+    Temperature and best-of-n are part of the scope, so re-running with other
+    sampling settings actually asks the model again instead of reusing keys.
+    """
+    digest = hashlib.sha256(template.encode("utf-8")).hexdigest()[:16]
+    return f"{model_id}:t{temperature:g}:n{samples}:{digest}"
+
+
+def _encode(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True)
+
+
+class KeyMemory:
+    """Per-key translation memory: last source string and its translation per language"""
+
+    def __init__(self, path: Path = DEFAULT_MEMORY_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS key_translations (
+                scope TEXT NOT NULL,
+                language TEXT NOT NULL,
+                key TEXT NOT NULL,
+                source TEXT NOT NULL,
+                translation TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (scope, language, key)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def diff(self, scope: str, language: str, source: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """Split source keys into (reused translations, keys that still need the model)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, source, translation FROM key_translations WHERE scope = ? AND language = ?",
+                (scope, language)
+            ).fetchall()
+        stored = {key: (stored_source, translation) for key, stored_source, translation in rows}
+
+        reused, pending = {}, {}
+        for key, value in source.items():
+            entry = stored.get(key)
+            if entry is not None and entry[0] == _encode(value):
+                reused[key] = json.loads(entry[1])
+            else:
+                pending[key] = value
+        return reused, pending
+
+    def record(
+        self,
+        scope: str,
+        language: str,
+        source: Dict[str, Any],
+        translated: Dict[str, Any],
+        facts: Optional[SourceFacts] = None
+    ) -> int:
+        """Remember translated keys that pass the per-key checks; returns how many were stored
+
+        Keys failing SourceFacts.check (placeholders, HTML tags, 'Cashy', char
+        limits) are not stored, so the next run sends them to the model again.
+        facts may cover more keys than source.
+        """
+        facts = facts or SourceFacts(source)
+        now = time.time()
+        rows = [
+            (scope, language, key, _encode(source[key]), _encode(value), now)
+            for key, value in translated.items()
+            if key in source and not facts.check(key, value)
+        ]
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO key_translations VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self._conn.commit()
+        return len(rows)
+
+
+def merge_translations(source: Dict[str, Any], reused: Dict[str, Any], translated: Dict[str, Any]) -> Dict[str, Any]:
+    """Rebuild a complete object in source key order; fresh translations win over reused ones"""
+    merged = {}
+    for key in source:
+        if key in translated:
+            merged[key] = translated[key]
+        elif key in reused:
+            merged[key] = reused[key]
+    # Keep unexpected keys so the "Same keys" check still reports them
+    for key, value in translated.items():
+        if key not in merged:
+            merged[key] = value
+    return merged
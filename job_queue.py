@@ -0,0 +1,739 @@
+import argparse
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+from dispatch import ProviderLimiter
+from glossary import Glossary, glossary_stamps
+from incremental import KeyMemory
+from providers import PROVIDER_CONFIG, ProviderRegistry
+from run_store import RunStore, make_run, new_run_id
+from telemetry import Tracer
+from translation_cache import TranslationCache
+from translator import merge_stats, translate_json
+
+DEFAULT_JOBS_PATH = Path(__file__).parent / ".cache" / "jobs.sqlite3"
+
+# Worker processes started by default: one per core, up to 4
+DEFAULT_WORKERS = max(1, min(4, os.cpu_count() or 1))
+
+# Languages a worker takes from one job and model at a time; they run concurrently within the worker
+DEFAULT_CLAIM_SIZE = 4
+
+# Seconds between worker heartbeats; running tasks silent for STALE_AFTER go back to the queue
+HEARTBEAT_INTERVAL = 5.0
+STALE_AFTER = 30.0
+
+# A task whose worker died this many times fails instead of being requeued
+MAX_ATTEMPTS = 3
+
+# Seconds an idle worker sleeps between queue checks
+POLL_INTERVAL = 0.5
+
+# Seconds of finished tasks behind the throughput figures
+THROUGHPUT_WINDOW = 300.0
+
+# Job states; tasks (one per model x language) use QUEUED, RUNNING, DONE, FAILED and CANCELLED
+QUEUED = "queued"
+RUNNING = "running"
+CANCELLING = "cancelling"
+DONE = "done"
+FAILED = "failed"
+CANCELLED = "cancelled"
+ACTIVE = (QUEUED, RUNNING, CANCELLING)
+
+# Run stats of a model none of whose languages finished
+EMPTY_STATS = dict.fromkeys((
+    "languages", "requests", "cached", "coalesced", "reused_keys", "glossary_keys", "sent_keys",
+    "input_tokens", "output_tokens", "cache_read_tokens", "retries", "cost", "elapsed",
+), 0)
+
+
+def job_spec(
+    mode: str,
+    source: Dict[str, Any],
+    json_input: str,
+    template: str,
+    languages: List[str],
+    models: Dict[str, Dict[str, Any]],
+    temperature: float = 0.3,
+    use_cache: bool = True,
+    incremental: bool = True,
+    chunk_tokens: int = 0,
+    prompt_caching: bool = True,
+    repair_rounds: int = 0,
+    samples: int = 1,
+    glossary: Tuple[str, ...] = (),
+    concurrency: Optional[Dict[str, int]] = None,
+    rate_limits: Tuple[Tuple[str, int, int], ...] = (),
+    settings: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """Everything a worker needs to run a translation, as stored with the job
+
+    models maps display names to model configs (one unless mode is "compare").
+    glossary holds file or folder paths, loaded by the worker. concurrency and
+    rate_limits (provider, requests/min, tokens/min) apply per worker process.
+    settings is copied into the finished run as-is.
+    """
+    return {
+        "mode": mode,
+        "source": source,
+        "json_input": json_input,
+        "template": template,
+        "languages": list(languages),
+        "models": models,
+        "options": {
+            "temperature": temperature,
+            "use_cache": use_cache,
+            "incremental": incremental,
+            "chunk_tokens": chunk_tokens,
+            "prompt_caching": prompt_caching,
+            "repair_rounds": repair_rounds,
+            "samples": samples,
+        },
+        "glossary": [str(path) for path in glossary],
+        "concurrency": dict(concurrency or {}),
+        "rate_limits": [list(limit) for limit in rate_limits],
+        "settings": dict(settings or {}),
+    }
+
+
+def unfinished_result(error: str) -> Dict[str, Any]:
+    """Result of a language that never ran to completion, shaped like collect_results' results"""
+    return {
+        "valid": False,
+        "parsed": None,
+        "error": error,
+        "raw": None,
+        "prompt": "",
+        "cached": False,
+        "elapsed": 0.0,
+        "first_token": None,
+        "queue_wait": 0.0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "cache_read_tokens": 0,
+        "retries": 0,
+        "cost": 0.0,
+        "json_repairs": [],
+        "chunks": []
+    }
+
+
+def _compress(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, ensure_ascii=False).encode("utf-8"))
+
+
+def _decompress(value: Optional[bytes]) -> Any:
+    return json.loads(zlib.decompress(value)) if value is not None else None
+
+
+class JobQueue:
+    """Durable queue of translation jobs in SQLite, shared by the app, the CLI and worker processes
+
+    A job is split into one task per model x language. Workers claim a few
+    queued tasks of one job and model at a time, and each language's result
+    is checkpointed the moment it finishes, so a crash or restart loses at
+    most the languages in flight: their tasks go back to the queue once the
+    worker's heartbeat is STALE_AFTER seconds old (and fail after
+    MAX_ATTEMPTS). When a job's last task ends, the worker finishing it
+    assembles the run (see make_run) and saves it to the run store.
+    """
+
+    def __init__(self, path: Path = DEFAULT_JOBS_PATH):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Autocommit; writes that read first take the database lock with BEGIN IMMEDIATE
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False, timeout=30.0, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS jobs (
+                id TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                status TEXT NOT NULL,
+                label TEXT NOT NULL,
+                spec BLOB NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                run_id TEXT
+            );
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                job_id TEXT NOT NULL,
+                model TEXT NOT NULL,
+                language TEXT NOT NULL,
+                position INTEGER NOT NULL,
+                keys INTEGER NOT NULL,
+                state TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                worker TEXT,
+                claimed_at REAL,
+                heartbeat REAL,
+                finished_at REAL,
+                result BLOB,
+                stats TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_tasks_state ON tasks(state, job_id);
+            CREATE INDEX IF NOT EXISTS idx_tasks_job ON tasks(job_id, model, position);
+            CREATE INDEX IF NOT EXISTS idx_tasks_finished_at ON tasks(finished_at);
+            CREATE TABLE IF NOT EXISTS workers (
+                id TEXT PRIMARY KEY,
+                pid INTEGER NOT NULL,
+                started_at REAL NOT NULL,
+                heartbeat REAL NOT NULL
+            );
+            """
+        )
+
+    def _write(self, statements: List[Tuple[str, tuple]]) -> None:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, params in statements:
+                    self._conn.execute(sql, params)
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def enqueue(self, spec: Dict[str, Any], label: str = "") -> str:
+        """Queue a job (as from job_spec) and return its id"""
+        job_id = new_run_id()
+        keys = len(spec["source"])
+        label = label or f"{', '.join(spec['models'])} · {len(spec['languages'])} language(s) · {keys} key(s)"
+        statements = [(
+            "INSERT INTO jobs (id, created_at, status, label, spec) VALUES (?, ?, ?, ?, ?)",
+            (job_id, time.time(), QUEUED, label, _compress(spec))
+        )]
+        for model in spec["models"]:
+            for position, language in enumerate(spec["languages"]):
+                statements.append((
+                    "INSERT INTO tasks (job_id, model, language, position, keys, state) VALUES (?, ?, ?, ?, ?, ?)",
+                    (job_id, model, language, position, keys, QUEUED)
+                ))
+        self._write(statements)
+        return job_id
+
+    def spec(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT spec FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return _decompress(row[0]) if row else None
+
+    def claim(self, worker: str, limit: int = DEFAULT_CLAIM_SIZE) -> Optional[Dict[str, Any]]:
+        """Mark up to limit queued languages of the oldest waiting job and model as this worker's
+
+        Returns {"job_id", "model", "tasks": {language: task id}}, or None if nothing is queued.
+        """
+        now = time.time()
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    """
+                    SELECT t.job_id, t.model FROM tasks t JOIN jobs j ON j.id = t.job_id
+                    WHERE t.state = ? AND j.status IN (?, ?)
+                    ORDER BY j.created_at, t.id LIMIT 1
+                    """,
+                    (QUEUED, QUEUED, RUNNING)
+                ).fetchone()
+                if row is None:
+                    self._conn.execute("COMMIT")
+                    return None
+                job_id, model = row
+                tasks = self._conn.execute(
+                    "SELECT id, language FROM tasks WHERE job_id = ? AND model = ? AND state = ? ORDER BY position LIMIT ?",
+                    (job_id, model, QUEUED, limit)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE tasks SET state = ?, worker = ?, claimed_at = ?, heartbeat = ?, attempts = attempts + 1 WHERE id = ?",
+                    [(RUNNING, worker, now, now, task_id) for task_id, _ in tasks]
+                )
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, started_at = COALESCE(started_at, ?) WHERE id = ? AND status = ?",
+                    (RUNNING, now, job_id, QUEUED)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return {"job_id": job_id, "model": model, "tasks": {language: task_id for task_id, language in tasks}}
+
+    def checkpoint(self, task_id: int, result: Dict[str, Any]) -> None:
+        """Store one language's result for good; cancelled languages end CANCELLED, invalid ones FAILED"""
+        state = DONE if result["valid"] else CANCELLED if result["error"] == "Cancelled" else FAILED
+        self._write([(
+            "UPDATE tasks SET state = ?, result = ?, finished_at = ? WHERE id = ?",
+            (state, _compress(result), time.time(), task_id)
+        )])
+
+    def record_stats(self, task_id: int, stats: Dict[str, Any], spans: List[Dict[str, Any]]) -> None:
+        """Attach a claim's run stats and call spans (they cover all its languages) to one of its tasks"""
+        self._write([("UPDATE tasks SET stats = ? WHERE id = ?", (json.dumps({"stats": stats, "spans": spans}), task_id))])
+
+    def heartbeat(self, worker: str, task_ids: Tuple[int, ...] = ()) -> None:
+        """Mark the worker, and its tasks still running, as alive"""
+        now = time.time()
+        statements = [(
+            "INSERT INTO workers (id, pid, started_at, heartbeat) VALUES (?, ?, ?, ?) "
+            "ON CONFLICT(id) DO UPDATE SET heartbeat = excluded.heartbeat",
+            (worker, os.getpid(), now, now)
+        )]
+        if task_ids:
+            statements.append((
+                f"UPDATE tasks SET heartbeat = ? WHERE state = ? AND id IN ({','.join('?' * len(task_ids))})",
+                (now, RUNNING, *task_ids)
+            ))
+        self._write(statements)
+
+    def retire(self, worker: str) -> None:
+        """Forget a worker that is shutting down"""
+        self._write([("DELETE FROM workers WHERE id = ?", (worker,))])
+
+    def requeue_stale(self, stale_after: float = STALE_AFTER) -> int:
+        """Put running tasks without a recent heartbeat back in the queue (or fail them); returns how many"""
+        cutoff = time.time() - stale_after
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                cursor = self._conn.execute(
+                    """
+                    UPDATE tasks SET state = CASE
+                        WHEN attempts >= ? THEN ?
+                        WHEN (SELECT status FROM jobs WHERE jobs.id = tasks.job_id) = ? THEN ?
+                        ELSE ? END,
+                        worker = NULL, finished_at = CASE WHEN attempts >= ? THEN ? ELSE NULL END
+                    WHERE state = ? AND heartbeat < ?
+                    """,
+                    (MAX_ATTEMPTS, FAILED, CANCELLING, CANCELLED, QUEUED, MAX_ATTEMPTS, time.time(), RUNNING, cutoff)
+                )
+                self._conn.execute("DELETE FROM workers WHERE heartbeat < ?", (cutoff,))
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return cursor.rowcount
+
+    def cancel(self, job_id: str) -> None:
+        """Drop the job's queued languages; workers stop sending its requests at their next heartbeat"""
+        self._write([
+            ("UPDATE jobs SET status = ? WHERE id = ? AND status IN (?, ?)", (CANCELLING, job_id, QUEUED, RUNNING)),
+            ("UPDATE tasks SET state = ?, finished_at = ? WHERE job_id = ? AND state = ?", (CANCELLED, time.time(), job_id, QUEUED)),
+        ])
+
+    def cancelling(self, job_id: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row is not None and row[0] == CANCELLING
+
+    def finalize(self, job_id: str, run_store: RunStore) -> Optional[str]:
+        """Save the run of a job whose tasks have all ended; returns its run id (None if still going)"""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                job = self._conn.execute(
+                    "SELECT status, spec, created_at, started_at FROM jobs WHERE id = ?", (job_id,)
+                ).fetchone()
+                pending = self._conn.execute(
+                    "SELECT COUNT(*) FROM tasks WHERE job_id = ? AND state IN (?, ?)", (job_id, QUEUED, RUNNING)
+                ).fetchone()[0]
+                if job is None or job[0] not in ACTIVE or pending:
+                    self._conn.execute("COMMIT")
+                    return None
+                status, spec, created_at, started_at = job[0], _decompress(job[1]), job[2], job[3]
+                rows = self._conn.execute(
+                    "SELECT model, language, state, attempts, result, stats FROM tasks WHERE job_id = ? ORDER BY model, position",
+                    (job_id,)
+                ).fetchall()
+                results = {model: {} for model in spec["models"]}
+                parts = {model: [EMPTY_STATS] for model in spec["models"]}
+                spans = []
+                for model, language, state, attempts, result, stats in rows:
+                    if result is not None:
+                        results[model][language] = _decompress(result)
+                    elif state == CANCELLED:
+                        results[model][language] = unfinished_result("Cancelled")
+                    else:
+                        results[model][language] = unfinished_result(f"Worker stopped {attempts} time(s) while translating")
+                    if stats:
+                        stats = json.loads(stats)
+                        parts[model].append(stats["stats"])
+                        spans.extend(stats["spans"])
+                finished_at = time.time()
+                run = make_run(
+                    spec["mode"], spec["source"], spec["json_input"], spec["template"], spec["languages"],
+                    results, {model: merge_stats(part) for model, part in parts.items()},
+                    settings={**spec["settings"], "job": job_id},
+                    spans=sorted(spans, key=lambda span: span["start"]),
+                    elapsed=finished_at - (started_at or created_at)
+                )
+                run_store.save(run)
+                self._conn.execute(
+                    "UPDATE jobs SET status = ?, run_id = ?, finished_at = ? WHERE id = ?",
+                    (CANCELLED if status == CANCELLING else DONE, run["id"], finished_at, job_id)
+                )
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+        return run["id"]
+
+    def finalize_ended(self, run_store: RunStore) -> List[str]:
+        """Finalize every active job left without queued or running tasks (e.g. after requeue_stale failed its last ones)"""
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute(
+                f"""
+                SELECT id FROM jobs WHERE status IN ({','.join('?' * len(ACTIVE))})
+                AND NOT EXISTS (SELECT 1 FROM tasks WHERE tasks.job_id = jobs.id AND tasks.state IN (?, ?))
+                """,
+                (*ACTIVE, QUEUED, RUNNING)
+            )]
+        return [run_id for run_id in (self.finalize(job_id, run_store) for job_id in ids) if run_id]
+
+    def status(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """A job's state, per-state task counts, progress (0-1) and one row per model x language"""
+        with self._lock:
+            job = self._conn.execute(
+                "SELECT id, created_at, status, label, started_at, finished_at, run_id FROM jobs WHERE id = ?", (job_id,)
+            ).fetchone()
+            if job is None:
+                return None
+            tasks = self._conn.execute(
+                "SELECT model, language, state, attempts, worker, claimed_at, finished_at FROM tasks WHERE job_id = ? ORDER BY model, position",
+                (job_id,)
+            ).fetchall()
+        now = time.time()
+        counts = dict.fromkeys((QUEUED, RUNNING, DONE, FAILED, CANCELLED), 0)
+        for task in tasks:
+            counts[task[2]] += 1
+        ended = counts[DONE] + counts[FAILED] + counts[CANCELLED]
+        return {
+            "id": job[0],
+            "created_at": job[1],
+            "status": job[2],
+            "label": job[3],
+            "started_at": job[4],
+            "finished_at": job[5],
+            "run_id": job[6],
+            "elapsed": ((job[5] or now) - job[4]) if job[4] else 0.0,
+            "counts": counts,
+            "progress": ended / len(tasks) if tasks else 1.0,
+            "tasks": [
+                {
+                    "model": model,
+                    "language": language,
+                    "state": state,
+                    "attempts": attempts,
+                    "worker": worker,
+                    "elapsed": round((finished_at or now) - claimed_at, 3) if claimed_at else None,
+                }
+                for model, language, state, attempts, worker, claimed_at, finished_at in tasks
+            ],
+        }
+
+    def jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Status of the most recent jobs, newest first"""
+        with self._lock:
+            ids = [row[0] for row in self._conn.execute("SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?", (limit,))]
+        return [status for status in map(self.status, ids) if status is not None]
+
+    def metrics(self, window: float = THROUGHPUT_WINDOW) -> Dict[str, Any]:
+        """Queue depth, live workers and throughput over the last window seconds
+
+        Rates are per minute, measured from the first claim among the tasks
+        finished in the window; eta_seconds is the queued and running work at that rate.
+        """
+        now = time.time()
+        with self._lock:
+            depth = dict(self._conn.execute(
+                "SELECT state, COUNT(*) FROM tasks WHERE state IN (?, ?) GROUP BY state", (QUEUED, RUNNING)
+            ).fetchall())
+            active_jobs = self._conn.execute(
+                f"SELECT COUNT(*) FROM jobs WHERE status IN ({','.join('?' * len(ACTIVE))})", ACTIVE
+            ).fetchone()[0]
+            oldest = self._conn.execute(
+                "SELECT MIN(j.created_at) FROM tasks t JOIN jobs j ON j.id = t.job_id WHERE t.state = ?", (QUEUED,)
+            ).fetchone()[0]
+            workers = self._conn.execute(
+                "SELECT COUNT(*) FROM workers WHERE heartbeat >= ?", (now - STALE_AFTER,)
+            ).fetchone()[0]
+            busy = self._conn.execute(
+                "SELECT COUNT(DISTINCT worker) FROM tasks WHERE state = ?", (RUNNING,)
+            ).fetchone()[0]
+            finished, keys, first_claim, task_seconds = self._conn.execute(
+                "SELECT COUNT(*), SUM(keys), MIN(claimed_at), AVG(finished_at - claimed_at) FROM tasks "
+                "WHERE finished_at >= ? AND state IN (?, ?) AND claimed_at IS NOT NULL",
+                (now - window, DONE, FAILED)
+            ).fetchone()
+        minutes = max(now - max(first_claim or now, now - window), 1.0) / 60
+        per_minute = finished / minutes
+        queued, running = depth.get(QUEUED, 0), depth.get(RUNNING, 0)
+        return {
+            "queued": queued,
+            "running": running,
+            "active_jobs": active_jobs,
+            "workers": workers,
+            "busy_workers": busy,
+            "oldest_queued_seconds": round(now - oldest, 1) if oldest else 0.0,
+            "languages_per_minute": round(per_minute, 2),
+            "keys_per_minute": round((keys or 0) / minutes, 1),
+            "avg_language_seconds": round(task_seconds or 0.0, 2),
+            "eta_seconds": round((queued + running) / per_minute * 60, 1) if per_minute else None,
+        }
+
+    def idle(self) -> bool:
+        """Nothing queued or running"""
+        with self._lock:
+            row = self._conn.execute("SELECT 1 FROM tasks WHERE state IN (?, ?) LIMIT 1", (QUEUED, RUNNING)).fetchone()
+        return row is None
+
+
+class _Worker:
+    """Per-process state of one worker: stores, provider clients, limiters and glossaries, reused across claims"""
+
+    def __init__(self, queue: JobQueue, worker_id: str, api_keys: Optional[Dict[str, str]] = None):
+        self.queue = queue
+        self.id = worker_id
+        self.registry = ProviderRegistry(api_keys)
+        self.cache = TranslationCache()
+        self.key_memory = KeyMemory()
+        self.run_store = RunStore()
+        self._limiters: Dict[str, ProviderLimiter] = {}
+        self._glossaries: Dict[tuple, Glossary] = {}
+        self._running: Tuple[int, ...] = ()
+        self._job: Optional[str] = None
+        self._cancel = threading.Event()
+
+    def runners(self, model: Dict[str, Any]):
+        """(translate, sample) callables for a model; the offline fake (cli.py --model fake) works too"""
+        if model["provider"] == "fake":
+            from fakes import FakeProvider
+            return FakeProvider(latency=0.0), None
+        return self.registry.translate_fn(model), self.registry.sample_fn(model)
+
+    def limiter(self, spec: Dict[str, Any]) -> ProviderLimiter:
+        key = json.dumps([spec["concurrency"], spec["rate_limits"]], sort_keys=True)
+        if key not in self._limiters:
+            self._limiters[key] = ProviderLimiter(
+                spec["concurrency"] or None,
+                rates={
+                    provider: {"requests_per_minute": rpm, "tokens_per_minute": tpm}
+                    for provider, rpm, tpm in spec["rate_limits"]
+                }
+            )
+        return self._limiters[key]
+
+    def glossary(self, paths: List[str]) -> Optional[Glossary]:
+        if not paths:
+            return None
+        key = (tuple(paths), glossary_stamps(paths))
+        if key not in self._glossaries:
+            self._glossaries = {key: Glossary.load(paths)}
+        return self._glossaries[key]
+
+    def beat(self, stop: threading.Event) -> None:
+        """Heartbeat thread: keeps claimed tasks alive and notices cancelled jobs"""
+        while not stop.wait(HEARTBEAT_INTERVAL):
+            try:
+                self.queue.heartbeat(self.id, self._running)
+                if self._job is not None and self.queue.cancelling(self._job):
+                    self._cancel.set()
+            except sqlite3.Error:
+                pass
+
+    def run(self, claim: Dict[str, Any]) -> None:
+        """Translate the claimed languages, checkpointing each as it finishes"""
+        spec = self.queue.spec(claim["job_id"])
+        model = spec["models"][claim["model"]]
+        options = spec["options"]
+        tasks = claim["tasks"]
+        tracer = Tracer()
+        checkpointed = set()
+
+        def on_result(language: str, result: Dict[str, Any]) -> None:
+            self.queue.checkpoint(tasks[language], result)
+            checkpointed.add(language)
+
+        self._running, self._job = tuple(tasks.values()), claim["job_id"]
+        self._cancel.clear()
+        try:
+            translate, sample = self.runners(model)
+            all_results, stats = translate_json(
+                source=spec["source"],
+                json_input=spec["json_input"],
+                languages=list(tasks),
+                template=spec["template"],
+                model=model,
+                translate=translate,
+                temperature=options["temperature"],
+                limiter=self.limiter(spec),
+                cache=self.cache,
+                key_memory=self.key_memory,
+                use_cache=options["use_cache"],
+                incremental=options["incremental"],
+                chunk_tokens=options["chunk_tokens"],
+                prompt_caching=options["prompt_caching"],
+                repair_rounds=options["repair_rounds"],
+                samples=options["samples"],
+                sample=sample,
+                on_result=on_result,
+                cancel=self._cancel,
+                glossary=self.glossary(spec["glossary"]),
+                tracer=tracer
+            )
+        except Exception as e:
+            # Not worth a retry on another worker: the same spec would fail the same way
+            all_results, stats = {language: unfinished_result(f"Worker error: {e}") for language in tasks}, None
+        try:
+            for language, result in all_results.items():
+                if language not in checkpointed:
+                    on_result(language, result)
+            if stats is not None:
+                self.queue.record_stats(next(iter(tasks.values())), stats, tracer.spans)
+        finally:
+            self._running, self._job = (), None
+
+
+def run_worker(
+    path: Path = DEFAULT_JOBS_PATH,
+    api_keys: Optional[Dict[str, str]] = None,
+    stop: Optional[Any] = None,
+    claim_size: int = DEFAULT_CLAIM_SIZE,
+    until_empty: bool = False,
+    idle_exit: float = 0.0
+) -> None:
+    """Take tasks from the queue until stop is set
+
+    until_empty returns once nothing is queued or running, idle_exit after
+    that many seconds without work (0 = never). Either way the worker's
+    current claim is finished first; a killed worker's tasks are requeued by
+    the others once its heartbeat goes stale.
+    """
+    queue = JobQueue(path)
+    worker = _Worker(queue, f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:4]}", api_keys)
+    beating = threading.Event()
+    threading.Thread(target=worker.beat, args=(beating,), name="job-heartbeat", daemon=True).start()
+    idle_since = time.monotonic()
+    try:
+        queue.heartbeat(worker.id)
+        while not (stop is not None and stop.is_set()):
+            if queue.requeue_stale():
+                queue.finalize_ended(worker.run_store)
+            claim = queue.claim(worker.id, claim_size)
+            if claim is None:
+                if until_empty and queue.idle():
+                    break
+                if idle_exit and time.monotonic() - idle_since > idle_exit:
+                    break
+                time.sleep(POLL_INTERVAL)
+                continue
+            worker.run(claim)
+            queue.finalize(claim["job_id"], worker.run_store)
+            idle_since = time.monotonic()
+    finally:
+        beating.set()
+        queue.retire(worker.id)
+        worker.registry.close()
+
+
+def serve(
+    processes: int = DEFAULT_WORKERS,
+    path: Path = DEFAULT_JOBS_PATH,
+    claim_size: int = DEFAULT_CLAIM_SIZE,
+    until_empty: bool = False,
+    idle_exit: float = 0.0
+) -> None:
+    """Run a pool of worker processes in the foreground until they exit or SIGINT/SIGTERM
+
+    API keys and base URLs come from the environment, as for cli.py.
+    """
+    context = multiprocessing.get_context("spawn")
+    stop = context.Event()
+    pool = [
+        context.Process(
+            target=run_worker,
+            kwargs={"path": path, "stop": stop, "claim_size": claim_size, "until_empty": until_empty, "idle_exit": idle_exit},
+            name=f"translation-worker-{index + 1}"
+        )
+        for index in range(processes)
+    ]
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    for process in pool:
+        process.start()
+    try:
+        for process in pool:
+            process.join()
+    except KeyboardInterrupt:
+        # Let every worker finish its current claim
+        stop.set()
+        for process in pool:
+            process.join()
+
+
+def start_workers(
+    processes: int,
+    path: Path = DEFAULT_JOBS_PATH,
+    api_keys: Optional[Dict[str, str]] = None,
+    idle_exit: float = 300.0
+) -> subprocess.Popen:
+    """Start a detached worker pool (python job_queue.py --workers N), independent of the caller's lifetime
+
+    api_keys are handed over through the pool's environment, never written to disk.
+    """
+    env = dict(os.environ)
+    for provider, key in (api_keys or {}).items():
+        env[PROVIDER_CONFIG[provider]["api_key_env"]] = key
+    return subprocess.Popen(
+        [sys.executable, str(Path(__file__).resolve()), "--workers", str(processes), "--jobs", str(path), "--idle-exit", str(idle_exit)],
+        env=env,
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True
+    )
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Run translation job workers, or show the queue")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Worker processes")
+    parser.add_argument("--jobs", type=Path, default=DEFAULT_JOBS_PATH, help="Job queue database")
+    parser.add_argument("--claim-size", type=int, default=DEFAULT_CLAIM_SIZE, help="Languages a worker translates at once")
+    parser.add_argument("--until-empty", action="store_true", help="Exit once nothing is queued or running")
+    parser.add_argument("--idle-exit", type=float, default=0.0, help="Exit after this many idle seconds (0 = never)")
+    parser.add_argument("--status", nargs="?", const="", metavar="JOB", help="Print queue metrics and recent jobs (or one job) as JSON and exit")
+    parser.add_argument("--cancel", metavar="JOB", help="Cancel a job and exit")
+    args = parser.parse_args(argv)
+
+    if args.status is not None:
+        queue = JobQueue(args.jobs)
+        if args.status:
+            status = queue.status(args.status)
+            if status is None:
+                parser.error(f"no job {args.status}")
+        else:
+            status = {"metrics": queue.metrics(), "jobs": [{**job, "tasks": len(job["tasks"])} for job in queue.jobs()]}
+        print(json.dumps(status, indent=2, ensure_ascii=False))
+        return 0
+    if args.cancel:
+        queue = JobQueue(args.jobs)
+        queue.cancel(args.cancel)
+        queue.finalize(args.cancel, RunStore())
+        return 0
+    serve(args.workers, args.jobs, args.claim_size, args.until_empty, args.idle_exit)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import json
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Where a JSON object can start: "{" followed by a key or "}", so prose like "{name}" is skipped
+OBJECT_START = re.compile(r'\{\s*(?:"|\})')
+
+# Markdown fences and whitespace around the object are expected, anything else is reported
+FENCE = re.compile(r'```[A-Za-z]*')
+
+WHITESPACE = " \t\r\n"
+
+# A whole string (group 1 is the closing quote, None if the output ends inside it) or a structural character
+TOKEN = re.compile(r'"(?:[^"\\]|\\.)*(")?|[{}\[\]:,]')
+
+# Raw newlines and tabs inside strings are common in model output and harmless
+_decoder = json.JSONDecoder(strict=False)
+
+
+def _recover(text: str, start: int) -> Optional[Tuple[Dict[str, Any], int, List[str]]]:
+    """Re-read a broken object from start: drop trailing commas and close a truncated object
+
+    Returns (object, end, repairs) or None if the object has other syntax errors.
+    Truncated output is cut after its last complete value, so a half-written
+    string or number is dropped instead of guessed at. Strings are skipped
+    whole by the TOKEN regex, so only structural characters reach Python.
+    """
+    stack: List[str] = []
+    after_colon = False
+    cut: Optional[Tuple[int, Tuple[str, ...]]] = None
+    commas: List[int] = []
+    comma = -1
+    end = len(text)
+
+    for match in TOKEN.finditer(text, start):
+        token = match.group()
+        position = match.start()
+        if token[0] == '"':
+            if match.group(1) is None:
+                break  # unterminated string: the output stops inside it
+            # A closed string is a complete value in an array or after a colon
+            if stack[-1] == ']' or after_colon:
+                cut = (match.end(), tuple(stack))
+        elif token == ':':
+            after_colon = True
+        elif token == ',':
+            after_colon = False
+            comma = position
+            cut = (position, tuple(stack))
+        elif token in '{[':
+            stack.append('}' if token == '{' else ']')
+            after_colon = False
+            cut = (match.end(), tuple(stack))
+        else:
+            if not stack or stack[-1] != token:
+                return None
+            if comma > start and not text[comma + 1:position].strip():
+                commas.append(comma)
+            stack.pop()
+            if not stack:
+                end = match.end()
+                break
+            cut = (match.end(), tuple(stack))
+
+    repairs = []
+    stop = end
+    closers = ""
+    if stack:
+        if cut is None:
+            return None
+        stop, open_containers = cut
+        closers = "".join(reversed(open_containers))
+        dropped = len(text[stop:].rstrip())
+        repairs.append("Closed truncated output" + (f", dropped {dropped} incomplete trailing chars" if dropped else ""))
+    commas = [position for position in commas if position < stop]
+    if commas:
+        repairs.insert(0, f"Removed {len(commas)} trailing comma(s)")
+
+    pieces = []
+    previous = start
+    for position in commas:
+        pieces.append(text[previous:position])
+        previous = position + 1
+    pieces.append(text[previous:stop].rstrip(WHITESPACE + ","))
+    try:
+        value = json.loads("".join(pieces) + closers, strict=False)
+    except json.JSONDecodeError:
+        return None
+    return (value, end, repairs) if isinstance(value, dict) else None
+
+
+def extract_json(text: str, recover: bool = True) -> Tuple[Optional[Dict[str, Any]], List[str], str]:
+    """Find the JSON object in model output: (object or None, repairs made, error)
+
+    Candidate starts are found with one regex search each and decoded in place
+    by the C scanner, so well-formed output is read once with no copies. Text
+    around the object (fences, prose, braces in prose) is skipped. If several
+    objects follow each other the largest wins. With recover, an object that
+    does not decode gets one tolerant re-read (see _recover) for trailing
+    commas and truncation. repairs names every fix, plus ignored prose and
+    ignored extra objects, and is empty for clean output.
+    """
+    if not text:
+        return None, [], "Invalid JSON: empty response"
+
+    found: List[Tuple[int, int, Dict[str, Any], List[str]]] = []
+    error = ""
+    position = 0
+    while True:
+        match = OBJECT_START.search(text, position)
+        if not match:
+            break
+        start = match.start()
+        try:
+            value, end = _decoder.raw_decode(text, start)
+            fixes: List[str] = []
+        except json.JSONDecodeError as e:
+            recovered = _recover(text, start) if recover else None
+            if recovered is None:
+                error = error or f"Invalid JSON: {e}"
+                position = start + 1
+                continue
+            value, end, fixes = recovered
+        found.append((start, end, value, fixes))
+        position = end
+
+    if not found:
+        return None, [], error or "Invalid JSON: no JSON object found"
+
+    start, end, value, fixes = max(found, key=lambda candidate: candidate[1] - candidate[0])
+    repairs = list(fixes)
+    if len(found) > 1:
+        repairs.append(f"Ignored {len(found) - 1} other JSON object(s)")
+    elif FENCE.sub("", text[:start]).strip() or FENCE.sub("", text[end:]).strip():
+        repairs.append("Ignored text around the JSON object")
+    return value, repairs, ""
@@ -0,0 +1,528 @@
+import asyncio
+import json
+import os
+import threading
+from typing import Any, AsyncIterator, Callable, Coroutine, Dict, Iterator, List, Optional
+
+# Per-provider settings. base_url=None uses the SDK default (which also honours
+# ANTHROPIC_BASE_URL / OPENAI_BASE_URL), so a local stand-in can be swapped in.
+PROVIDER_CONFIG = {
+    "anthropic": {
+        "api_key_env": "ANTHROPIC_API_KEY",
+        "base_url": None,
+        "max_connections": 32,
+        "timeout": 300.0,
+    },
+    "openai": {
+        "api_key_env": "OPENAI_API_KEY",
+        "base_url": None,
+        "max_connections": 32,
+        "timeout": 300.0,
+    },
+    "gemini": {
+        "api_key_env": "GEMINI_API_KEY",
+        "base_url": None,
+    },
+}
+
+
+class Completion(str):
+    """Response text that also carries call metadata
+
+    usage holds input_tokens/output_tokens as reported by the SDK and
+    first_token the seconds until the first streamed delta. Being a str, it
+    flows through caching and validation unchanged.
+    """
+
+    def __new__(cls, text: str, usage: Optional[Dict[str, int]] = None, first_token: Optional[float] = None):
+        completion = super().__new__(cls, text or "")
+        completion.usage = dict(usage or {})
+        completion.first_token = first_token
+        return completion
+
+
+class Prompt(str):
+    """Prompt text whose leading `prefix` is identical across requests
+
+    Providers mark the prefix for caching (Anthropic cache_control) or rely on
+    it coming first (OpenAI and Gemini cache repeated prefixes automatically).
+    A plain str prompt is sent as before.
+    """
+
+    def __new__(cls, prefix: str, suffix: str):
+        prompt = super().__new__(cls, prefix + suffix)
+        prompt.prefix = prefix
+        prompt.suffix = suffix
+        return prompt
+
+
+class AsyncRunner:
+    """Event loop on a daemon thread, shared by every caller in the process
+
+    Async clients and their connection pools live on this loop, so they survive
+    Streamlit reruns and are reused by all worker threads.
+    """
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="provider-loop", daemon=True)
+        self._thread.start()
+
+    def run(self, coro: Coroutine) -> Any:
+        """Run a coroutine on the shared loop and block for its result"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def iterate(self, agen: AsyncIterator[str]) -> Iterator[str]:
+        """Expose an async iterator as a blocking one"""
+        try:
+            while True:
+                try:
+                    yield self.run(agen.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            self.run(agen.aclose())
+
+
+class Provider:
+    """Common async interface for a model provider"""
+
+    # Whether submit_batch/batch_status/batch_results are implemented
+    supports_batch = False
+
+    def __init__(self, api_key: str, config: Dict[str, Any]):
+        self.api_key = api_key
+        self.config = config
+
+    async def complete(self, model: Dict[str, Any], prompt: str, temperature: float = 0.3) -> Completion:
+        raise NotImplementedError
+
+    def stream(self, model: Dict[str, Any], prompt: str, temperature: float = 0.3, usage: Optional[Dict[str, int]] = None) -> AsyncIterator[str]:
+        """Yield text deltas; fill `usage` once the provider reports it"""
+        raise NotImplementedError
+
+    async def sample(self, model: Dict[str, Any], prompt: str, temperature: float = 0.3, n: int = 1) -> List[Completion]:
+        """n completions of one prompt as concurrent calls; failed calls are dropped unless all fail"""
+        completions = await asyncio.gather(*(self.complete(model, prompt, temperature) for _ in range(n)), return_exceptions=True)
+        successes = [completion for completion in completions if not isinstance(completion, BaseException)]
+        if not successes:
+            raise completions[0]
+        return successes
+
+    async def submit_batch(self, model: Dict[str, Any], prompts: Dict[str, str], temperature: float = 0.3) -> str:
+        """Queue {custom_id: prompt} on the provider's batch endpoint and return the batch id"""
+        raise NotImplementedError(f"{type(self).__name__} has no batch mode")
+
+    async def batch_status(self, batch_id: str) -> Dict[str, Any]:
+        """{"done": bool, "status": provider status, "counts": {...}}"""
+        raise NotImplementedError(f"{type(self).__name__} has no batch mode")
+
+    async def batch_results(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        """{custom_id: {"raw": Completion or None, "error": str}} for a finished batch"""
+        raise NotImplementedError(f"{type(self).__name__} has no batch mode")
+
+    async def aclose(self) -> None:
+        pass
+
+
+class AnthropicProvider(Provider):
+    """Claude models via AsyncAnthropic"""
+
+    supports_batch = True
+
+    def __init__(self, api_key: str, config: Dict[str, Any]):
+        super().__init__(api_key, config)
+        import anthropic
+        import httpx
+        self.client = anthropic.AsyncAnthropic(
+            api_key=api_key,
+            base_url=config.get("base_url"),
+            timeout=config["timeout"],
+            max_retries=0,  # retried by the dispatcher, which paces the whole provider
+            http_client=anthropic.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=config["max_connections"],
+                    max_keepalive_connections=config["max_connections"]
+                )
+            )
+        )
+
+    def _request(self, model: Dict[str, Any], prompt: str, temperature: float) -> Dict[str, Any]:
+        return {
+            "model": model["model_id"],
+            "max_tokens": model.get("max_output_tokens", 4000),
+            "temperature": temperature,
+            "messages": [
+                {
+                    "role": "user",
+                    "content": self._content(prompt)
+                }
+            ],
+            **model.get("params", {})
+        }
+
+    @staticmethod
+    def _content(prompt: str):
+        prefix = getattr(prompt, "prefix", "")
+        if not prefix:
+            return prompt
+        # Cache the shared prefix; only the short per-request suffix is processed anew
+        return [
+            {"type": "text", "text": prefix, "cache_control": {"type": "ephemeral"}},
+            {"type": "text", "text": prompt.suffix},
+        ]
+
+    @staticmethod
+    def _usage(usage) -> Dict[str, int]:
+        # input_tokens excludes cache reads and writes; report the total like the other providers
+        cache_read = getattr(usage, "cache_read_input_tokens", None) or 0
+        cache_write = getattr(usage, "cache_creation_input_tokens", None) or 0
+        return {
+            "input_tokens": usage.input_tokens + cache_read + cache_write,
+            "output_tokens": usage.output_tokens,
+            "cache_read_tokens": cache_read,
+            "cache_write_tokens": cache_write,
+        }
+
+    async def complete(self, model: Dict[str, Any], prompt: str, temperature: float = 0.3) -> Completion:
+        message = await self.client.messages.create(**self._request(model, prompt, temperature))
+        return Completion(message.content[0].text, usage=self._usage(message.usage))
+
+    async def stream(self, model: Dict[str, Any], prompt: str, temperature: float = 0.3, usage: Optional[Dict[str, int]] = None) -> AsyncIterator[str]:
+        async with self.client.messages.stream(**self._request(model, prompt, temperature)) as stream:
+            async for text in stream.text_stream:
+                yield text
+            if usage is not None:
+                usage.update(self._usage((await stream.get_final_message()).usage))
+
+    async def submit_batch(self, model: Dict[str, Any], prompts: Dict[str, str], temperature: float = 0.3) -> str:
+        batch = await self.client.messages.batches.create(requests=[
+            {"custom_id": custom_id, "params": self._request(model, prompt, temperature)}
+            for custom_id, prompt in prompts.items()
+        ])
+        return batch.id
+
+    async def batch_status(self, batch_id: str) -> Dict[str, Any]:
+        batch = await self.client.messages.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        return {
+            "done": batch.processing_status == "ended",
+            "status": batch.processing_status,
+            "counts": {
+                "processing": counts.processing,
+                "succeeded": counts.succeeded,
+                "errored": counts.errored + counts.canceled + counts.expired,
+            },
+        }
+
+    async def batch_results(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        results = {}
+        async for entry in await self.client.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded":
+                message = entry.result.message
+                results[entry.custom_id] = {
+                    "raw": Completion(message.content[0].text, usage=self._usage(message.usage)),
+                    "error": "",
+                }
+            else:
+                error = getattr(getattr(entry.result, "error", None), "error", None)
+                results[entry.custom_id] = {
+                    "raw": None,
+                    "error": f"Batch request {entry.result.type}" + (f": {error.message}" if error else ""),
+                }
+        return results
+
+    async def aclose(self) -> None:
+        await self.client.close()
+
+
+class OpenAIProvider(Provider):
+    """OpenAI chat models via AsyncOpenAI"""
+
+    supports_batch = True
+
+    def __init__(self, api_key: str, config: Dict[str, Any]):
+        super().__init__(api_key, config)
+        import httpx
+        import openai
+        self.client = openai.AsyncOpenAI(
+            api_key=api_key,
+            base_url=config.get("base_url"),
+            timeout=config["timeout"],
+            max_retries=0,  # retried by the dispatcher, which paces the whole provider
+            http_client=openai.DefaultAsyncHttpxClient(
+                limits=httpx.Limits(
+                    max_connections=config["max_connections"],
+                    max_keepalive_connections=config["max_connections"]
+                )
+            )
+        )
+
+    def _request(self, model: Dict[str, Any], prompt: str, temperature: float) -> Dict[str, Any]:
+        return {
+            "model": model["model_id"],
+            "messages": [
+                {
+                    "role": "user",
+                    "content": prompt
+                }
+            ],
+            "temperature": temperature,
+            "max_completion_tokens": model.get("max_output_tokens", 4000),
+            **model.get("params", {})
+        }
+
+    @staticmethod
+    def _usage(usage) -> Dict[str, int]:
+        # Prefixes of 1024+ tokens are cached automatically; prompt_tokens includes the cached part
+        details = getattr(usage, "prompt_tokens_details", None)
+        return {
+            "input_tokens": usage.prompt_tokens,
+            "output_tokens": usage.completion_tokens,
+            "cache_read_tokens": (getattr(details, "cached_tokens", None) or 0) if details else 0,
+        }
+
+    async def complete(self, model: Dict[str, Any], prompt: str, temperature: float = 0.3) -> Completion:
+        response = await self.client.chat.completions.create(**self._request(model, prompt, temperature))
+        usage = self._usage(response.usage) if response.usage else {}
+        return Completion(response.choices[0].message.content, usage=usage)
+
+    async def sample(self, model: Dict[str, Any], prompt: str, temperature: float = 0.3, n: int = 1) -> List[Completion]:
+        # One request with n choices: the prompt is billed once, usage (all choices) is on the first
+        if n == 1:
+            return [await self.complete(model, prompt, temperature)]
+        response = await self.client.chat.completions.create(**self._request(model, prompt, temperature), n=n)
+        usage = self._usage(response.usage) if response.usage else {}
+        return [
+            Completion(choice.message.content, usage=usage if index == 0 else {})
+            for index, choice in enumerate(response.choices)
+        ]
+
+    async def stream(self, model: Dict[str, Any], prompt: str, temperature: float = 0.3, usage: Optional[Dict[str, int]] = None) -> AsyncIterator[str]:
+        stream = await self.client.chat.completions.create(
+            **self._request(model, prompt, temperature),
+            stream=True,
+            stream_options={"include_usage": True}
+        )
+        try:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+                if chunk.usage and usage is not None:
+                    usage.update(self._usage(chunk.usage))
+        finally:
+            await stream.close()
+
+    async def submit_batch(self, model: Dict[str, Any], prompts: Dict[str, str], temperature: float = 0.3) -> str:
+        lines = "".join(
+            json.dumps({
+                "custom_id": custom_id,
+                "method": "POST",
+                "url": "/v1/chat/completions",
+                "body": self._request(model, prompt, temperature),
+            }, ensure_ascii=False) + "\n"
+            for custom_id, prompt in prompts.items()
+        )
+        upload = await self.client.files.create(file=("batch.jsonl", lines.encode("utf-8")), purpose="batch")
+        batch = await self.client.batches.create(
+            input_file_id=upload.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h"
+        )
+        return batch.id
+
+    async def batch_status(self, batch_id: str) -> Dict[str, Any]:
+        batch = await self.client.batches.retrieve(batch_id)
+        counts = batch.request_counts
+        return {
+            "done": batch.status in ("completed", "failed", "expired", "cancelled"),
+            "status": batch.status,
+            "counts": {
+                "processing": (counts.total - counts.completed - counts.failed) if counts else None,
+                "succeeded": counts.completed if counts else None,
+                "errored": counts.failed if counts else None,
+            },
+        }
+
+    async def batch_results(self, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        from openai.types.chat import ChatCompletion
+
+        batch = await self.client.batches.retrieve(batch_id)
+        results = {}
+        for file_id in (batch.output_file_id, batch.error_file_id):
+            if not file_id:
+                continue
+            content = await self.client.files.content(file_id)
+            for line in content.text.splitlines():
+                if not line.strip():
+                    continue
+                entry = json.loads(line)
+                response = entry.get("response") or {}
+                if response.get("status_code") == 200:
+                    completion = ChatCompletion.model_validate(response["body"])
+                    results[entry["custom_id"]] = {
+                        "raw": Completion(
+                            completion.choices[0].message.content,
+                            usage=self._usage(completion.usage) if completion.usage else {}
+                        ),
+                        "error": "",
+                    }
+                else:
+                    error = entry.get("error") or (response.get("body") or {}).get("error") or {}
+                    results[entry["custom_id"]] = {
+                        "raw": None,
+                        "error": f"Batch request failed: {error.get('message') or 'HTTP ' + str(response.get('status_code'))}",
+                    }
+        return results
+
+    async def aclose(self) -> None:
+        await self.client.close()
+
+
+class GeminiProvider(Provider):
+    """Gemini models via google-generativeai's async methods"""
+
+    def __init__(self, api_key: str, config: Dict[str, Any]):
+        super().__init__(api_key, config)
+        import google.generativeai as genai
+        self.genai = genai
+        options = {"api_endpoint": config["base_url"]} if config.get("base_url") else None
+        genai.configure(api_key=api_key, client_options=options)
+        self._models: Dict[str, Any] = {}
+
+    def _model(self, model: Dict[str, Any]):
+        if model["model_id"] not in self._models:
+            self._models[model["model_id"]] = self.genai.GenerativeModel(model["model_id"])
+        return self._models[model["model_id"]]
+
+    def _generation_config(self, model: Dict[str, Any], temperature: float):
+        return self.genai.types.GenerationConfig(
+            temperature=temperature,
+            max_output_tokens=model.get("max_output_tokens", 4000),
+            **model.get("params", {})
+        )
+
+    @staticmethod
+    def _usage(metadata) -> Dict[str, int]:
+        if not metadata:
+            return {}
+        # Gemini 2.5+ caches repeated prompt prefixes implicitly
+        return {
+            "input_tokens": metadata.prompt_token_count,
+            "output_tokens": metadata.candidates_token_count,
+            "cache_read_tokens": getattr(metadata, "cached_content_token_count", 0) or 0,
+        }
+
+    async def complete(self, model: Dict[str, Any], prompt: str, temperature: float = 0.3) -> Completion:
+        response = await self._model(model).generate_content_async(
+            prompt,
+            generation_config=self._generation_config(model, temperature)
+        )
+        return Completion(response.text, usage=self._usage(getattr(response, "usage_metadata", None)))
+
+    async def stream(self, model: Dict[str, Any], prompt: str, temperature: float = 0.3, usage: Optional[Dict[str, int]] = None) -> AsyncIterator[str]:
+        response = await self._model(model).generate_content_async(
+            prompt,
+            generation_config=self._generation_config(model, temperature),
+            stream=True
+        )
+        async for chunk in response:
+            if chunk.parts:
+                yield chunk.text
+            if usage is not None:
+                usage.update(self._usage(getattr(chunk, "usage_metadata", None)))
+
+
+class TextStream:
+    """Blocking iterator over a provider stream; usage is filled in once the provider reports it"""
+
+    def __init__(self, runner: AsyncRunner, open_stream: Callable[[Dict[str, int]], AsyncIterator[str]]):
+        self.usage: Dict[str, int] = {}
+        self._deltas = runner.iterate(open_stream(self.usage))
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._deltas)
+
+    def close(self) -> None:
+        self._deltas.close()
+
+
+# Provider name -> implementation; a new provider is a class plus a PROVIDER_CONFIG entry
+PROVIDER_TYPES = {
+    "anthropic": AnthropicProvider,
+    "openai": OpenAIProvider,
+    "gemini": GeminiProvider,
+}
+
+
+class ProviderRegistry:
+    """Lazily created, shared provider instances plus sync bridges for the thread dispatcher"""
+
+    def __init__(
+        self,
+        api_keys: Optional[Dict[str, str]] = None,
+        config: Optional[Dict[str, Dict[str, Any]]] = None,
+        runner: Optional[AsyncRunner] = None
+    ):
+        self.config = {name: dict(settings) for name, settings in PROVIDER_CONFIG.items()}
+        for name, overrides in (config or {}).items():
+            self.config.setdefault(name, {}).update(overrides)
+        self.api_keys = dict(api_keys or {})
+        self.runner = runner or AsyncRunner()
+        self._providers: Dict[str, Provider] = {}
+        self._lock = threading.Lock()
+
+    def api_key(self, name: str) -> Optional[str]:
+        """Explicit key first, then the provider's environment variable"""
+        return self.api_keys.get(name) or os.environ.get(self.config[name]["api_key_env"])
+
+    def get(self, name: str) -> Provider:
+        with self._lock:
+            if name not in self._providers:
+                if name not in PROVIDER_TYPES:
+                    raise ValueError(f"Unknown provider: {name}")
+                api_key = self.api_key(name)
+                if not api_key:
+                    raise RuntimeError(f"{self.config[name]['api_key_env']} is not configured")
+                self._providers[name] = PROVIDER_TYPES[name](api_key, self.config[name])
+            return self._providers[name]
+
+    def translate_fn(self, model: Dict[str, Any]) -> Callable[[str, float], Optional[str]]:
+        """Blocking (prompt, temperature) callable for the dispatcher"""
+        def translate(prompt: str, temperature: float = 0.3) -> Optional[str]:
+            provider = self.get(model["provider"])
+            return self.runner.run(provider.complete(model, prompt, temperature))
+
+        return translate
+
+    def stream_fn(self, model: Dict[str, Any]) -> Callable[[str, float], "TextStream"]:
+        """Blocking (prompt, temperature) -> text deltas callable for the dispatcher"""
+        def stream(prompt: str, temperature: float = 0.3) -> TextStream:
+            provider = self.get(model["provider"])
+            return TextStream(self.runner, lambda usage: provider.stream(model, prompt, temperature, usage))
+
+        return stream
+
+    def sample_fn(self, model: Dict[str, Any]) -> Callable[[str, float, int], List[Completion]]:
+        """Blocking (prompt, temperature, n) -> up to n candidates callable for best-of-n sampling"""
+        def sample(prompt: str, temperature: float = 0.3, n: int = 1) -> List[Completion]:
+            provider = self.get(model["provider"])
+            return self.runner.run(provider.sample(model, prompt, temperature, n))
+
+        return sample
+
+    def submit_batch(self, model: Dict[str, Any], prompts: Dict[str, str], temperature: float = 0.3) -> str:
+        return self.runner.run(self.get(model["provider"]).submit_batch(model, prompts, temperature))
+
+    def batch_status(self, provider: str, batch_id: str) -> Dict[str, Any]:
+        return self.runner.run(self.get(provider).batch_status(batch_id))
+
+    def batch_results(self, provider: str, batch_id: str) -> Dict[str, Dict[str, Any]]:
+        return self.runner.run(self.get(provider).batch_results(batch_id))
+
+    def close(self) -> None:
+        """Close every provider's connection pool"""
+        with self._lock:
+            providers, self._providers = list(self._providers.values()), {}
+        for provider in providers:
+            self.runner.run(provider.aclose())
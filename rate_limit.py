@@ -0,0 +1,194 @@
+import random
+import threading
+import time
+from collections import deque
+from email.utils import parsedate_to_datetime
+from typing import Deque, Optional
+
+# HTTP statuses worth retrying (timeouts, conflicts, rate limits, overloaded/5xx)
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504, 529}
+
+# Statuses meaning "slow down" rather than "something broke"
+RATE_LIMIT_STATUS = {429}
+
+
+class CircuitOpenError(RuntimeError):
+    """The provider failed repeatedly and calls are paused until its cooldown ends"""
+
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(f"{provider} is failing repeatedly; paused for another {retry_in:.1f}s")
+        self.retry_in = retry_in
+
+
+def status_code(error: Exception) -> Optional[int]:
+    """HTTP status of an SDK error, if it has one"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, overloads, 5xx and connection problems are worth another attempt"""
+    if isinstance(error, CircuitOpenError):
+        return True
+    status = status_code(error)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    name = type(error).__name__
+    return "Connection" in name or "Timeout" in name or name in ("ResourceExhausted", "ServiceUnavailable", "InternalServerError")
+
+
+def is_rate_limited(error: Exception) -> bool:
+    return status_code(error) in RATE_LIMIT_STATUS or type(error).__name__ == "ResourceExhausted"
+
+
+def retry_after_seconds(error: Exception) -> Optional[float]:
+    """Delay requested by the provider via retry-after-ms / Retry-After (seconds or HTTP date)"""
+    if isinstance(error, CircuitOpenError):
+        return error.retry_in
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return max(0.0, float(value) / 1000)
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(attempt: int, base: float = 1.0, cap: float = 30.0, retry_after: Optional[float] = None) -> float:
+    """Full-jitter exponential backoff; a provider-requested delay takes precedence"""
+    if retry_after is not None:
+        # Small jitter so callers told the same Retry-After don't return in lockstep
+        return min(retry_after, cap * 2) + random.uniform(0, 0.1 * base)
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """Refilling allowance of `per_minute` units, adaptively slowed down on rate-limit errors
+
+    acquire() blocks until the requested units are available. throttle() halves
+    the current rate (down to 10% of the configured one) and pause() holds every
+    caller until a deadline; each success restores 5% of the configured rate.
+    """
+
+    def __init__(self, per_minute: float, burst: Optional[float] = None):
+        self.per_minute = float(per_minute)
+        self.rate = self.per_minute / 60.0
+        # Default burst is one second's worth, so bursts stay under per-second enforcement
+        self.capacity = float(burst if burst is not None else max(1.0, self.per_minute / 60))
+        self.tokens = self.capacity
+        self.paused_until = 0.0
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def acquire(self, amount: float = 1.0) -> float:
+        """Take `amount` units, blocking as needed; returns the seconds waited"""
+        # A request bigger than the bucket would never fit; let it through on a full bucket
+        amount = min(amount, self.capacity)
+        started = time.monotonic()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if now >= self.paused_until and self.tokens >= amount:
+                    self.tokens -= amount
+                    return now - started
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                else:
+                    wait = (amount - self.tokens) / self.rate
+            time.sleep(min(wait, 1.0))
+
+    def debit(self, amount: float) -> None:
+        """Charge (or refund, if negative) units after the fact, e.g. actual vs estimated tokens"""
+        with self._lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.capacity, self.tokens - amount)
+
+    def pause(self, seconds: float) -> None:
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def throttle(self) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = max(self.per_minute / 600.0, self.rate / 2)
+
+    def recover(self) -> None:
+        with self._lock:
+            self._refill(time.monotonic())
+            self.rate = min(self.per_minute / 60.0, self.rate + self.per_minute / 1200.0)
+
+
+class CircuitBreaker:
+    """Stops sending to a provider once most recent calls fail
+
+    Opens when at least `threshold` of the last `window` outcomes failed and
+    they are the majority, so sporadic errors among many concurrent calls don't
+    trip it. While open, check() raises CircuitOpenError. After `cooldown`
+    seconds a single probe call is let through (half-open); its success closes
+    the circuit, its failure re-opens it for another cooldown.
+    """
+
+    def __init__(self, provider: str, threshold: int = 5, cooldown: float = 30.0, window: int = 10):
+        self.provider = provider
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.outcomes: Deque[bool] = deque(maxlen=max(window, threshold))
+        self.opened_at: Optional[float] = None
+        self.trips = 0
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            return "half-open" if time.monotonic() - self.opened_at >= self.cooldown else "open"
+
+    def check(self) -> None:
+        with self._lock:
+            if self.opened_at is None:
+                return
+            remaining = self.opened_at + self.cooldown - time.monotonic()
+            if remaining <= 0 and not self._probing:
+                self._probing = True
+                return
+            raise CircuitOpenError(self.provider, max(remaining, 0.5))
+
+    def success(self) -> None:
+        with self._lock:
+            self.outcomes.append(True)
+            if self._probing:
+                self.outcomes.clear()
+            self.opened_at = None
+            self._probing = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.outcomes.append(False)
+            failures = self.outcomes.count(False)
+            tripped = failures >= self.threshold and failures * 2 > len(self.outcomes)
+            if self._probing or (tripped and self.opened_at is None):
+                self.trips += 1
+                self.opened_at = time.monotonic()
+                self._probing = False
@@ -0,0 +1,199 @@
+import json
+import sqlite3
+import threading
+import time
+import uuid
+import zlib
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from validation import validate_translations
+
+DEFAULT_RUNS_PATH = Path(__file__).parent / ".cache" / "runs.sqlite3"
+
+# Oldest runs beyond this many are dropped on save
+DEFAULT_MAX_RUNS = 200
+
+
+def new_run_id() -> str:
+    """Sortable, unique run id such as 20261017-153012-a1b2c3"""
+    return time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+
+def make_run(
+    mode: str,
+    source: Dict[str, Any],
+    json_input: str,
+    template: str,
+    languages: List[str],
+    results: Dict[str, Dict[str, Dict[str, Any]]],
+    stats: Dict[str, Dict[str, Any]],
+    settings: Optional[Dict[str, Any]] = None,
+    spans: Optional[List[Dict[str, Any]]] = None,
+    elapsed: float = 0.0
+) -> Dict[str, Any]:
+    """Everything needed to show a finished run again without API calls
+
+    results and stats are keyed by model name (one model unless mode is
+    "compare"). Each model's validation (see validate_translations) is
+    computed here once, so reloading a run never re-validates.
+    """
+    return {
+        "id": new_run_id(),
+        "created_at": time.time(),
+        "elapsed": elapsed,
+        "mode": mode,
+        "models": list(results),
+        "languages": list(languages),
+        "source": source,
+        "json_input": json_input,
+        "template": template,
+        "settings": dict(settings or {}),
+        "results": results,
+        "stats": stats,
+        "validation": {
+            name: validate_translations(
+                source,
+                {language: result["parsed"] if result["valid"] else None for language, result in all_results.items()}
+            )
+            for name, all_results in results.items()
+        },
+        "spans": list(spans or []),
+    }
+
+
+def run_summary(run: Dict[str, Any]) -> Dict[str, Any]:
+    """One history row: id, time, mode, models, languages, valid results and cost"""
+    results = [result for all_results in run["results"].values() for result in all_results.values()]
+    return {
+        "id": run["id"],
+        "created_at": run["created_at"],
+        "mode": run["mode"],
+        "models": run["models"],
+        "languages": len(run["languages"]),
+        "valid": f"{sum(1 for result in results if result['valid'])}/{len(results)}",
+        "cost": round(sum(stats.get("cost", 0.0) for stats in run["stats"].values()), 6),
+    }
+
+
+def _encode(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, sort_keys=True)
+
+
+def diff_runs(
+    before: Dict[str, Any],
+    after: Dict[str, Any],
+    before_model: Optional[str] = None,
+    after_model: Optional[str] = None
+) -> Dict[str, Any]:
+    """Key-level differences between two runs (each run's first model unless named)
+
+    Returns {"rows": [...], "languages": [...]}: one row per language x key
+    that differs ("changed", "added", "removed"; keys of a failed language
+    count as removed or added), and per language both runs' validity, passed
+    checks and number of differing keys.
+    """
+    before_model = before_model or before["models"][0]
+    after_model = after_model or after["models"][0]
+    before_results = before["results"].get(before_model, {})
+    after_results = after["results"].get(after_model, {})
+    before_checks = before["validation"].get(before_model, {}).get("languages", {})
+    after_checks = after["validation"].get(after_model, {}).get("languages", {})
+
+    rows = []
+    languages = []
+    for language in list(before_results) + [language for language in after_results if language not in before_results]:
+        old = before_results.get(language) or {}
+        new = after_results.get(language) or {}
+        old_parsed = (old.get("parsed") if old.get("valid") else None) or {}
+        new_parsed = (new.get("parsed") if new.get("valid") else None) or {}
+        changed = 0
+        for key in list(old_parsed) + [key for key in new_parsed if key not in old_parsed]:
+            if key not in new_parsed:
+                status = "removed"
+            elif key not in old_parsed:
+                status = "added"
+            elif _encode(old_parsed[key]) != _encode(new_parsed[key]):
+                status = "changed"
+            else:
+                continue
+            changed += 1
+            rows.append({
+                "language": language,
+                "key": key,
+                "status": status,
+                "before": old_parsed.get(key),
+                "after": new_parsed.get(key),
+            })
+        languages.append({
+            "language": language,
+            "before_valid": old.get("valid"),
+            "after_valid": new.get("valid"),
+            "before_checks": sum(passed for _, passed in before_checks.get(language, {}).get("checks", [])),
+            "after_checks": sum(passed for _, passed in after_checks.get(language, {}).get("checks", [])),
+            "changed_keys": changed,
+        })
+    return {"rows": rows, "languages": languages}
+
+
+class RunStore:
+    """On-disk history of finished runs in SQLite, one compressed JSON document per run"""
+
+    def __init__(self, path: Path = DEFAULT_RUNS_PATH, max_runs: int = DEFAULT_MAX_RUNS):
+        self.path = Path(path)
+        self.max_runs = max_runs
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS runs (
+                id TEXT PRIMARY KEY,
+                created_at REAL NOT NULL,
+                summary TEXT NOT NULL,
+                payload BLOB NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_runs_created_at ON runs(created_at)")
+        self._conn.commit()
+
+    def save(self, run: Dict[str, Any]) -> str:
+        """Store a run (as from make_run) and return its id"""
+        payload = zlib.compress(json.dumps(run, ensure_ascii=False).encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO runs (id, created_at, summary, payload) VALUES (?, ?, ?, ?)",
+                (run["id"], run["created_at"], json.dumps(run_summary(run), ensure_ascii=False), payload)
+            )
+            self._conn.execute(
+                "DELETE FROM runs WHERE id IN (SELECT id FROM runs ORDER BY created_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_runs,)
+            )
+            self._conn.commit()
+        return run["id"]
+
+    def load(self, run_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT payload FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return json.loads(zlib.decompress(row[0])) if row else None
+
+    def history(self, limit: int = 50) -> List[Dict[str, Any]]:
+        """Summaries of the most recent runs, newest first, without loading their payloads"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT summary FROM runs ORDER BY created_at DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def delete(self, run_id: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        """Drop every stored run"""
+        with self._lock:
+            self._conn.execute("DELETE FROM runs")
+            self._conn.commit()
@@ -0,0 +1,132 @@
+import re
+import unicodedata
+from collections import Counter
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+# chrF settings (Popović 2015): character n-grams up to 6, recall weighted twice as much as precision
+CHRF_ORDER = 6
+CHRF_BETA = 2.0
+
+# chrF at or above these counts as a near miss / partial match
+CLOSE_THRESHOLD = 70.0
+PARTIAL_THRESHOLD = 40.0
+
+WHITESPACE_RUN = re.compile(r'\s+')
+
+# Code points that never start a user-perceived character of their own
+ZERO_WIDTH_JOINER = "\u200d"
+VARIATION_SELECTORS = {chr(code) for code in range(0xFE00, 0xFE10)}
+EMOJI_MODIFIERS = {chr(code) for code in range(0x1F3FB, 0x1F400)}
+
+
+@lru_cache(maxsize=65536)
+def normalize(text: str, fold_accents: bool = False) -> str:
+    """Comparison form: NFKC (full-width and compatibility forms), case-folded, whitespace collapsed
+
+    With fold_accents, combining marks are dropped as well (CASINÒ -> casino).
+    Korean and Japanese are recomposed afterwards, so folding never splits a
+    Hangul syllable or removes a dakuten.
+    """
+    text = WHITESPACE_RUN.sub(" ", unicodedata.normalize("NFKC", text)).strip().casefold()
+    if fold_accents and not text.isascii():
+        decomposed = unicodedata.normalize("NFD", text)
+        text = unicodedata.normalize("NFC", "".join(
+            ch for ch in decomposed
+            if not unicodedata.combining(ch) or ch in "\u3099\u309a"  # keep kana voicing marks
+        ))
+    return text
+
+
+def grapheme_count(text: str) -> int:
+    """User-perceived characters: combining marks, ZWJ sequences, variation selectors and skin tones don't count extra
+
+    An approximation of Unicode extended grapheme clusters without a regex
+    dependency; exact for accented Latin, Cyrillic, CJK, Hangul and common emoji.
+    """
+    if text.isascii():
+        return len(text)
+    text = unicodedata.normalize("NFC", text)
+    count = 0
+    joined = False
+    for ch in text:
+        if joined:
+            joined = False
+            continue
+        if ch == ZERO_WIDTH_JOINER:
+            joined = True
+        elif not (unicodedata.combining(ch) or ch in VARIATION_SELECTORS or ch in EMOJI_MODIFIERS
+                  or unicodedata.category(ch) in ("Mn", "Me", "Mc")):
+            count += 1
+    return count
+
+
+@lru_cache(maxsize=65536)
+def _ngrams(text: str) -> Tuple[Counter, ...]:
+    """Character n-gram counts for n = 1..CHRF_ORDER, spaces removed as in chrF"""
+    text = text.replace(" ", "")
+    return tuple(Counter(text[i:i + n] for i in range(len(text) - n + 1)) for n in range(1, CHRF_ORDER + 1))
+
+
+def chrf(hypothesis: str, reference: str) -> float:
+    """chrF score (0-100) of a hypothesis against one reference, on normalize()d text"""
+    hypothesis, reference = normalize(hypothesis), normalize(reference)
+    if hypothesis == reference:
+        return 100.0
+    precisions, recalls = [], []
+    for hypothesis_grams, reference_grams in zip(_ngrams(hypothesis), _ngrams(reference)):
+        if not hypothesis_grams or not reference_grams:
+            continue
+        overlap = sum((hypothesis_grams & reference_grams).values())
+        precisions.append(overlap / sum(hypothesis_grams.values()))
+        recalls.append(overlap / sum(reference_grams.values()))
+    if not precisions:
+        return 0.0
+    precision = sum(precisions) / len(precisions)
+    recall = sum(recalls) / len(recalls)
+    if not precision and not recall:
+        return 0.0
+    beta2 = CHRF_BETA ** 2
+    return 100 * (1 + beta2) * precision * recall / (beta2 * precision + recall)
+
+
+def edit_similarity(a: str, b: str) -> float:
+    """1 - Levenshtein distance / longer length, on normalize()d text"""
+    a, b = normalize(a), normalize(b)
+    if a == b:
+        return 1.0
+    if len(a) < len(b):
+        a, b = b, a
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        previous = current
+    return 1 - previous[-1] / len(a)
+
+
+def score_text(actual: str, expected: str) -> Dict[str, Any]:
+    """Graded comparison of one translated string with its reference
+
+    "matches" ignores case, width/compatibility forms, spacing and accents;
+    "grade" is "match", "close" or "partial" by chrF, otherwise "miss".
+    """
+    exact = normalize(actual) == normalize(expected)
+    matches = exact or normalize(actual, True) == normalize(expected, True)
+    similarity = 100.0 if matches else chrf(actual, expected)
+    if matches:
+        grade = "match"
+    elif similarity >= CLOSE_THRESHOLD:
+        grade = "close"
+    elif similarity >= PARTIAL_THRESHOLD:
+        grade = "partial"
+    else:
+        grade = "miss"
+    return {
+        "matches": matches,
+        "accents_differ": matches and not exact,
+        "similarity": round(similarity, 1),
+        "edit_similarity": round(1.0 if matches else edit_similarity(actual, expected), 3),
+        "grade": grade,
+    }
@@ -0,0 +1,83 @@
+import threading
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls in this process into one
+
+    The first caller for a key runs the call; everyone asking for the same
+    key while it is in flight waits for it and gets the same result (or
+    exception). Nothing is kept once the call returns; that is the response
+    cache's job. calls counts calls actually run, saved the callers that got a
+    usable result from someone else's (not an exception, nor a result the
+    caller's `served` check rejects).
+    """
+
+    def __init__(self):
+        self.calls = 0
+        self.saved = 0
+        self._flights: Dict[Hashable, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(
+        self,
+        key: Hashable,
+        call: Callable[[], Any],
+        served: Optional[Callable[[Any], bool]] = None
+    ) -> Tuple[Any, bool]:
+        """(result of call, whether it came from another caller's in-flight call)
+
+        served(result) tells whether a shared result spared this caller a call
+        (e.g. not a failure or a cancellation); only those count as saved.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+            else:
+                flight.waiters += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if served is None or served(flight.result):
+                with self._lock:
+                    self.saved += 1
+            return flight.result, True
+
+        try:
+            flight.result = call()
+        except BaseException as error:
+            flight.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "saved": self.saved,
+                "in_flight": len(self._flights),
+                "waiting": sum(flight.waiters for flight in self._flights.values()),
+            }
+
+
+# Shared by every dispatch in the process (all app sessions, every CLI file)
+SINGLE_FLIGHT = SingleFlight()
@@ -0,0 +1,163 @@
+import json
+import re
+from typing import Any, List, Tuple
+
+# Parser states
+BEFORE_OBJECT = 0
+EXPECT_KEY = 1
+IN_KEY = 2
+EXPECT_COLON = 3
+EXPECT_VALUE = 4
+IN_VALUE = 5
+AFTER_VALUE = 6
+DONE = 7
+
+WHITESPACE = " \t\r\n"
+
+# A whole string (kept as is) or a comma right before a closing bracket (dropped)
+TRAILING_COMMA = re.compile(r'("(?:[^"\\]|\\.)*")|,(?=\s*[}\]])')
+
+# Same tolerance as json_extract: raw newlines and tabs inside strings are accepted
+_decoder = json.JSONDecoder(strict=False)
+
+
+class StreamingJsonError(ValueError):
+    """The streamed text can no longer become a valid JSON object"""
+
+
+class IncrementalJsonParser:
+    """Parse a streamed top-level JSON object, yielding each key/value as soon as it completes
+
+    Text before the opening brace (markdown fences, prose) and after the closing
+    brace is ignored; like extract_json, a "{" only opens the object when a key
+    or "}" follows, so braces in prose such as "{name}" are skipped. Raw
+    newlines inside strings and trailing commas are accepted, as extract_json
+    recovers them too. Each character is looked at once, so feeding the whole
+    response in deltas costs the same as parsing it at the end.
+    """
+
+    def __init__(self):
+        self.state = BEFORE_OBJECT
+        self.keys_seen = 0
+        self._key: List[str] = []
+        self._value: List[str] = []
+        self._current_key = ""
+        self._in_string = False
+        self._escape = False
+        self._depth = 0
+        self._opened = False
+
+    @property
+    def done(self) -> bool:
+        return self.state == DONE
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Consume more output and return the key/value pairs completed by it"""
+        completed: List[Tuple[str, Any]] = []
+        for ch in text:
+            state = self.state
+            if state == DONE:
+                break
+            if state == BEFORE_OBJECT:
+                if ch == '{':
+                    self.state = EXPECT_KEY
+            elif state == EXPECT_KEY:
+                if ch == '"':
+                    self._key = []
+                    self._escape = False
+                    self._opened = True
+                    self.state = IN_KEY
+                elif ch == '}':
+                    self.state = DONE
+                elif self.keys_seen == 0 and not self._opened:
+                    # Not the object after all (prose like "{name}"): keep looking
+                    if ch != '{' and ch not in WHITESPACE:
+                        self.state = BEFORE_OBJECT
+                elif ch not in WHITESPACE:
+                    raise StreamingJsonError(f"Expected a key, got {ch!r}")
+            elif state == IN_KEY:
+                if self._escape:
+                    self._escape = False
+                    self._key.append(ch)
+                elif ch == '\\':
+                    self._escape = True
+                    self._key.append(ch)
+                elif ch == '"':
+                    self._current_key = self._decode('"' + "".join(self._key) + '"')
+                    self.state = EXPECT_COLON
+                else:
+                    self._key.append(ch)
+            elif state == EXPECT_COLON:
+                if ch == ':':
+                    self.state = EXPECT_VALUE
+                elif ch not in WHITESPACE:
+                    raise StreamingJsonError(f"Expected ':' after key {self._current_key!r}, got {ch!r}")
+            elif state == EXPECT_VALUE:
+                if ch not in WHITESPACE:
+                    self._value = []
+                    self._in_string = False
+                    self._escape = False
+                    self._depth = 0
+                    self.state = IN_VALUE
+                    self._value_char(ch, completed)
+            elif state == IN_VALUE:
+                self._value_char(ch, completed)
+            elif state == AFTER_VALUE:
+                if ch == ',':
+                    self.state = EXPECT_KEY
+                elif ch == '}':
+                    self.state = DONE
+                elif ch not in WHITESPACE:
+                    raise StreamingJsonError(f"Expected ',' or '}}' after {self._current_key!r}, got {ch!r}")
+        return completed
+
+    def _value_char(self, ch: str, completed: List[Tuple[str, Any]]) -> None:
+        if self._in_string:
+            self._value.append(ch)
+            if self._escape:
+                self._escape = False
+            elif ch == '\\':
+                self._escape = True
+            elif ch == '"':
+                self._in_string = False
+                if self._depth == 0:
+                    self._finish_value(completed)
+            return
+
+        if ch == '"':
+            self._in_string = True
+            self._value.append(ch)
+        elif ch in '{[':
+            self._depth += 1
+            self._value.append(ch)
+        elif ch in '}]':
+            if self._depth == 0:
+                # Closing brace ends a bare number/true/false/null and the object
+                self._finish_value(completed)
+                self.state = DONE
+                return
+            self._depth -= 1
+            self._value.append(ch)
+            if self._depth == 0:
+                self._finish_value(completed)
+        elif ch == ',' and self._depth == 0:
+            self._finish_value(completed)
+            self.state = EXPECT_KEY
+        else:
+            self._value.append(ch)
+
+    def _finish_value(self, completed: List[Tuple[str, Any]]) -> None:
+        value = self._decode("".join(self._value).strip())
+        completed.append((self._current_key, value))
+        self.keys_seen += 1
+        self.state = AFTER_VALUE
+
+    def _decode(self, text: str) -> Any:
+        try:
+            return _decoder.decode(text)
+        except json.JSONDecodeError:
+            pass
+        try:
+            return _decoder.decode(TRAILING_COMMA.sub(lambda match: match.group(1) or "", text))
+        except json.JSONDecodeError as e:
+            raise StreamingJsonError(f"Invalid JSON near {text[:40]!r}: {e}") from None
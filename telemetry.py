@@ -0,0 +1,141 @@
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _percentile(values: List[float], fraction: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class Tracer:
+    """Collects one span per provider call for a translation run
+
+    Spans are plain dicts: name, trace/span ids, wall-clock start/end and a flat
+    attributes dict (model, language, chunk, queue_wait, ttft, latency, tokens,
+    retries, cost, cached, error). They export as JSONL or as OTLP/JSON
+    resourceSpans that an OpenTelemetry collector accepts.
+    """
+
+    def __init__(self, service_name: str = "translation-prompt-tester"):
+        self.service_name = service_name
+        self.trace_id = _new_id(16)
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_spans(cls, spans: List[Dict[str, Any]]) -> "Tracer":
+        """Tracer holding earlier recorded spans (e.g. of a stored run), for its tables and exports"""
+        tracer = cls()
+        if spans:
+            tracer.trace_id = spans[0]["trace_id"]
+        tracer.spans = list(spans)
+        return tracer
+
+    def record(
+        self,
+        name: str,
+        start: float,
+        end: float,
+        attributes: Dict[str, Any],
+        error: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Add a finished span; start/end are time.time() seconds"""
+        span = {
+            "trace_id": self.trace_id,
+            "span_id": _new_id(8),
+            "name": name,
+            "start": start,
+            "end": end,
+            "attributes": attributes,
+            "error": error or None,
+        }
+        with self._lock:
+            self.spans.append(span)
+        return span
+
+    def to_jsonl(self) -> str:
+        with self._lock:
+            return "".join(json.dumps(span, ensure_ascii=False) + "\n" for span in self.spans)
+
+    def to_otlp(self) -> Dict[str, Any]:
+        """OTLP/JSON export request body (POST to a collector's /v1/traces)"""
+        with self._lock:
+            spans = list(self.spans)
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": [
+                    {"key": "service.name", "value": {"stringValue": self.service_name}}
+                ]},
+                "scopeSpans": [{
+                    "scope": {"name": "translator"},
+                    "spans": [
+                        {
+                            "traceId": span["trace_id"],
+                            "spanId": span["span_id"],
+                            "name": span["name"],
+                            "kind": 3,  # SPAN_KIND_CLIENT
+                            "startTimeUnixNano": str(int(span["start"] * 1e9)),
+                            "endTimeUnixNano": str(int(span["end"] * 1e9)),
+                            "attributes": [
+                                {"key": key, "value": _otlp_value(value)}
+                                for key, value in span["attributes"].items()
+                                if value is not None
+                            ],
+                            "status": {"code": 2, "message": span["error"]} if span["error"] else {"code": 1},
+                        }
+                        for span in spans
+                    ],
+                }],
+            }]
+        }
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """One flat row per call for a summary table"""
+        with self._lock:
+            return [{**span["attributes"], "error": span["error"] or ""} for span in self.spans]
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """Totals per model x language, slowest and most expensive first"""
+        groups: Dict[tuple, List[Dict[str, Any]]] = {}
+        for row in self.rows():
+            groups.setdefault((row.get("model"), row.get("language")), []).append(row)
+
+        summary = []
+        for (model, language), rows in groups.items():
+            latencies = [row["latency"] for row in rows if not row.get("cached")]
+            summary.append({
+                "model": model,
+                "language": language,
+                "calls": len(rows),
+                "cached": sum(1 for row in rows if row.get("cached")),
+                "errors": sum(1 for row in rows if row["error"]),
+                "retries": sum(row.get("retries", 0) for row in rows),
+                "queue_wait_s": round(sum(row.get("queue_wait", 0.0) for row in rows), 3),
+                "p50_latency_s": round(_percentile(latencies, 0.5), 3),
+                "max_latency_s": round(max(latencies, default=0.0), 3),
+                "input_tokens": sum(row.get("input_tokens", 0) for row in rows),
+                "output_tokens": sum(row.get("output_tokens", 0) for row in rows),
+                "cache_read_tokens": sum(row.get("cache_read_tokens", 0) for row in rows),
+                "cost_usd": round(sum(row.get("cost", 0.0) for row in rows), 5),
+            })
+        summary.sort(key=lambda entry: (entry["max_latency_s"], entry["cost_usd"]), reverse=True)
+        return summary
+
@@ -0,0 +1,63 @@
+import json
+
+import pytest
+
+import cli
+from batch import DONE, FETCHED, SUBMITTED, BatchJob
+from fakes import FakeProviderServer
+from providers import PROVIDER_TYPES, ProviderRegistry
+from translator import MODELS
+
+SOURCE = {"hero_headline": "Get paid faster", "cta": "Sign up to {appName}"}
+TEMPLATE = "Translate into ${targetLanguage}:\n${jsonInput}"
+
+
+@pytest.fixture
+def server():
+    server = FakeProviderServer(latency=0.0, batch_latency=0.3).start()
+    yield server
+    server.stop()
+
+
+@pytest.fixture
+def registry(server):
+    registry = ProviderRegistry(
+        api_keys={"anthropic": "fake", "openai": "fake"},
+        config={"anthropic": {"base_url": server.base_url}, "openai": {"base_url": server.base_url + "/v1"}}
+    )
+    yield registry
+    registry.close()
+
+
+@pytest.mark.parametrize("model_name", ["Claude Sonnet 4.5", "GPT-5.1"])
+def test_batch_create_poll_fetch(tmp_path, registry, model_name):
+    job = BatchJob.create([("en.json", SOURCE, json.dumps(SOURCE))], ["French", "German"], TEMPLATE, MODELS[model_name], directory=tmp_path)
+    assert len(job.manifest["requests"]) == 2
+
+    # Submitted but not finished yet: the manifest alone is enough to pick it up later
+    assert not job.run(registry, interval=0.05, timeout=0)
+    assert job.status == SUBMITTED and job.manifest["batch_id"]
+
+    resumed = BatchJob.load(job.path)
+    assert resumed.run(registry, interval=0.05)
+    assert resumed.status == FETCHED
+    assert all(not result["error"] for result in resumed.manifest["results"].values())
+
+    [part] = resumed.finish()
+    assert resumed.status == DONE
+    for language in ("French", "German"):
+        assert part["results"][language]["valid"]
+        assert part["results"][language]["parsed"] == SOURCE
+
+
+def test_providers_without_batch_mode_are_rejected_before_planning(tmp_path, monkeypatch):
+    assert not PROVIDER_TYPES[MODELS["Gemini 3 Pro"]["provider"]].supports_batch
+    assert PROVIDER_TYPES["anthropic"].supports_batch and PROVIDER_TYPES["openai"].supports_batch
+
+    def create(*args, **kwargs):
+        raise AssertionError("a manifest was written")
+
+    monkeypatch.setattr(BatchJob, "create", create)
+    (tmp_path / "en.json").write_text('{"cta": "Sign up"}', encoding="utf-8")
+    with pytest.raises(SystemExit, match="not available for gemini"):
+        cli.main([str(tmp_path / "en.json"), "--batch", "-m", "gemini", "-l", "French", "-o", str(tmp_path / "out")])
@@ -0,0 +1,33 @@
+import json
+from pathlib import Path
+
+import benchmark
+
+BASELINE_PATH = Path(benchmark.__file__).parent / "baseline.json"
+
+
+def test_committed_fixtures_replay_against_the_baseline(capsys):
+    fixtures = sorted(benchmark.DEFAULT_FIXTURE_DIR.glob("*.json"))
+    assert fixtures
+    # Throughput depends on the machine, so only scores and fixture misses are held to the baseline here
+    assert benchmark.main(["replay", "--repeat", "1", "--baseline", str(BASELINE_PATH), "--tolerance", "1"]) == 0
+    assert "REGRESSION" not in capsys.readouterr().out
+
+
+def test_baseline_flags_score_drops_and_misses(tmp_path):
+    path = next(benchmark.DEFAULT_FIXTURE_DIR.glob("*.json"))
+    fixture = json.loads(path.read_text(encoding="utf-8"))
+    baseline = json.loads(BASELINE_PATH.read_text(encoding="utf-8"))
+
+    dropped = next(iter(fixture["responses"].values()))
+    dropped["text"] = "Sorry, I can't help with that."
+    fixture["responses"].popitem()
+    changed = tmp_path / path.name
+    changed.write_text(json.dumps(fixture), encoding="utf-8")
+
+    assert benchmark.main(["replay", "--repeat", "1", "--baseline", str(BASELINE_PATH), "--tolerance", "1", str(changed)]) == 1
+    problems = benchmark.compare_to_baseline(
+        {path.stem: benchmark.replay_fixture(fixture, repeat=1)}, baseline, tolerance=1
+    )
+    assert any("not in the fixture" in problem for problem in problems)
+    assert any("valid" in problem for problem in problems)
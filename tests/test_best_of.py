@@ -0,0 +1,46 @@
+import json
+
+from fakes import FAKE_MODEL, FakeProvider
+from incremental import KeyMemory
+from translator import translate_json
+
+SOURCE = {
+    "hero_headline": "Get paid faster",
+    "cta": "Sign up to {appName}",
+}
+TEMPLATE = "Translate into ${targetLanguage}:\n${jsonInput}"
+
+
+def run(translate, memory, **options):
+    return translate_json(SOURCE, json.dumps(SOURCE), ["French", "German"], TEMPLATE, FAKE_MODEL, translate,
+                          key_memory=memory, use_cache=False, **options)
+
+
+def test_best_of_draws_n_candidates_per_request(tmp_path):
+    fake = FakeProvider(latency=0.0)
+    all_results, stats = run(fake, KeyMemory(tmp_path / "memory.sqlite3"), samples=3)
+    assert fake.calls == 2 * 3
+    for language in ("French", "German"):
+        assert all_results[language]["valid"]
+        assert all_results[language]["best_of"]["candidates"] == 3
+
+
+def test_best_of_is_not_bypassed_by_single_sample_memory(tmp_path):
+    memory = KeyMemory(tmp_path / "memory.sqlite3")
+    fake = FakeProvider(latency=0.0)
+    run(fake, memory)
+    assert fake.calls == 2
+    assert run(fake, memory)[1]["reused_keys"] == 2 * len(SOURCE)
+    assert fake.calls == 2
+
+    requests = []
+
+    def sample(prompt, temperature, n):
+        requests.append(n)
+        return [fake(prompt, temperature) for _ in range(n)]
+
+    all_results, stats = run(fake, memory, samples=3, sample=sample)
+    assert requests == [3, 3]
+    assert fake.calls == 2 + 2 * 3
+    assert stats["reused_keys"] == 0
+    assert all_results["French"]["best_of"]["candidates"] == 3
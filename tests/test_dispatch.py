@@ -0,0 +1,73 @@
+import json
+import threading
+import time
+
+from dispatch import ProviderLimiter, dispatch_tasks
+from fakes import FAKE_MODEL, FakeProvider
+from translator import translate_json
+
+
+def echo(latency: float) -> FakeProvider:
+    return FakeProvider(latency=latency, jitter=0.0, respond=lambda prompt: prompt)
+
+
+def limiter(**options) -> ProviderLimiter:
+    options.setdefault("backoff_base", 0.01)
+    return ProviderLimiter(**options)
+
+
+def test_all_keys_run_concurrently_up_to_the_provider_cap():
+    fake = echo(0.2)
+    started = time.perf_counter()
+    outcomes = dispatch_tasks(list(range(12)), str, fake, "fake", limiter=limiter(limits={"fake": 4}), single_flight=None)
+    elapsed = time.perf_counter() - started
+
+    assert list(outcomes) == list(range(12))
+    assert all(outcome["raw"] == str(key) for key, outcome in outcomes.items())
+    assert fake.calls == 12
+    assert fake.peak_in_flight == 4
+    # Three waves of four, not twelve sequential calls
+    assert elapsed < 1.2
+
+
+def test_caps_are_per_provider():
+    first, second = echo(0.2), echo(0.2)
+    shared = limiter(limits={"first": 1, "second": 3})
+    threads = [
+        threading.Thread(target=dispatch_tasks, args=(list(range(6)), str, first, "first"), kwargs={"limiter": shared, "single_flight": None}),
+        threading.Thread(target=dispatch_tasks, args=(list(range(6)), str, second, "second"), kwargs={"limiter": shared, "single_flight": None}),
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert first.peak_in_flight == 1
+    assert second.peak_in_flight == 3
+
+
+def test_cancel_skips_calls_not_yet_sent():
+    fake = echo(0.2)
+    cancel = threading.Event()
+    outcomes = dispatch_tasks(
+        list(range(6)), str, fake, "fake",
+        limiter=limiter(limits={"fake": 2}),
+        on_complete=lambda key, outcome: cancel.set(),
+        cancel=cancel,
+        single_flight=None
+    )
+    assert fake.calls == 2
+    assert [outcome["error"] for outcome in outcomes.values()].count("Cancelled") == 4
+
+
+def test_languages_are_translated_concurrently():
+    source = {"cta": "Sign up to {appName}"}
+    languages = ["French", "German", "Italian", "Spanish", "Japanese", "Korean"]
+    fake = FakeProvider(latency=0.2, jitter=0.0)
+    started = time.perf_counter()
+    all_results, stats = translate_json(
+        source, json.dumps(source), languages, "Translate into ${targetLanguage}:\n${jsonInput}", FAKE_MODEL, fake,
+        limiter=limiter(limits={"fake": 8}), use_cache=False
+    )
+    assert all(all_results[language]["valid"] for language in languages)
+    assert fake.peak_in_flight == len(languages)
+    assert time.perf_counter() - started < 0.2 * len(languages) / 2
@@ -0,0 +1,17 @@
+from export import LANGUAGE_CODES, ResultExporter
+from translator import REFERENCE_TRANSLATIONS
+
+
+def test_every_language_has_an_xliff_code():
+    assert set(REFERENCE_TRANSLATIONS) <= set(LANGUAGE_CODES)
+    assert len(set(LANGUAGE_CODES.values())) == len(LANGUAGE_CODES)
+
+
+def test_xliff_uses_the_language_code(tmp_path):
+    source = {"cta": "Sign up"}
+    exporter = ResultExporter(tmp_path, formats=("xliff",))
+    exporter.add("en.json", source, "Vietnamese", {"valid": True, "parsed": {"cta": "Đăng ký"}, "error": ""})
+    exporter.close()
+    xliff = (tmp_path / "vietnamese" / "en.xlf").read_text(encoding="utf-8")
+    assert 'target-language="vi"' in xliff
+    assert "Đăng ký" in xliff
@@ -0,0 +1,82 @@
+import json
+import os
+import time
+
+import pytest
+
+from fakes import fuzzy_queries, synthetic_glossary_entries
+from glossary import FUZZY_THRESHOLD, Glossary, glossary_stamps, ngrams
+
+
+def dice(a, b):
+    return 2 * len(ngrams(a) & ngrams(b)) / (len(ngrams(a)) + len(ngrams(b)))
+
+
+@pytest.fixture
+def glossary():
+    glossary = Glossary()
+    glossary.add("French", "Sign up", "S'inscrire")
+    glossary.add("French", "Get paid faster", "Soyez payé plus vite")
+    glossary.add("French", "Invite your friends", "Invitez vos amis")
+    glossary.add("German", "Sign up", "Registrieren")
+    return glossary
+
+
+def test_exact_hits_ignore_whitespace_but_not_case(glossary):
+    assert glossary.exact("French", "Sign up") == "S'inscrire"
+    assert glossary.exact("French", "  Sign\n up ") == "S'inscrire"
+    assert glossary.exact("French", "sign up") is None
+    assert glossary.exact("Italian", "Sign up") is None
+    assert glossary.approved("German", {"cta": "Sign up", "count": 3, "other": "Log in"}) == {"cta": "Registrieren"}
+
+
+def test_fuzzy_hits_reach_the_dice_threshold(glossary):
+    query = "Get paid much faster"
+    assert dice(query, "Get paid faster") >= FUZZY_THRESHOLD
+    [match] = glossary.fuzzy("French", query)
+    assert match["source"] == "Get paid faster"
+    assert match["score"] == round(dice(query, "Get paid faster"), 3)
+
+
+def test_fuzzy_misses_below_the_threshold(glossary):
+    query = "Invite your colleagues today"
+    assert dice(query, "Invite your friends") < FUZZY_THRESHOLD
+    assert glossary.fuzzy("French", query) == []
+    assert glossary.fuzzy("French", "Completely different") == []
+    assert glossary.fuzzy("Italian", "Get paid faster") == []
+
+
+def test_changed_file_is_seen_and_reloaded(tmp_path):
+    path = tmp_path / "glossary.json"
+    path.write_text(json.dumps({"French": {"Sign up": "S'inscrire"}}), encoding="utf-8")
+    stamps = glossary_stamps([tmp_path])
+    assert Glossary.load([tmp_path]).exact("French", "Sign up") == "S'inscrire"
+
+    path.write_text(json.dumps({"French": {"Sign up": "Créer un compte"}}), encoding="utf-8")
+    later = time.time() + 5
+    os.utime(path, (later, later))
+    assert glossary_stamps([tmp_path]) != stamps
+    reloaded = Glossary.load([tmp_path])
+    assert reloaded.exact("French", "Sign up") == "Créer un compte"
+    assert reloaded.fuzzy("French", "Sign up now")[0]["translation"] == "Créer un compte"
+
+    (tmp_path / "more.csv").write_text("language,source,translation\nFrench,Log in,Se connecter\n", encoding="utf-8")
+    assert len(glossary_stamps([tmp_path])) == 2
+    assert len(Glossary.load([tmp_path])) == 2
+
+
+def test_fuzzy_lookup_takes_under_a_millisecond_at_100k_entries():
+    entries = synthetic_glossary_entries(100_000)
+    glossary = Glossary()
+    for source, translation in entries:
+        glossary.add("French", source, translation)
+    glossary.index("French")
+    queries = fuzzy_queries([source for source, _ in entries], 300)
+
+    rounds = []
+    for _ in range(3):
+        started = time.perf_counter()
+        hits = sum(1 for query in queries if glossary.fuzzy("French", query))
+        rounds.append((time.perf_counter() - started) / len(queries))
+    assert hits == len(queries)
+    assert min(rounds) < 0.001
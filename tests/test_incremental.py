@@ -0,0 +1,49 @@
+import json
+
+from fakes import FAKE_MODEL, FakeProvider
+from incremental import KeyMemory, make_scope
+from translator import plan_translation, translate_json
+
+SOURCE = {
+    "hero_headline": "Get paid faster",
+    "cta": "Sign up to {appName}",
+    "brand": "Cashy pays you",
+}
+TEMPLATE = "Translate into ${targetLanguage}:\n${jsonInput}"
+
+
+def test_record_skips_keys_failing_checks(tmp_path):
+    memory = KeyMemory(tmp_path / "memory.sqlite3")
+    stored = memory.record("scope", "French", SOURCE, {
+        "hero_headline": "Soyez payé bien plus rapidement",  # over the 20-char limit
+        "cta": "Inscrivez-vous à {appName}",
+        "brand": "cashy vous paie",  # brand altered
+    })
+    assert stored == 1
+    reused, pending = memory.diff("scope", "French", SOURCE)
+    assert reused == {"cta": "Inscrivez-vous à {appName}"}
+    assert set(pending) == {"hero_headline", "brand"}
+
+
+def test_scope_covers_sampling():
+    base = make_scope("model", TEMPLATE)
+    assert make_scope("model", TEMPLATE, temperature=0.9) != base
+    assert make_scope("model", TEMPLATE, samples=3) != base
+    assert make_scope("model", TEMPLATE, 0.3, 1) == base
+
+
+def test_other_temperature_calls_the_model_again(tmp_path):
+    memory = KeyMemory(tmp_path / "memory.sqlite3")
+    fake = FakeProvider(latency=0.0)
+    run = dict(source=SOURCE, json_input=json.dumps(SOURCE), languages=["French"], template=TEMPLATE,
+               model=FAKE_MODEL, translate=fake, key_memory=memory, use_cache=False)
+
+    translate_json(temperature=0.3, **run)
+    assert fake.calls == 1
+    plan = plan_translation(SOURCE, json.dumps(SOURCE), ["French"], TEMPLATE, FAKE_MODEL, key_memory=memory, temperature=0.3)
+    assert plan["pending"]["French"] == {}
+
+    all_results, stats = translate_json(temperature=0.9, **run)
+    assert fake.calls == 2
+    assert stats["reused_keys"] == 0
+    assert all_results["French"]["valid"]
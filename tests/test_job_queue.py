@@ -0,0 +1,119 @@
+import json
+import threading
+import time
+
+import pytest
+
+import job_queue
+from fakes import FAKE_MODEL, FakeProvider
+from incremental import KeyMemory
+from job_queue import DONE, MAX_ATTEMPTS, QUEUED, RUNNING, JobQueue, job_spec, run_worker, unfinished_result
+from run_store import RunStore
+from translation_cache import TranslationCache
+
+SOURCE = {"cta": "Sign up to {appName}"}
+TEMPLATE = "Translate into ${targetLanguage}:\n${jsonInput}"
+LANGUAGES = ["French", "German", "Italian", "Spanish"]
+
+
+def spec(languages=LANGUAGES):
+    return job_spec("translate", SOURCE, json.dumps(SOURCE), TEMPLATE, languages, {"Fake": FAKE_MODEL}, use_cache=False, incremental=False)
+
+
+def task_states(queue, job_id):
+    return {task["language"]: (task["state"], task["attempts"]) for task in queue.status(job_id)["tasks"]}
+
+
+@pytest.fixture
+def isolated_worker(tmp_path, monkeypatch):
+    """Workers keep their stores under tmp_path and translate with a fake that records each prompt"""
+    prompts = []
+    fake = FakeProvider(latency=0.0)
+
+    def translate(prompt, temperature=0.3):
+        prompts.append(prompt)
+        return fake(prompt, temperature)
+
+    monkeypatch.setattr(job_queue, "TranslationCache", lambda: TranslationCache(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(job_queue, "KeyMemory", lambda: KeyMemory(tmp_path / "memory.sqlite3"))
+    monkeypatch.setattr(job_queue, "RunStore", lambda: RunStore(tmp_path / "runs.sqlite3"))
+    monkeypatch.setattr(job_queue._Worker, "runners", lambda self, model: (translate, None))
+    return prompts
+
+
+def test_concurrent_workers_never_claim_the_same_task(tmp_path):
+    path = tmp_path / "jobs.sqlite3"
+    job_ids = [JobQueue(path).enqueue(spec()) for _ in range(5)]
+    claimed = {}
+    lock = threading.Lock()
+
+    def work(worker):
+        # Each worker has its own connection, as separate processes do
+        queue = JobQueue(path)
+        while True:
+            claim = queue.claim(worker, limit=1)
+            if claim is None:
+                return
+            with lock:
+                for task_id in claim["tasks"].values():
+                    claimed.setdefault(task_id, []).append(worker)
+
+    threads = [threading.Thread(target=work, args=(f"worker-{index}",)) for index in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(claimed) == len(job_ids) * len(LANGUAGES)
+    assert all(len(workers) == 1 for workers in claimed.values())
+    queue = JobQueue(path)
+    assert all(state == (RUNNING, 1) for job_id in job_ids for state in task_states(queue, job_id).values())
+
+
+def test_stale_claims_are_requeued_and_fail_after_max_attempts(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite3")
+    job_id = queue.enqueue(spec(["French"]))
+    claim = queue.claim("alive")
+    queue.heartbeat("alive", tuple(claim["tasks"].values()))
+    assert queue.requeue_stale(stale_after=60) == 0
+    assert task_states(queue, job_id) == {"French": (RUNNING, 1)}
+
+    # The worker then dies; every later claim dies too, until the attempts run out
+    for attempt in range(2, MAX_ATTEMPTS + 2):
+        time.sleep(0.02)
+        assert queue.requeue_stale(stale_after=0.01) == 1
+        if attempt <= MAX_ATTEMPTS:
+            assert task_states(queue, job_id) == {"French": (QUEUED, attempt - 1)}
+            assert queue.claim(f"dead-{attempt}") is not None
+    state, attempts = task_states(queue, job_id)["French"]
+    assert (state, attempts) == ("failed", MAX_ATTEMPTS)
+    assert queue.claim("late") is None
+
+    run_store = RunStore(tmp_path / "runs.sqlite3")
+    [run_id] = queue.finalize_ended(run_store)
+    assert run_store.load(run_id)["results"]["Fake"]["French"]["error"].startswith("Worker stopped 3 time(s)")
+
+
+def test_checkpointed_languages_are_not_redone_after_a_worker_dies(tmp_path, isolated_worker):
+    path = tmp_path / "jobs.sqlite3"
+    queue = JobQueue(path)
+    job_id = queue.enqueue(spec())
+
+    # A worker claims every language, finishes French, then dies without another heartbeat
+    claim = queue.claim("dead", limit=len(LANGUAGES))
+    done = {**unfinished_result(""), "valid": True, "parsed": {"cta": "Inscrivez-vous à {appName}"}}
+    queue.checkpoint(claim["tasks"]["French"], done)
+    time.sleep(0.02)
+    assert queue.requeue_stale(stale_after=0.01) == len(LANGUAGES) - 1
+    assert task_states(queue, job_id)["French"] == (DONE, 1)
+    assert task_states(queue, job_id)["German"] == (QUEUED, 1)
+
+    run_worker(path, until_empty=True)
+
+    translated = sorted(language for language in LANGUAGES if any(language in prompt for prompt in isolated_worker))
+    assert translated == ["German", "Italian", "Spanish"]
+    status = queue.status(job_id)
+    assert status["status"] == DONE and status["counts"][DONE] == len(LANGUAGES)
+    run = RunStore(tmp_path / "runs.sqlite3").load(status["run_id"])
+    assert run["results"]["Fake"]["French"]["parsed"] == {"cta": "Inscrivez-vous à {appName}"}
+    assert all(run["results"]["Fake"][language]["valid"] for language in LANGUAGES)
@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from fakes import MESSY_OUTPUTS_PATH, FakeProvider
+from json_extract import extract_json
+from streaming_json import IncrementalJsonParser, StreamingJsonError
+from translator import StreamAborted, make_streaming_translate
+
+with open(MESSY_OUTPUTS_PATH, encoding="utf-8") as corpus_file:
+    CORPUS = [json.loads(line) for line in corpus_file if line.strip()]
+
+# Where streaming legitimately yields less than extract_json: it stops at the first object
+# (extract_json keeps the largest) and sees only the complete values of a truncated nested one
+STREAM_PARTIAL = {"two_objects_example_first", "two_objects_repeated", "truncated_nested"}
+
+
+def stream_pairs(text, piece=7):
+    parser = IncrementalJsonParser()
+    pairs = []
+    for start in range(0, len(text), piece):
+        pairs.extend(parser.feed(text[start:start + piece]))
+    return parser, dict(pairs)
+
+
+@pytest.mark.parametrize("case", CORPUS, ids=[case["name"] for case in CORPUS])
+def test_extract_json_recovers_the_corpus(case):
+    parsed, repairs, error = extract_json(case["output"])
+    assert parsed == case["expected"]
+    assert bool(error) == (case["expected"] is None)
+
+
+@pytest.mark.parametrize("case", [case for case in CORPUS if case["expected"] is not None], ids=lambda case: case["name"])
+def test_streaming_never_aborts_what_extract_json_recovers(case):
+    parser, pairs = stream_pairs(case["output"])
+    if case["name"] not in STREAM_PARTIAL:
+        assert pairs == case["expected"]
+    else:
+        assert pairs
+
+
+@pytest.mark.parametrize("piece", [1, 3, 64])
+def test_streaming_does_not_depend_on_delta_size(piece):
+    case = next(case for case in CORPUS if case["name"] == "trailing_comma_nested")
+    assert stream_pairs(case["output"], piece)[1] == case["expected"]
+
+
+def test_streaming_still_aborts_broken_syntax():
+    case = next(case for case in CORPUS if case["name"] == "broken_syntax")
+    with pytest.raises(StreamingJsonError):
+        stream_pairs(case["output"])
+
+
+@pytest.mark.parametrize("name", ["raw_newline_in_string", "trailing_comma", "trailing_comma_nested", "prose_braces_before"])
+def test_streaming_translate_keeps_recoverable_output(name):
+    case = next(case for case in CORPUS if case["name"] == name)
+    fake = FakeProvider(latency=0.0, respond=lambda prompt: case["output"], stream_piece=5)
+    events = []
+    raw = make_streaming_translate(fake.stream, case["expected"], events.append)("prompt")
+    assert extract_json(raw)[0] == case["expected"]
+    assert {event["key"] for event in events if event["type"] == "value"} == set(case["expected"])
+
+
+def test_streaming_translate_aborts_broken_output_early():
+    case = next(case for case in CORPUS if case["name"] == "broken_syntax")
+    fake = FakeProvider(latency=0.0, respond=lambda prompt: case["output"], stream_piece=5)
+    with pytest.raises(StreamAborted):
+        make_streaming_translate(fake.stream, {"hero_headline": "x"}, lambda event: None)("prompt")
+
+
+def test_streaming_translate_keeps_text_after_the_first_object():
+    output = '{"a": "draft"}\nCorrected: {"a": "final", "b": "y"}'
+    fake = FakeProvider(latency=0.0, respond=lambda prompt: output, stream_piece=5)
+    events = []
+    raw = make_streaming_translate(fake.stream, {"a": "x", "b": "y"}, events.append)("prompt")
+    assert raw == output
+    assert extract_json(raw)[0] == extract_json(fake("prompt", 0.3))[0] == {"a": "final", "b": "y"}
@@ -0,0 +1,115 @@
+import threading
+import time
+
+import pytest
+
+from dispatch import ProviderLimiter, dispatch_tasks
+from rate_limit import CircuitBreaker, CircuitOpenError
+
+
+class StatusError(Exception):
+    """SDK-style error carrying an HTTP status and headers"""
+
+    def __init__(self, status: int, retry_after: float = None):
+        super().__init__(f"HTTP {status}")
+        self.status_code = status
+        self.response = type("Response", (), {"headers": {"retry-after": str(retry_after)} if retry_after is not None else {}})()
+
+
+def limiter(**options) -> ProviderLimiter:
+    options.setdefault("backoff_base", 0.01)
+    return ProviderLimiter(**options)
+
+
+def test_rate_limited_calls_honour_retry_after():
+    calls = []
+
+    def translate(prompt, temperature):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            raise StatusError(429, retry_after=0.3)
+        return "ok"
+
+    shared = limiter(rates={"fake": {"requests_per_minute": 600}})
+    outcome = dispatch_tasks(["a"], str, translate, "fake", limiter=shared, single_flight=None)["a"]
+    assert outcome["raw"] == "ok"
+    assert outcome["retries"] == 1
+    assert calls[1] - calls[0] >= 0.3
+    assert shared.rate_limited == 1
+
+
+def test_non_retryable_errors_fail_at_once():
+    def translate(prompt, temperature):
+        raise StatusError(400)
+
+    outcome = dispatch_tasks(["a"], str, translate, "fake", limiter=limiter(), single_flight=None)["a"]
+    assert outcome["raw"] is None
+    assert outcome["retries"] == 0
+    assert "HTTP 400" in outcome["error"]
+
+
+def test_retries_give_up_after_max_retries():
+    def translate(prompt, temperature):
+        raise StatusError(503)
+
+    outcome = dispatch_tasks(["a"], str, translate, "fake", limiter=limiter(max_retries=2, breaker_threshold=100), single_flight=None)["a"]
+    assert outcome["retries"] == 2
+    assert outcome["error"].endswith("(after 2 retries)")
+
+
+def test_cancel_interrupts_a_retry_backoff():
+    def translate(prompt, temperature):
+        raise StatusError(429, retry_after=30)
+
+    cancel = threading.Event()
+    threading.Timer(0.2, cancel.set).start()
+    started = time.monotonic()
+    outcome = dispatch_tasks(["a"], str, translate, "fake", limiter=limiter(), cancel=cancel, single_flight=None)["a"]
+    assert time.monotonic() - started < 2
+    assert outcome["error"] == "Cancelled"
+    assert outcome["retries"] == 0
+
+
+def test_breaker_opens_probes_and_closes():
+    breaker = CircuitBreaker("fake", threshold=2, cooldown=0.1)
+    breaker.failure()
+    breaker.failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.check()
+    time.sleep(0.12)
+    breaker.check()  # the probe
+    with pytest.raises(CircuitOpenError):
+        breaker.check()  # everyone else waits for it
+    breaker.success()
+    assert breaker.state == "closed"
+    breaker.check()
+
+
+def test_callers_waiting_on_the_breaker_keep_their_retries():
+    # The provider is overloaded for a moment, then recovers; calls are slow
+    recovered_at = time.monotonic() + 0.3
+
+    def translate(prompt, temperature):
+        if time.monotonic() < recovered_at:
+            raise StatusError(529)
+        time.sleep(1.2)
+        return prompt
+
+    # The probe outlasts every retry's backoff put together
+    shared = limiter(limits={"fake": 8}, breaker_threshold=3, breaker_cooldown=0.2, max_retries=2)
+    languages = [f"language {index}" for index in range(8)]
+    outcomes = dispatch_tasks(languages, str, translate, "fake", limiter=shared, single_flight=None)
+
+    assert [outcome["error"] for outcome in outcomes.values()] == [""] * 8
+    assert all(outcome["raw"] == language for language, outcome in outcomes.items())
+    assert shared.breaker("fake").state == "closed"
+
+
+def test_breaker_wait_has_its_own_budget():
+    def translate(prompt, temperature):
+        raise StatusError(529)
+
+    shared = limiter(breaker_threshold=1, breaker_cooldown=10.0, breaker_wait=0.0, max_retries=3)
+    outcome = dispatch_tasks(["a"], str, translate, "fake", limiter=shared, single_flight=None)["a"]
+    assert "failing repeatedly" in outcome["error"]
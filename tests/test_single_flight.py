@@ -0,0 +1,117 @@
+import threading
+import time
+
+import pytest
+
+from dispatch import ProviderLimiter, dispatch_tasks
+from fakes import FakeProvider
+from providers import Completion
+from single_flight import SingleFlight
+
+
+class StatusError(Exception):
+    def __init__(self, status: int, retry_after: float = None):
+        super().__init__(f"HTTP {status}")
+        self.status_code = status
+        self.response = type("Response", (), {"headers": {"retry-after": str(retry_after)} if retry_after is not None else {}})()
+
+
+def dispatch_concurrently(sessions, translate, flight):
+    """Run one single-key dispatch per session (a dict of dispatch_tasks options) at once; their outcomes in order"""
+    outcomes = [None] * len(sessions)
+
+    def run(index, options):
+        limiter = ProviderLimiter(backoff_base=0.01)
+        outcomes[index] = dispatch_tasks(["French"], lambda key: "same prompt", translate, "fake", limiter=limiter, single_flight=flight, **options)["French"]
+
+    threads = [threading.Thread(target=run, args=(index, options)) for index, options in enumerate(sessions)]
+    for thread in threads:
+        thread.start()
+        time.sleep(0.02)
+    for thread in threads:
+        thread.join()
+    return outcomes
+
+
+def test_one_call_serves_identical_concurrent_requests():
+    flight = SingleFlight()
+    fake = FakeProvider(latency=0.3, jitter=0.0, respond=lambda prompt: '{"cta": "S\'inscrire"}')
+
+    def translate(prompt, temperature):
+        return Completion(fake(prompt, temperature), usage={"input_tokens": 10, "output_tokens": 5})
+
+    outcomes = dispatch_concurrently([{}] * 5, translate, flight)
+
+    assert fake.calls == 1
+    assert fake.peak_in_flight == 1
+    assert flight.stats() == {"calls": 1, "saved": 4, "in_flight": 0, "waiting": 0}
+    assert len({outcome["raw"] for outcome in outcomes}) == 1
+    assert [outcome["coalesced"] for outcome in outcomes].count(True) == 4
+    # Only the request that made the call reports its tokens
+    assert [bool(outcome["usage"]) for outcome in outcomes].count(True) == 1
+
+
+def test_waiters_get_the_leaders_exception_and_are_not_counted_as_saved():
+    flight = SingleFlight()
+    started = threading.Event()
+    failure = RuntimeError("boom")
+    errors = []
+
+    def call():
+        started.set()
+        time.sleep(0.2)
+        raise failure
+
+    def wait():
+        started.wait()
+        with pytest.raises(RuntimeError) as raised:
+            flight.do("key", call)
+        errors.append(raised.value)
+
+    waiters = [threading.Thread(target=wait) for _ in range(3)]
+    for thread in waiters:
+        thread.start()
+    with pytest.raises(RuntimeError):
+        flight.do("key", call)
+    for thread in waiters:
+        thread.join()
+
+    assert errors == [failure] * 3
+    assert flight.stats()["calls"] == 1
+    assert flight.stats()["saved"] == 0
+
+
+def test_failed_shared_call_is_not_counted_as_saved():
+    flight = SingleFlight()
+    calls = []
+
+    def translate(prompt, temperature):
+        calls.append(prompt)
+        time.sleep(0.2)
+        raise StatusError(400)
+
+    outcomes = dispatch_concurrently([{}] * 3, translate, flight)
+    assert len(calls) == 1
+    assert all("HTTP 400" in outcome["error"] for outcome in outcomes)
+    assert flight.stats()["saved"] == 0
+
+
+def test_waiter_calls_again_when_another_session_cancels_the_shared_call():
+    flight = SingleFlight()
+    cancel = threading.Event()
+    calls = []
+
+    def translate(prompt, temperature):
+        calls.append(prompt)
+        if len(calls) == 1:
+            # The first session's call is rate limited; it is cancelled during the backoff
+            threading.Timer(0.1, cancel.set).start()
+            raise StatusError(429, retry_after=5)
+        return '{"cta": "Registrieren"}'
+
+    leader, waiter = dispatch_concurrently([{"cancel": cancel}, {}], translate, flight)
+    assert leader["error"] == "Cancelled"
+    assert waiter["raw"] == '{"cta": "Registrieren"}'
+    assert len(calls) == 2
+    assert flight.stats()["calls"] == 2
+    assert flight.stats()["saved"] == 0
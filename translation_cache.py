@@ -0,0 +1,121 @@
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+DEFAULT_CACHE_PATH = Path(__file__).parent / ".cache" / "translations.sqlite3"
+
+# Run eviction every N writes instead of on every put
+EVICT_EVERY = 50
+
+
+def make_cache_key(model_id: str, params: Dict[str, Any], prompt: str) -> str:
+    """Content hash of everything that determines a completion"""
+    payload = json.dumps(
+        {"model": model_id, "params": params, "prompt": prompt},
+        sort_keys=True,
+        ensure_ascii=False
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class TranslationCache:
+    """Persistent SQLite cache of raw model responses keyed by content hash"""
+
+    def __init__(
+        self,
+        path: Path = DEFAULT_CACHE_PATH,
+        max_entries: int = 5000,
+        max_age_seconds: float = 30 * 24 * 3600
+    ):
+        self.path = Path(path)
+        self.max_entries = max_entries
+        self.max_age_seconds = max_age_seconds
+        self.hits = 0
+        self.misses = 0
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                model TEXT NOT NULL,
+                response TEXT NOT NULL,
+                created_at REAL NOT NULL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_access ON responses(last_access)")
+        self._conn.commit()
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached response, or None if missing or expired"""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None or now - row[1] > self.max_age_seconds:
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key: str, model_id: str, response: str) -> None:
+        """Store a response and periodically evict old or excess entries"""
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, created_at, last_access) VALUES (?, ?, ?, ?, ?)",
+                (key, model_id, response, now, now)
+            )
+            self._conn.commit()
+            self._writes += 1
+            if self._writes % EVICT_EVERY == 0:
+                self._evict(now)
+
+    def _evict(self, now: float) -> None:
+        # Age first, then least recently used beyond max_entries
+        self._conn.execute("DELETE FROM responses WHERE created_at < ?", (now - self.max_age_seconds,))
+        self._conn.execute(
+            """
+            DELETE FROM responses WHERE key IN (
+                SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?
+            )
+            """,
+            (self.max_entries,)
+        )
+        self._conn.commit()
+
+    def evict(self) -> None:
+        """Apply the age and size limits now"""
+        with self._lock:
+            self._evict(time.time())
+
+    def clear(self) -> None:
+        """Drop every cached response"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        """Entry count, on-disk size and hit/miss counters"""
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        size = self.path.stat().st_size if self.path.exists() else 0
+        return {
+            "entries": entries,
+            "size_bytes": size,
+            "hits": self.hits,
+            "misses": self.misses
+        }
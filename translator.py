@@ -0,0 +1,1186 @@
+import json
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Any, Callable, Iterator, List, Optional, Tuple
+
+from chunking import chunk_budget, estimate_tokens, split_json
+from dispatch import ProviderLimiter, dispatch_tasks
+from glossary import Glossary
+from translation_cache import TranslationCache
+from incremental import KeyMemory, make_scope, merge_translations
+from json_extract import extract_json
+from providers import Completion, Prompt
+from scoring import grapheme_count, score_text
+from streaming_json import IncrementalJsonParser, StreamingJsonError
+from telemetry import Tracer
+from validation import CHAR_LIMITS, SourceFacts
+
+# Model ids (also part of the translation cache key)
+OPUS_MODEL_ID = "claude-opus-4-5-20251101"
+SONNET_MODEL_ID = "claude-sonnet-4-20250514"
+GPT_MODEL_ID = "gpt-5.1-2025-11-13"
+GEMINI_MODEL_ID = "gemini-3-pro-preview"
+
+# Display name -> provider (see providers.PROVIDER_TYPES), model id, output token
+# limit, source tokens per chunk, USD per million input/output tokens, USD per
+# million prompt-cache read/write tokens and extra request params. Adding a
+# model is one entry here. GPT-5.1 and Gemini 3 count reasoning tokens against
+# the output limit.
+MODELS = {
+    "Claude Opus 4.5": {
+        "provider": "anthropic", "model_id": OPUS_MODEL_ID,
+        "max_output_tokens": 8000, "chunk_tokens": 1500, "price_per_mtok": (5.0, 25.0),
+        "cache_price_per_mtok": (0.5, 6.25)
+    },
+    "Claude Sonnet 4.5": {
+        "provider": "anthropic", "model_id": SONNET_MODEL_ID,
+        "max_output_tokens": 8000, "chunk_tokens": 1500, "price_per_mtok": (3.0, 15.0),
+        "cache_price_per_mtok": (0.3, 3.75)
+    },
+    "GPT-5.1": {
+        "provider": "openai", "model_id": GPT_MODEL_ID,
+        "max_output_tokens": 16000, "chunk_tokens": 1500, "price_per_mtok": (1.25, 10.0),
+        "cache_price_per_mtok": (0.125, 1.25),
+        "params": {"top_p": 0.9}
+    },
+    "Gemini 3 Pro": {
+        "provider": "gemini", "model_id": GEMINI_MODEL_ID,
+        "max_output_tokens": 16000, "chunk_tokens": 1500, "price_per_mtok": (2.0, 12.0),
+        "cache_price_per_mtok": (0.2, 2.0)
+    },
+}
+
+DEFAULT_TEMPLATE_PATH = Path(__file__).parent / "prompt_zero_bs_focused.txt"
+
+# Shipped prompt templates by display name, default first
+PROMPT_TEMPLATES = {
+    "Zero BS focused": DEFAULT_TEMPLATE_PATH,
+    "Cashy brand": Path(__file__).parent / "prompt_cashy_brand.txt",
+    "GPT-5 optimized": Path(__file__).parent / "prompt_gpt5_optimized.txt",
+}
+
+# The substitution slots a template may contain
+TEMPLATE_SLOT = re.compile(r'\$\{(targetLanguage|jsonInput|glossary|glossaryBlock)\}')
+
+# A line holding only an opening tag such as <input>, where a template section starts
+OPENING_TAG_LINE = re.compile(r'^<[A-Za-z_][\w-]*>[ \t]*$', re.MULTILINE)
+
+# Default input for the app and the benchmark suite
+SAMPLE_JSON = """{
+  "hero_headline": "ZERO BS CASINO",
+  "hero_subheadline": "CASH REWARDS ONLY",
+  "hero_bullet_no_wagering": "No wagering requirements",
+  "hero_bullet_fast_payouts": "Super fast payouts",
+  "hero_bullet_no_limits": "No limits on wins & withdrawals",
+  "hero_cta_signup": "Sign up"
+}"""
+
+# Fix-up prompt for keys that failed the per-key checks; only those keys are sent
+REPAIR_TEMPLATE = """Some keys of a ${targetLanguage} translation failed automatic checks. For each key below you get the English source, the current translation (null if it is missing) and the problems found.
+
+Fix each translation:
+- Keep every {placeholder} and HTML tag exactly as it appears in the source.
+- Write the brand name exactly as "Cashy".
+- Stay within max_chars where given.
+
+Return ONLY a JSON object mapping each key to its corrected ${targetLanguage} translation, with no other text.
+
+${jsonInput}"""
+
+# Fix-up attempts per language before the remaining keys are left as they are
+DEFAULT_REPAIR_ROUNDS = 2
+
+# Reference translations for evaluation
+REFERENCE_TRANSLATIONS = {
+    "French": {
+        "hero_headline": "ZERO PIPEAU CASINO",
+        "hero_subheadline": "Que des gains en cash"
+    },
+    "Spanish": {
+        "hero_headline": "CASINO SIN RODEOS",
+        "hero_subheadline": "Solo premios en cash"
+    },
+    "Italian": {
+        "hero_headline": "ZERO FUFFA CASINÒ",
+        "hero_subheadline": "Solo premi in cash"
+    },
+    "German": {
+        "hero_headline": "CASINO OHNE TRICKS",
+        "hero_subheadline": "Nur Cash-Gewinne"
+    },
+    "Russian": {
+        "hero_headline": "КАЗИНО БЕЗ ФОКУСОВ",
+        "hero_subheadline": "Только денежные призы"
+    },
+    "Japanese": {
+        "hero_headline": "透明性の高いカジノ",
+        "hero_subheadline": "現金賞品のみ"
+    },
+    "Indonesian": {
+        "hero_headline": "KASINO JUJUR TERBUKA",
+        "hero_subheadline": "HANYA HADIAH TUNAI"
+    },
+    "Simplified Chinese": {
+        "hero_headline": "无废话娱乐场",
+        "hero_subheadline": "纯粹现金奖励"
+    },
+    "Traditional Chinese": {
+        "hero_headline": "無廢話娛樂場",
+        "hero_subheadline": "純粹現金獎勵"
+    },
+    "Korean": {
+        "hero_headline": "투명한 카지노",
+        "hero_subheadline": "오직 현금상금"
+    },
+    "Portuguese (Portugal)": {
+        "hero_headline": "CASINO A SÉRIO",
+        "hero_subheadline": "Prémios em dinheiro"
+    },
+    "Portuguese (Brazil)": {
+        "hero_headline": "CASSINO NA VEIA",
+        "hero_subheadline": "Prêmios em dinheiro"
+    },
+    "Turkish": {
+        "hero_headline": "DOLANSIZ CASINO",
+        "hero_subheadline": "Sadece nakit ödüller"
+    },
+    "Hindi": {
+        "hero_headline": "साफ़ सुथरा कैसिनो",
+        "hero_subheadline": "सिर्फ नकद इनाम"
+    },
+    "Vietnamese": {
+        "hero_headline": "SÒNG BẠC KHÔNG XẠO",
+        "hero_subheadline": "Chỉ thưởng tiền mặt thật"
+    },
+    "Arabic (Peninsular)": {
+        "hero_headline": "كازينو بلا تعقيد",
+        "hero_subheadline": "مكافآت نقدية بس"
+    }
+}
+
+# Reference grades (see scoring.score_text) as shown in the app and the copy view
+REFERENCE_GRADES = {
+    "match": "✅ MATCH",
+    "close": "🟡 CLOSE",
+    "partial": "🟠 PARTIAL",
+    "miss": "❌ NO MATCH",
+}
+
+
+def estimate_cost(
+    model: Dict[str, Any],
+    input_tokens: int,
+    output_tokens: int,
+    cache_read_tokens: int = 0,
+    cache_write_tokens: int = 0
+) -> float:
+    """USD cost of a call from the model's per-million-token prices
+
+    input_tokens is the whole prompt; the cache read/written parts of it are
+    billed at the model's cache prices instead.
+    """
+    input_price, output_price = model.get("price_per_mtok", (0.0, 0.0))
+    read_price, write_price = model.get("cache_price_per_mtok", (input_price, input_price))
+    uncached = max(0, input_tokens - cache_read_tokens - cache_write_tokens)
+    return (
+        uncached * input_price
+        + cache_read_tokens * read_price
+        + cache_write_tokens * write_price
+        + output_tokens * output_price
+    ) / 1_000_000
+
+# Path -> ((mtime_ns, size), text) for every template file read in this process
+_template_files: Dict[str, Tuple[Tuple[int, int], str]] = {}
+
+def load_prompt_template(path: Path = DEFAULT_TEMPLATE_PATH) -> str:
+    """Load a prompt template (the Zero BS focused one by default)
+
+    Each file is read once per process and again only when its mtime or size
+    changes, so reruns and every app session share one copy (and the same str
+    object, whose hash compile_template's cache then reuses).
+    """
+    path = os.fspath(path)
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _template_files.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    _template_files[path] = (stamp, text)
+    return text
+
+
+class CompiledTemplate:
+    """A template split once into literal pieces and its ${...} slots (see TEMPLATE_SLOT)
+
+    pieces alternates literal text (even indexes) and slot names (odd
+    indexes); render fills the slots and joins in one pass instead of
+    scanning the whole template once per replaced variable.
+    """
+
+    __slots__ = ("text", "pieces")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.pieces = TEMPLATE_SLOT.split(text)
+
+    def render(self, values: Dict[str, str]) -> str:
+        if len(self.pieces) == 1:
+            return self.text
+        pieces = list(self.pieces)
+        pieces[1::2] = [values[name] for name in self.pieces[1::2]]
+        return "".join(pieces)
+
+
+def input_section_start(template: str) -> int:
+    """Where the input section starts: the last opening tag line (e.g. <input>) before ${jsonInput}, or its line; -1 without one"""
+    index = template.find("${jsonInput}")
+    if index == -1:
+        return -1
+    cut = template.rfind("\n", 0, index) + 1
+    for match in OPENING_TAG_LINE.finditer(template, 0, index):
+        cut = match.start()
+    return cut
+
+
+@lru_cache(maxsize=64)
+def compile_template(template: str) -> CompiledTemplate:
+    """Compile a template; one without a glossary slot gets ${glossaryBlock} just before its input section"""
+    cut = input_section_start(template)
+    if cut != -1 and "${glossary}" not in template and "${glossaryBlock}" not in template:
+        template = template[:cut] + "${glossaryBlock}" + template[cut:]
+    return CompiledTemplate(template)
+
+
+def format_glossary(hints: Optional[List[List[str]]]) -> Dict[str, str]:
+    """Slot values for [source, approved translation] hint pairs
+
+    ${glossary} is the bare list of pairs, for templates with their own
+    glossary section; ${glossaryBlock} wraps it in a <glossary> section with
+    instructions. Both are empty without hints.
+    """
+    if not hints:
+        return {"glossary": "", "glossaryBlock": ""}
+    lines = "\n".join(
+        f"{json.dumps(source, ensure_ascii=False)} → {json.dumps(translation, ensure_ascii=False)}"
+        for source, translation in hints
+    )
+    return {
+        "glossary": lines,
+        "glossaryBlock": (
+            "<glossary>\nApproved translations of similar strings. Reuse their terminology and wording "
+            f"wherever the meaning is the same:\n{lines}\n</glossary>\n\n"
+        ),
+    }
+
+
+def format_prompt(
+    template: str,
+    target_language: str,
+    json_input: str,
+    glossary: Optional[List[List[str]]] = None
+) -> str:
+    """Format the prompt template with user inputs and optional glossary hints (see format_glossary)"""
+    return compile_template(template).render({
+        "targetLanguage": target_language,
+        "jsonInput": json_input,
+        **format_glossary(glossary),
+    })
+
+
+@lru_cache(maxsize=16)
+def split_template(template: str) -> Tuple[str, str]:
+    """Split a template into a language-independent prefix and a per-request suffix template
+
+    The suffix starts at the last opening tag line (e.g. <input>) before
+    ${jsonInput}, or at that placeholder's line. In the prefix the target
+    language is referred to generically, so it is byte-identical for every
+    language and can be served from the provider's prompt cache; the suffix
+    names the language (a "Target language:" line is added if it doesn't).
+    Glossary hints differ per request, so they always go in the suffix.
+    """
+    cut = input_section_start(template)
+    if cut == -1:
+        return "", template
+
+    prefix = template[:cut] \
+        .replace("${glossaryBlock}", "") \
+        .replace("${glossary}", "") \
+        .replace("${targetLanguage}-", "target-language-") \
+        .replace("${targetLanguage}", "the target language")
+    suffix = template[cut:]
+    if "${targetLanguage}" not in suffix:
+        suffix = "Target language: ${targetLanguage}\n\n" + suffix
+    return prefix, suffix
+
+
+def format_cacheable_prompt(
+    template: str,
+    target_language: str,
+    json_input: str,
+    glossary: Optional[List[List[str]]] = None
+) -> Prompt:
+    """Format the template as a shared cacheable prefix plus a per-language/per-JSON suffix"""
+    prefix, suffix = split_template(template)
+    return Prompt(prefix, format_prompt(suffix, target_language, json_input, glossary))
+
+
+class StreamAborted(Exception):
+    """Streamed output became structurally invalid, so the call was stopped early"""
+
+def check_value(key: str, value: Any, source: Dict[str, Any]) -> List[str]:
+    """Per-key checks that can run as soon as a streamed value completes"""
+    if key not in source:
+        return ["Unexpected key"]
+    return SourceFacts({key: source[key]}).check(key, value)
+
+def make_streaming_translate(
+    stream: Callable[[str, float], Iterator[str]],
+    source: Dict[str, Any],
+    on_event: Callable[[Dict[str, Any]], None]
+) -> Callable[[str, float], Optional[str]]:
+    """Wrap a stream callable into a translate callable that parses and checks values as they arrive
+
+    Emits {"type": "first_token", "elapsed"} once, then {"type": "value", "key",
+    "value", "problems"} per completed key. Raises StreamAborted as soon as the
+    output can no longer be valid JSON. Text after the first object closes is
+    not parsed live but is kept in the returned output, so extract_json picks
+    the same object as for a non-streamed response (e.g. a corrected second
+    object).
+    Returns a Completion carrying the stream's usage and time to first token.
+    """
+    facts = SourceFacts(source)
+
+    def translate(prompt: str, temperature: float = 0.3) -> Optional[str]:
+        parser = IncrementalJsonParser()
+        parts: List[str] = []
+        started = time.perf_counter()
+        first_token = None
+        deltas = stream(prompt, temperature)
+        try:
+            for delta in deltas:
+                if not parts:
+                    first_token = time.perf_counter() - started
+                    on_event({"type": "first_token", "elapsed": first_token})
+                # Text after the first object is kept: extract_json on the whole output decides, as without streaming
+                parts.append(delta)
+                if parser.done:
+                    continue
+                for key, value in parser.feed(delta):
+                    on_event({
+                        "type": "value",
+                        "key": key,
+                        "value": value,
+                        "problems": facts.check(key, value)
+                    })
+        except StreamingJsonError as e:
+            received = sum(len(part) for part in parts)
+            raise StreamAborted(f"aborted after {received} chars, {parser.keys_seen} key(s): {e}") from None
+        finally:
+            close = getattr(deltas, "close", None)
+            if close:
+                close()
+        return Completion(
+            "".join(parts),
+            usage=getattr(deltas, "usage", None),
+            first_token=first_token
+        )
+
+    return translate
+
+def sample_concurrently(translate: Callable[[str, float], Optional[str]]) -> Callable[[str, float, int], List[str]]:
+    """(prompt, temperature, n) sampling callable from a single-call translate, one thread per candidate
+
+    For providers without a native n parameter (and fakes); failed calls are
+    dropped unless all of them fail.
+    """
+    def sample(prompt: str, temperature: float = 0.3, n: int = 1) -> List[str]:
+        with ThreadPoolExecutor(max_workers=n) as executor:
+            futures = [executor.submit(translate, prompt, temperature) for _ in range(n)]
+        candidates, errors = [], []
+        for future in futures:
+            try:
+                candidates.append(future.result())
+            except Exception as e:
+                errors.append(e)
+        if errors and not any(candidates):
+            raise errors[0]
+        return candidates
+
+    return sample
+
+def rank_candidate(
+    parsed: Optional[Dict[str, Any]],
+    facts: SourceFacts,
+    references: Dict[str, str]
+) -> Tuple[bool, int, float]:
+    """(passes every hard constraint, -problem count, mean chrF vs references) -- higher is better
+
+    Hard constraints: valid JSON, the source's keys, and per-key placeholders,
+    HTML tags, "Cashy" and character limits.
+    """
+    if parsed is None:
+        return False, -len(facts.keys) - 1, 0.0
+    problems = len(facts.keys ^ set(parsed))
+    problems += sum(1 for key, value in parsed.items() if key in facts.keys and facts.check(key, value))
+    similarities = [
+        score_text(parsed[field], expected)["similarity"]
+        for field, expected in references.items()
+        if isinstance(parsed.get(field), str)
+    ]
+    similarity = sum(similarities) / len(references) if references else 0.0
+    return problems == 0, -problems, similarity
+
+def make_best_of_translate(
+    sample: Callable[[str, float, int], List[str]],
+    samples: int,
+    source: Dict[str, Any],
+    language: str
+) -> Callable[[str, float], Optional[str]]:
+    """Wrap a sampling callable into a translate callable that returns the best of `samples` candidates
+
+    Candidates are ranked by rank_candidate: those passing the hard constraints
+    first, then by fewer problems, then by similarity to REFERENCE_TRANSLATIONS
+    for this language, then by arrival order. The returned Completion carries
+    the usage of every candidate (estimated where the provider reports none)
+    and best_of = {"candidates", "passing", "similarity"}.
+    """
+    facts = SourceFacts(source)
+    references = {field: text for field, text in REFERENCE_TRANSLATIONS.get(language, {}).items() if field in source}
+
+    def translate(prompt: str, temperature: float = 0.3) -> Optional[str]:
+        candidates = [candidate for candidate in sample(prompt, temperature, samples) if candidate]
+        if not candidates:
+            return None
+
+        usage: Dict[str, int] = {}
+        for candidate in candidates:
+            reported = getattr(candidate, "usage", None)
+            if reported is None:
+                # Concurrent fallback without SDK usage: every candidate paid for the prompt
+                reported = {"input_tokens": estimate_tokens(prompt), "output_tokens": estimate_tokens(candidate)}
+            for field, count in reported.items():
+                usage[field] = usage.get(field, 0) + count
+
+        ranks = [rank_candidate(extract_json(candidate)[0], facts, references) for candidate in candidates]
+        best = max(range(len(candidates)), key=lambda index: (ranks[index], -index))
+        completion = Completion(candidates[best], usage=usage)
+        completion.best_of = {
+            "candidates": len(candidates),
+            "passing": sum(1 for rank in ranks if rank[0]),
+            "similarity": round(ranks[best][2], 1) if references else None,
+        }
+        return completion
+
+    return translate
+
+def validate_json(json_str: str, recover: bool = True) -> tuple[bool, Optional[Dict], str]:
+    """Validate JSON string and return parsed object
+
+    The object is extracted from surrounding prose or code fences; with
+    recover, trailing commas and truncated output are repaired (see
+    extract_json). Pass recover=False for user input that must be complete.
+    """
+    parsed, _, error = extract_json(json_str, recover=recover)
+    return parsed is not None, parsed, error
+
+def compile_all_results_for_copy(all_results: Dict[str, Any], json_parsed: Dict) -> str:
+    """Compile all translation results into a copyable format"""
+    output_lines = []
+    output_lines.append("=" * 80)
+    output_lines.append("TRANSLATION RESULTS - SELECTED LANGUAGES")
+    output_lines.append("=" * 80)
+    output_lines.append("")
+
+    for language in all_results.keys():
+        result_data = all_results.get(language)
+        if not result_data or not result_data.get("valid"):
+            continue
+
+        result_parsed = result_data["parsed"]
+        references = {match["field"]: match for match in evaluate_against_reference(result_parsed, language).get("matches", [])}
+
+        output_lines.append(f"\n{'='*80}")
+        output_lines.append(f"LANGUAGE: {language}")
+        output_lines.append(f"{'='*80}\n")
+
+        # Show hero_headline / hero_subheadline comparison
+        for field, limit in CHAR_LIMITS.items():
+            if field not in result_parsed:
+                continue
+            output_lines.append(field.replace("_", " ").upper() + ":")
+            output_lines.append(f"  Translation: {result_parsed[field]}")
+            output_lines.append(f"  Char count:  {grapheme_count(str(result_parsed[field]).strip())} / {limit}")
+            if field in references:
+                match = references[field]
+                output_lines.append(f"  Reference:   {match['expected']}")
+                output_lines.append(f"  Status:      {REFERENCE_GRADES[match['grade']]} (chrF {match['similarity']:.0f})")
+            output_lines.append("")
+
+        # Show other fields
+        output_lines.append("OTHER FIELDS:")
+        for key, value in result_parsed.items():
+            if key not in CHAR_LIMITS:
+                output_lines.append(f"  {key}: {value}")
+        output_lines.append("")
+
+    output_lines.append("=" * 80)
+    output_lines.append("END OF RESULTS")
+    output_lines.append("=" * 80)
+
+    return "\n".join(output_lines)
+
+def evaluate_against_reference(translation: Dict[str, Any], target_language: str) -> Dict[str, Any]:
+    """Evaluate translation against reference translations
+
+    Each field gets a graded score (see scoring.score_text): "matches" ignores
+    case, full-width forms, spacing and accents, "similarity" is chrF (0-100)
+    and "grade" one of REFERENCE_GRADES. char_count counts graphemes.
+    """
+    # Check if we have reference translations for this language
+    if target_language not in REFERENCE_TRANSLATIONS:
+        return {"has_reference": False}
+
+    reference = REFERENCE_TRANSLATIONS[target_language]
+    results = {"has_reference": True, "matches": []}
+
+    for field, expected in reference.items():
+        if not isinstance(translation.get(field), str):
+            continue
+        actual = translation[field].strip()
+        results["matches"].append({
+            "field": field,
+            "expected": expected,
+            "actual": actual,
+            **score_text(actual, expected),
+            "char_count": grapheme_count(actual),
+            "limit": CHAR_LIMITS.get(field),
+        })
+
+    return results
+
+
+def run_validation_checks(source: Dict[str, Any], result: Dict[str, Any]) -> List[Tuple[str, bool]]:
+    """Structural checks of a translated object against its source
+
+    For many languages at once use validation.validate_translations, which
+    also returns per-key rows.
+    """
+    return SourceFacts(source).validate({"result": result})["languages"]["result"]["checks"]
+
+def _join_chunks(parts: List[Optional[str]]) -> str:
+    """Single chunk as-is; several chunks separated by a header line each"""
+    if len(parts) == 1:
+        return parts[0] or ""
+    return "\n\n".join(
+        f"----- chunk {index + 1}/{len(parts)} -----\n{part or ''}"
+        for index, part in enumerate(parts)
+    )
+
+def plan_translation(
+    source: Dict[str, Any],
+    json_input: str,
+    languages: List[str],
+    template: str,
+    model: Dict[str, Any],
+    key_memory: Optional[KeyMemory] = None,
+    incremental: bool = True,
+    chunk_tokens: int = 0,
+    prompt_caching: bool = True,
+    glossary: Optional[Glossary] = None,
+    temperature: float = 0.3,
+    samples: int = 1
+) -> Dict[str, Any]:
+    """Decide what to send for each language: reused keys, pending keys and their chunks
+
+    The plan is plain JSON-serializable data, so a batch job can store it and
+    finish the run after a restart even if the key memory changed meanwhile.
+    With a glossary, values with an approved translation are taken from it
+    (over the key memory) and never sent; each chunk carries glossary hints
+    (fuzzy matches of its values) for its prompt. Keys are only reused from
+    runs with the same temperature and samples (see make_scope).
+    """
+    # Only send keys whose source changed since the last accepted translation
+    scope = make_scope(model["model_id"], template, temperature, samples)
+    reused, pending, approved = {}, {}, {}
+    for language in languages:
+        if key_memory is not None and incremental:
+            reused[language], pending[language] = key_memory.diff(scope, language, source)
+        else:
+            reused[language], pending[language] = {}, source
+        hits = glossary.approved(language, source) if glossary is not None else {}
+        if hits:
+            reused[language] = {**reused[language], **hits}
+            pending[language] = {key: value for key, value in pending[language].items() if key not in hits}
+        approved[language] = list(hits)
+
+    # Split each language's pending keys into token-budgeted chunks
+    budget = chunk_budget(model, chunk_tokens)
+    chunks = {language: split_json(pending[language], budget) for language in languages}
+    return {
+        "scope": scope,
+        "languages": list(languages),
+        "template": template,
+        "json_input": json_input,
+        "prompt_caching": prompt_caching,
+        "reused": reused,
+        "pending": pending,
+        "approved": approved,
+        "chunks": chunks,
+        "hints": {
+            language: [glossary.hints(language, chunk) for chunk in chunks[language]]
+            for language in languages
+        } if glossary is not None else {},
+    }
+
+
+def plan_tasks(plan: Dict[str, Any]) -> List[Tuple[str, int]]:
+    """(language, chunk index) for every request the plan needs"""
+    return [
+        (language, index)
+        for language in plan["languages"]
+        for index in range(len(plan["chunks"][language]))
+    ]
+
+
+def plan_prompt(plan: Dict[str, Any], task: Tuple[str, int]) -> str:
+    language, index = task
+    chunks = plan["chunks"][language]
+    # Send the user's JSON verbatim when nothing was reused or split
+    if not plan["reused"][language] and len(chunks) == 1:
+        payload = plan["json_input"]
+    else:
+        payload = json.dumps(chunks[index], indent=2, ensure_ascii=False)
+    hints = plan.get("hints", {}).get(language)
+    render = format_cacheable_prompt if plan["prompt_caching"] else format_prompt
+    return render(
+        template=plan["template"],
+        target_language=language,
+        json_input=payload,
+        glossary=hints[index] if hints else None
+    )
+
+
+def call_metrics(model: Dict[str, Any], language: str, chunk: Optional[int], outcome: Dict[str, Any]) -> Dict[str, Any]:
+    """Span attributes for one dispatched call: SDK-reported tokens when available, estimates otherwise"""
+    usage = outcome["usage"]
+    # Cache hits and calls coalesced into another request's cost nothing
+    free = outcome["cached"] or outcome.get("coalesced", False)
+    if free:
+        input_tokens = output_tokens = 0
+    else:
+        input_tokens = usage.get("input_tokens", estimate_tokens(outcome["prompt"]))
+        output_tokens = usage.get("output_tokens", estimate_tokens(outcome["raw"] or ""))
+    cache_read_tokens = usage.get("cache_read_tokens", 0)
+    cache_write_tokens = usage.get("cache_write_tokens", 0)
+    return {
+        "model": model["model_id"],
+        "provider": model["provider"],
+        "language": language,
+        "chunk": chunk,
+        "cached": outcome["cached"],
+        "coalesced": outcome.get("coalesced", False),
+        "queue_wait": round(outcome["queue_wait"], 4),
+        "ttft": round(outcome["first_token"], 4) if outcome["first_token"] is not None else None,
+        "latency": round(outcome["elapsed"], 4),
+        "input_tokens": input_tokens,
+        "output_tokens": output_tokens,
+        "cache_read_tokens": cache_read_tokens,
+        "cache_write_tokens": cache_write_tokens,
+        "tokens_estimated": not free and not usage,
+        "retries": outcome["retries"],
+        "cost": estimate_cost(model, input_tokens, output_tokens, cache_read_tokens, cache_write_tokens),
+    }
+
+
+def collect_results(
+    plan: Dict[str, Any],
+    source: Dict[str, Any],
+    model: Dict[str, Any],
+    outcomes: Dict[Tuple[str, int], Dict[str, Any]],
+    key_memory: Optional[KeyMemory] = None,
+    tracer: Optional[Tracer] = None
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
+    """Validate and merge per-request outcomes (as from dispatch_tasks) into per-language results
+
+    Returns (all_results, run stats without "elapsed"). Every request gets a
+    span in tracer; token counts fall back to estimates when the SDK reports none.
+    """
+    languages = plan["languages"]
+    facts = SourceFacts(source) if key_memory is not None else None
+
+    # Per-request metrics: SDK-reported tokens when available, estimates otherwise
+    metrics = {}
+    for task, outcome in outcomes.items():
+        language, index = task
+        metrics[task] = call_metrics(model, language, index, outcome)
+        if tracer is not None:
+            tracer.record(
+                "translate",
+                outcome["started_at"],
+                outcome["ended_at"],
+                metrics[task],
+                error=outcome["error"]
+            )
+
+    all_results = {}
+    for language in languages:
+        reused = plan["reused"][language]
+        pending = plan["pending"][language]
+        language_chunks = plan["chunks"][language]
+
+        # Every key reused: no model call for this language
+        if not language_chunks:
+            all_results[language] = {
+                "valid": True,
+                "parsed": merge_translations(source, reused, {}),
+                "error": "",
+                "raw": "",
+                "prompt": "(all keys reused from translation memory)",
+                "cached": False,
+                "elapsed": 0.0,
+                "first_token": None,
+                "queue_wait": 0.0,
+                "input_tokens": 0,
+                "output_tokens": 0,
+                "cache_read_tokens": 0,
+                "retries": 0,
+                "cost": 0.0,
+                "json_repairs": [],
+                "chunks": []
+            }
+            continue
+
+        chunk_outcomes = [outcomes[(language, index)] for index in range(len(language_chunks))]
+        chunk_metrics = [metrics[(language, index)] for index in range(len(language_chunks))]
+        chunk_report = [
+            {
+                "keys": len(chunk),
+                "tokens": estimate_tokens(json.dumps(chunk, ensure_ascii=False)),
+                "elapsed": outcome["elapsed"],
+                "first_token": outcome["first_token"],
+                "cached": outcome["cached"]
+            }
+            for index, (chunk, outcome) in enumerate(zip(language_chunks, chunk_outcomes))
+        ]
+        first_tokens = [chunk["first_token"] for chunk in chunk_report if chunk["first_token"] is not None]
+
+        # Parse chunk by chunk; good chunks are remembered even if another one failed
+        combined = {}
+        errors = []
+        json_repairs = []
+        for index, outcome in enumerate(chunk_outcomes):
+            label = f"Chunk {index + 1}/{len(chunk_outcomes)}: " if len(chunk_outcomes) > 1 else ""
+            if not outcome["raw"]:
+                errors.append(label + outcome["error"])
+                continue
+            chunk_parsed, chunk_repairs, chunk_error = extract_json(outcome["raw"])
+            if chunk_parsed is None:
+                errors.append(label + chunk_error)
+            else:
+                combined.update(chunk_parsed)
+                json_repairs.extend(label + repair for repair in chunk_repairs)
+        if combined and key_memory is not None:
+            key_memory.record(plan["scope"], language, pending, combined, facts)
+        sampled = [outcome["best_of"] for outcome in chunk_outcomes if outcome.get("best_of")]
+
+        # Store result
+        responded = any(outcome["raw"] for outcome in chunk_outcomes)
+        all_results[language] = {
+            "valid": not errors,
+            "parsed": merge_translations(source, reused, combined) if not errors else None,
+            "error": "; ".join(errors),
+            "raw": _join_chunks([outcome["raw"] for outcome in chunk_outcomes]) if responded else None,
+            "prompt": _join_chunks([outcome["prompt"] for outcome in chunk_outcomes]),
+            "cached": all(outcome["cached"] for outcome in chunk_outcomes),
+            "elapsed": max(outcome["elapsed"] for outcome in chunk_outcomes),
+            "first_token": min(first_tokens) if first_tokens else None,
+            "queue_wait": max(outcome["queue_wait"] for outcome in chunk_outcomes),
+            "input_tokens": sum(metric["input_tokens"] for metric in chunk_metrics),
+            "output_tokens": sum(metric["output_tokens"] for metric in chunk_metrics),
+            "cache_read_tokens": sum(metric["cache_read_tokens"] for metric in chunk_metrics),
+            "retries": sum(metric["retries"] for metric in chunk_metrics),
+            "cost": sum(metric["cost"] for metric in chunk_metrics),
+            "json_repairs": json_repairs,
+            "chunks": chunk_report
+        }
+        if sampled:
+            similarities = [entry["similarity"] for entry in sampled if entry["similarity"] is not None]
+            all_results[language]["best_of"] = {
+                "candidates": sum(entry["candidates"] for entry in sampled),
+                "passing": sum(entry["passing"] for entry in sampled),
+                "similarity": round(sum(similarities) / len(similarities), 1) if similarities else None,
+            }
+
+    stats = {
+        "languages": len(languages),
+        "requests": len(outcomes),
+        "cached": sum(1 for outcome in outcomes.values() if outcome["cached"]),
+        "coalesced": sum(1 for outcome in outcomes.values() if outcome.get("coalesced")),
+        "reused_keys": sum(len(plan["reused"][language]) for language in languages),
+        "glossary_keys": sum(len(plan.get("approved", {}).get(language, ())) for language in languages),
+        "sent_keys": sum(len(plan["pending"][language]) for language in languages),
+        "input_tokens": sum(metric["input_tokens"] for metric in metrics.values()),
+        "output_tokens": sum(metric["output_tokens"] for metric in metrics.values()),
+        "cache_read_tokens": sum(metric["cache_read_tokens"] for metric in metrics.values()),
+        "retries": sum(metric["retries"] for metric in metrics.values()),
+        "cost": sum(metric["cost"] for metric in metrics.values()),
+    }
+    return all_results, stats
+
+
+def merge_stats(parts: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """Add up per-language run stats (from collect_results, with an optional "repair" entry)
+
+    Counts, tokens and costs are summed; repair rounds and elapsed time take the maximum.
+    """
+    merged: Dict[str, Any] = {}
+    for part in parts:
+        for field, value in part.items():
+            if isinstance(value, dict):
+                merged[field] = merge_stats([merged.get(field, {}), value])
+            elif field in ("rounds", "elapsed"):
+                merged[field] = max(merged.get(field, 0), value)
+            else:
+                merged[field] = merged.get(field, 0) + value
+    return merged
+
+
+def find_repairs(source: Dict[str, Any], translation: Dict[str, Any], facts: Optional[SourceFacts] = None) -> Dict[str, List[str]]:
+    """Source keys whose translation is missing or fails the per-key checks, with their problems"""
+    facts = facts or SourceFacts(source)
+    problems = {}
+    for key in source:
+        if key not in translation:
+            problems[key] = ["Missing"]
+            continue
+        found = facts.check(key, translation[key])
+        if found:
+            problems[key] = found
+    return problems
+
+
+def format_repair_prompt(
+    target_language: str,
+    source: Dict[str, Any],
+    translation: Dict[str, Any],
+    problems: Dict[str, List[str]]
+) -> str:
+    """Compact fix-up prompt covering only the keys in problems"""
+    payload = {}
+    for key, key_problems in problems.items():
+        payload[key] = {
+            "source": source[key],
+            "current": translation.get(key),
+            "problems": key_problems,
+        }
+        if key in CHAR_LIMITS:
+            payload[key]["max_chars"] = CHAR_LIMITS[key]
+    return format_prompt(
+        template=REPAIR_TEMPLATE,
+        target_language=target_language,
+        json_input=json.dumps(payload, indent=2, ensure_ascii=False)
+    )
+
+
+def repair_results(
+    all_results: Dict[str, Dict[str, Any]],
+    source: Dict[str, Any],
+    template: str,
+    model: Dict[str, Any],
+    translate: Callable[[str, float], Optional[str]],
+    temperature: float = 0.3,
+    limiter: Optional[ProviderLimiter] = None,
+    cache: Optional[TranslationCache] = None,
+    key_memory: Optional[KeyMemory] = None,
+    use_cache: bool = True,
+    max_rounds: int = DEFAULT_REPAIR_ROUNDS,
+    tracer: Optional[Tracer] = None,
+    cancel: Optional[threading.Event] = None,
+    samples: int = 1
+) -> Dict[str, Any]:
+    """Send only the keys that fail the checks back to the model and merge the fixes in place
+
+    For every valid result, unexpected keys are dropped and keys that are
+    missing or fail the per-key checks (placeholders, HTML tags, 'Cashy', char
+    limits) go out in
+    one fix-up request per language, all languages at once. A fix is accepted
+    only if it passes the checks; keys still failing are retried up to
+    max_rounds times and otherwise left as they were. Each result touched gets
+    a "repair" entry and its tokens/cost include the repair calls. Returns
+    repair stats, including the tokens and seconds saved compared with
+    re-running every repaired language in full each round. No further round
+    starts once cancel is set. samples is the run's best-of-n, so accepted
+    fixes land in the same key memory scope as the run (see make_scope).
+    """
+    scope = make_scope(model["model_id"], template, temperature, samples)
+    facts = SourceFacts(source)
+    stats = {
+        "languages": 0,
+        "keys": 0,
+        "fixed": 0,
+        "dropped": 0,
+        "unresolved": 0,
+        "rounds": 0,
+        "requests": 0,
+        "input_tokens": 0,
+        "output_tokens": 0,
+        "cost": 0.0,
+        "elapsed": 0.0,
+        "tokens_saved": 0,
+        "seconds_saved": 0.0,
+    }
+
+    pending = {}
+    for language, result in all_results.items():
+        if not result["valid"]:
+            continue
+        dropped = [key for key in result["parsed"] if key not in source]
+        problems = find_repairs(source, result["parsed"], facts)
+        if not dropped and not problems:
+            continue
+        result["parsed"] = {key: value for key, value in result["parsed"].items() if key in source}
+        result["repair"] = {"keys": list(problems), "fixed": [], "dropped": dropped, "unresolved": [], "rounds": 0}
+        stats["languages"] += 1
+        stats["keys"] += len(problems)
+        stats["dropped"] += len(dropped)
+        if problems:
+            pending[language] = problems
+
+    for round_index in range(max_rounds):
+        if not pending or (cancel is not None and cancel.is_set()):
+            break
+        stats["rounds"] += 1
+        started = time.perf_counter()
+        outcomes = dispatch_tasks(
+            list(pending),
+            build_prompt=lambda language: format_repair_prompt(language, source, all_results[language]["parsed"], pending[language]),
+            translate=translate,
+            provider=model["provider"],
+            temperature=temperature,
+            limiter=limiter,
+            cache=cache,
+            model_id=model["model_id"],
+            # A later round repeats an unchanged prompt; a cached reply would fail again
+            use_cache=use_cache and round_index == 0
+        )
+        elapsed = time.perf_counter() - started
+
+        still_pending = {}
+        for language, outcome in outcomes.items():
+            result = all_results[language]
+            metric = {**call_metrics(model, language, None, outcome), "repair_round": round_index + 1}
+            if tracer is not None:
+                tracer.record("repair", outcome["started_at"], outcome["ended_at"], metric, error=outcome["error"])
+
+            fixes = {}
+            if outcome["raw"]:
+                fix_valid, fix_parsed, _ = validate_json(outcome["raw"])
+                if fix_valid and isinstance(fix_parsed, dict):
+                    fixes = fix_parsed
+            accepted, remaining = {}, {}
+            for key, problems in pending[language].items():
+                found = facts.check(key, fixes[key]) if key in fixes else problems
+                if found:
+                    remaining[key] = found
+                else:
+                    accepted[key] = fixes[key]
+            result["parsed"] = merge_translations(source, result["parsed"], accepted)
+            if accepted and key_memory is not None:
+                key_memory.record(scope, language, source, accepted, facts)
+            if remaining:
+                still_pending[language] = remaining
+
+            # A full re-run would cost what the first pass did (estimated when it was cached)
+            full_tokens = (result["input_tokens"] + result["output_tokens"]) or (
+                estimate_tokens(result["prompt"]) + estimate_tokens(result["raw"] or "")
+            )
+            stats["tokens_saved"] += full_tokens - metric["input_tokens"] - metric["output_tokens"]
+            stats["requests"] += 1
+            stats["fixed"] += len(accepted)
+            stats["input_tokens"] += metric["input_tokens"]
+            stats["output_tokens"] += metric["output_tokens"]
+            stats["cost"] += metric["cost"]
+
+            result["repair"]["fixed"].extend(accepted)
+            result["repair"]["unresolved"] = list(remaining)
+            result["repair"]["rounds"] += 1
+            result["input_tokens"] += metric["input_tokens"]
+            result["output_tokens"] += metric["output_tokens"]
+            result["cache_read_tokens"] += metric["cache_read_tokens"]
+            result["retries"] += metric["retries"]
+            result["cost"] += metric["cost"]
+
+        # Full re-runs of these languages would have run side by side as well
+        stats["seconds_saved"] += max(all_results[language]["elapsed"] for language in outcomes) - elapsed
+        stats["elapsed"] += elapsed
+        pending = still_pending
+
+    stats["unresolved"] = sum(len(problems) for problems in pending.values())
+    return stats
+
+
+def translate_json(
+    source: Dict[str, Any],
+    json_input: str,
+    languages: List[str],
+    template: str,
+    model: Dict[str, Any],
+    translate: Callable[[str, float], Optional[str]],
+    temperature: float = 0.3,
+    limiter: Optional[ProviderLimiter] = None,
+    cache: Optional[TranslationCache] = None,
+    key_memory: Optional[KeyMemory] = None,
+    use_cache: bool = True,
+    incremental: bool = True,
+    chunk_tokens: int = 0,
+    stream: Optional[Callable[[str, float], Iterator[str]]] = None,
+    on_event: Optional[Callable[[Dict[str, Any]], None]] = None,
+    tracer: Optional[Tracer] = None,
+    prompt_caching: bool = True,
+    repair_rounds: int = 0,
+    samples: int = 1,
+    sample: Optional[Callable[[str, float, int], List[str]]] = None,
+    on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    cancel: Optional[threading.Event] = None,
+    glossary: Optional[Glossary] = None
+) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
+    """Translate a JSON object into every language and return (all_results, run stats)
+
+    With a key memory and incremental=True only new or changed keys are sent to
+    the model. Pending keys are split into chunks that fit the model's token
+    budget (chunk_tokens overrides it), all language x chunk requests run
+    concurrently, and the output is merged back into a complete object in
+    source key order before validation. With a stream callable, responses are
+    parsed as they arrive: on_event receives first-token and per-value events
+    tagged with "language" and "chunk", and structurally broken output aborts early.
+    Every request gets a span in tracer (queue wait, TTFT, latency, tokens,
+    retries, cost); token counts fall back to estimates when the SDK reports none.
+    With prompt_caching the template's static part is sent as a prefix shared by
+    every request (see split_template) so providers can serve it from cache.
+    With repair_rounds, keys failing the checks are fixed in a targeted
+    follow-up pass (see repair_results) reported under stats["repair"].
+    With samples > 1 every request asks for that many candidates at once (via
+    sample, e.g. ProviderRegistry.sample_fn, or concurrent translate calls) and
+    keeps the best (see make_best_of_translate); this replaces streaming.
+    With on_result, each language is validated (and repaired) as soon as its
+    last chunk arrives and on_result(language, result) is called right away,
+    from a worker thread, e.g. to export it while other languages are in flight.
+    on_event also receives a "start" event when a request gets a provider slot.
+    Setting cancel skips every request not yet sent (and the repair pass);
+    those languages fail with "Cancelled" while finished ones are kept.
+    With a glossary, exact hits skip the model and fuzzy hits become prompt
+    hints (see plan_translation); stats["glossary_keys"] counts the former.
+    """
+    started = time.perf_counter()
+    plan = plan_translation(
+        source, json_input, languages, template, model,
+        key_memory=key_memory,
+        incremental=incremental,
+        chunk_tokens=chunk_tokens,
+        prompt_caching=prompt_caching,
+        glossary=glossary,
+        temperature=temperature,
+        samples=samples
+    )
+
+    def streaming_translate_for(task: Tuple[str, int]) -> Callable[[str, float], Optional[str]]:
+        language, index = task
+
+        def emit(event: Dict[str, Any]) -> None:
+            if on_event is not None:
+                on_event({**event, "language": language, "chunk": index})
+
+        return make_streaming_translate(stream, plan["chunks"][language][index], emit)
+
+    sample_candidates = sample or sample_concurrently(translate)
+
+    def best_of_translate_for(task: Tuple[str, int]) -> Callable[[str, float], Optional[str]]:
+        language, index = task
+        return make_best_of_translate(sample_candidates, samples, plan["chunks"][language][index], language)
+
+    def repair(all_results: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        return repair_results(
+            all_results, source, template, model, translate,
+            temperature=temperature,
+            limiter=limiter,
+            cache=cache,
+            key_memory=key_memory,
+            use_cache=use_cache,
+            max_rounds=repair_rounds,
+            tracer=tracer,
+            cancel=cancel,
+            samples=samples
+        )
+
+    # Per-language completion for on_result: outcomes so far, chunks still in flight, finished languages
+    finished: Dict[Tuple[str, int], Dict[str, Any]] = {}
+    remaining = {language: len(plan["chunks"][language]) for language in plan["languages"]}
+    parts: Dict[str, Tuple[Dict[str, Any], Dict[str, Any]]] = {}
+    lock = threading.Lock()
+
+    def finish_language(language: str) -> None:
+        language_plan = {**plan, "languages": [language]}
+        with lock:
+            language_outcomes = {task: finished[task] for task in plan_tasks(language_plan)}
+        results, language_stats = collect_results(language_plan, source, model, language_outcomes, key_memory=key_memory, tracer=tracer)
+        if repair_rounds:
+            language_stats["repair"] = repair(results)
+        parts[language] = (results[language], language_stats)
+        on_result(language, results[language])
+
+    def task_done(task: Tuple[str, int], outcome: Dict[str, Any]) -> None:
+        language = task[0]
+        with lock:
+            finished[task] = outcome
+            remaining[language] -= 1
+            complete = not remaining[language]
+        if complete:
+            finish_language(language)
+
+    if samples > 1:
+        translate_for = best_of_translate_for
+    elif stream is not None:
+        translate_for = streaming_translate_for
+    else:
+        translate_for = None
+
+    outcomes = dispatch_tasks(
+        plan_tasks(plan),
+        build_prompt=lambda task: plan_prompt(plan, task),
+        translate=translate,
+        provider=model["provider"],
+        temperature=temperature,
+        limiter=limiter,
+        cache=cache,
+        model_id=model["model_id"],
+        use_cache=use_cache,
+        translate_for=translate_for,
+        cache_params={"samples": samples} if samples > 1 else None,
+        on_complete=task_done if on_result is not None else None,
+        on_start=(lambda task: on_event({"type": "start", "language": task[0], "chunk": task[1]})) if on_event is not None else None,
+        cancel=cancel
+    )
+
+    if on_result is not None:
+        # Languages whose keys were all reused had no request to wait for
+        for language in plan["languages"]:
+            if language not in parts:
+                finish_language(language)
+        all_results = {language: parts[language][0] for language in plan["languages"]}
+        stats = merge_stats([parts[language][1] for language in plan["languages"]])
+    else:
+        all_results, stats = collect_results(plan, source, model, outcomes, key_memory=key_memory, tracer=tracer)
+        if repair_rounds:
+            stats["repair"] = repair(all_results)
+    if "repair" in stats:
+        for field in ("input_tokens", "output_tokens", "cost"):
+            stats[field] += stats["repair"][field]
+    stats["elapsed"] = time.perf_counter() - started
+    return all_results, stats
@@ -0,0 +1,159 @@
+import json
+import re
+from typing import Any, Dict, FrozenSet, List, Tuple
+
+from scoring import grapheme_count
+
+PLACEHOLDER_PATTERN = re.compile(r'\{[a-zA-Z_][a-zA-Z0-9_]*\}')
+
+# Placeholders and HTML tags in one scan: group 1 a placeholder, groups 2-3 a tag's "/" and name
+TOKEN_PATTERN = re.compile(r'(\{[a-zA-Z_][a-zA-Z0-9_]*\})|<(/?)([a-zA-Z][a-zA-Z0-9-]*)\b[^<>]*>')
+
+# Max characters (graphemes, see scoring.grapheme_count) for space-constrained keys
+CHAR_LIMITS = {
+    "hero_headline": 20,
+    "hero_subheadline": 24,
+}
+
+NO_PLACEHOLDERS: FrozenSet[str] = frozenset()
+NO_TAGS: Tuple[str, ...] = ()
+
+# Language-level checks, in display order
+CHECK_NAMES = (
+    "Same keys",
+    "Brand name 'Cashy' preserved",
+    "Placeholders preserved",
+    "HTML tags preserved",
+    "Within char limits",
+)
+
+
+def _text(value: Any) -> str:
+    return value if isinstance(value, str) else json.dumps(value, ensure_ascii=False)
+
+
+def _scan(text: str) -> Tuple[FrozenSet[str], Tuple[str, ...]]:
+    """(placeholders, sorted tags) of a string, e.g. ({"{name}"}, ("/b", "b"))"""
+    # Most values have neither; skip the regex for them
+    if "{" not in text and "<" not in text:
+        return NO_PLACEHOLDERS, NO_TAGS
+    if "<" not in text:
+        return frozenset(PLACEHOLDER_PATTERN.findall(text)), NO_TAGS
+    placeholders = []
+    tags = []
+    for placeholder, slash, tag in TOKEN_PATTERN.findall(text):
+        if placeholder:
+            placeholders.append(placeholder)
+        else:
+            tags.append(slash + tag.lower())
+    return frozenset(placeholders), tuple(sorted(tags))
+
+
+class SourceFacts:
+    """Everything validation needs from the source, computed once
+
+    Per key: placeholders, HTML tags and char budget; overall: the key
+    set and all placeholders. check() and validate() then only scan the
+    translated side, once per value.
+    """
+
+    def __init__(self, source: Dict[str, Any], char_limits: Dict[str, int] = CHAR_LIMITS):
+        self.source = source
+        self.keys = set(source)
+        self.placeholders: Dict[str, FrozenSet[str]] = {}
+        self.tags: Dict[str, Tuple[str, ...]] = {}
+        for key, value in source.items():
+            self.placeholders[key], self.tags[key] = _scan(_text(value))
+        self.all_placeholders = frozenset().union(*self.placeholders.values())
+        self.limits = {key: limit for key, limit in char_limits.items() if key in self.keys}
+
+    def _problems(self, key: str, text: str, placeholders: FrozenSet[str], tags: Tuple[str, ...]) -> List[str]:
+        problems = []
+        if placeholders != self.placeholders[key]:
+            problems.append("Placeholders changed")
+        if tags != self.tags[key]:
+            problems.append("HTML tags changed")
+        if "Cashy" not in text and "cashy" in text.lower():
+            problems.append("Brand name 'Cashy' altered")
+        limit = self.limits.get(key)
+        if limit and grapheme_count(text.strip()) > limit:
+            problems.append(f"{grapheme_count(text.strip())}/{limit} chars")
+        return problems
+
+    def check(self, key: str, value: Any) -> List[str]:
+        """Problems with one translated value (empty if it passes)"""
+        if key not in self.keys:
+            return ["Unexpected key"]
+        text = _text(value)
+        return self._problems(key, text, *_scan(text))
+
+    def validate(self, translations: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+        """Validate every language x key in one pass
+
+        translations maps a language to its parsed object (None for output that
+        didn't parse). Returns {"rows": [...], "languages": {...}}: one row per
+        language x key (status "ok", "problem", "missing" or "unexpected", the
+        char count and limit, and its problems) and per language the checks
+        as (name, passed) pairs in CHECK_NAMES order plus problem counts.
+        """
+        rows: List[Dict[str, Any]] = []
+        languages: Dict[str, Dict[str, Any]] = {}
+        for language, translation in translations.items():
+            if translation is None:
+                languages[language] = {"checks": [], "problems": 0, "missing": len(self.keys), "unexpected": 0}
+                continue
+
+            found_placeholders = set()
+            tags_ok = limits_ok = True
+            has_brand = has_lowercase_brand = False
+            problem_count = 0
+            for key, value in translation.items():
+                text = _text(value)
+                has_brand = has_brand or "Cashy" in text or "Cashy" in key
+                has_lowercase_brand = has_lowercase_brand or "cashy" in text.lower() or "cashy" in key.lower()
+                if key not in self.keys:
+                    rows.append({"language": language, "key": key, "status": "unexpected", "chars": grapheme_count(text.strip()), "limit": None, "problems": "Unexpected key"})
+                    continue
+                placeholders, tags = _scan(text)
+                found_placeholders |= placeholders
+                problems = self._problems(key, text, placeholders, tags)
+                if tags != self.tags[key]:
+                    tags_ok = False
+                limit = self.limits.get(key)
+                chars = grapheme_count(text.strip())
+                if limit and chars > limit:
+                    limits_ok = False
+                problem_count += bool(problems)
+                rows.append({
+                    "language": language,
+                    "key": key,
+                    "status": "problem" if problems else "ok",
+                    "chars": chars,
+                    "limit": limit,
+                    "problems": "; ".join(problems),
+                })
+
+            missing = [key for key in self.source if key not in translation]
+            for key in missing:
+                rows.append({"language": language, "key": key, "status": "missing", "chars": 0, "limit": self.limits.get(key), "problems": "Missing"})
+            unexpected = len(translation.keys() - self.keys)
+
+            checks = dict.fromkeys(CHECK_NAMES, False)
+            checks["Same keys"] = not missing and not unexpected
+            # Object-wide, as before: passes if "Cashy" appears anywhere or the brand never appears at all
+            checks["Brand name 'Cashy' preserved"] = has_brand or not has_lowercase_brand
+            checks["Placeholders preserved"] = found_placeholders == self.all_placeholders or not self.all_placeholders
+            checks["HTML tags preserved"] = tags_ok
+            checks["Within char limits"] = limits_ok
+            languages[language] = {
+                "checks": list(checks.items()),
+                "problems": problem_count,
+                "missing": len(missing),
+                "unexpected": unexpected,
+            }
+        return {"rows": rows, "languages": languages}
+
+
+def validate_translations(source: Dict[str, Any], translations: Dict[str, Dict[str, Any]]) -> Dict[str, Any]:
+    """SourceFacts(source).validate(translations)"""
+    return SourceFacts(source).validate(translations)